@@ -0,0 +1,364 @@
+"""
+Powtarzalny zestaw benchmarków: przeszukiwanie, koder szachownicy, inferencja, generator danych i trening.
+
+Każda sekcja działa na stałym zestawie danych (pozycje FEN poniżej, stałe ziarna), więc wyniki
+z różnych commitów można porównywać. Wynik trafia do pliku JSON razem z hashem commita:
+    python chess_benchmark.py --output bench_nowy.json
+    python chess_benchmark.py --compare bench_stary.json --output bench_nowy.json
+
+Sekcje bez potrzebnych zależności (np. trening bez TensorFlow) są pomijane z podaniem powodu.
+Bez wytrenowanego modelu (albo z --random-weights) przeszukiwanie i inferencja używają sieci
+o tej samej architekturze z losowymi wagami - czas jest ten sam, zmieniają się tylko wybrane ruchy.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import tempfile
+import time
+
+import chess
+import numpy as np
+
+from chess_board_encoder import encode_board, encode_boards, pack_boards
+from chess_dataset_generator import StratifiedSampler, _generate_shard, write_shard
+from chess_inference import DEFAULT_BACKEND, NumpyEvaluator, load_evaluator, measure_latency
+from chess_logic import MODEL_PATH, ChessAIPlayer
+from chess_model_registry import get_tensorflow
+from chess_nnue import NnueEvaluator
+
+RESULTS_FORMAT_VERSION = 1
+
+# Stały zestaw pozycji testowych: otwarcie, taktyczne środkowe gry i końcówki
+BENCHMARK_FENS = (
+    ('start', chess.STARTING_FEN),
+    ('kiwipete', 'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1'),
+    ('italian', 'r1bqkb1r/pppp1ppp/2n2n2/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4'),
+    ('middlegame', 'r2q1rk1/pp2bppp/2n1pn2/3p4/3P4/2NBPN2/PP3PPP/R2Q1RK1 w - - 0 10'),
+    ('rook_endgame', '8/5pk1/6p1/8/3R4/6P1/5PK1/r7 b - - 0 40'),
+    ('pawn_endgame', '8/8/3k4/3p4/3P4/3K4/8/8 w - - 0 50'),
+)
+
+DEFAULT_DEPTHS = (1, 2, 3)
+DEFAULT_BATCH_SIZES = (1, 32, 256, 1024)
+DEFAULT_PARALLEL_WORKERS = (1, 2, 4)
+# Oceny tej samej pozycji w różnych batchach różnią się o błąd zaokrągleń float32 (~1e-7),
+# więc przy remisie ocen przeszukiwanie równoległe może wybrać inny, równie dobry ruch
+SCORE_TOLERANCE = 1e-5
+SECTIONS = ('search', 'parallel', 'encoder', 'inference', 'generator', 'training')
+
+# Najważniejsze liczby (im więcej, tym lepiej) porównywane przez --compare
+HEADLINE_METRICS = (
+    ('search', 'nodes_per_sec'),
+    ('encoder', 'boards_per_sec'),
+    ('encoder', 'batch_boards_per_sec'),
+    ('generator', 'samples_per_sec'),
+    ('training', 'samples_per_sec'),
+)
+
+
+def git_revision():
+    """Hash bieżącego commita i informacja, czy drzewo ma niezatwierdzone zmiany (None poza repozytorium)."""
+    cwd = os.path.dirname(os.path.abspath(__file__))
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=cwd, capture_output=True, text=True,
+                                check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=cwd,
+                                    capture_output=True, text=True, check=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, dirty
+
+
+def benchmark_evaluator(model_path=MODEL_PATH, backend=DEFAULT_BACKEND, random_weights=False):
+    """Zwraca (evaluator, opis). Bez modelu lub TensorFlow spadamy na sieć NumPy (wagi z .h5 albo losowe)."""
+    if not random_weights and os.path.exists(model_path):
+        if model_path.endswith('.tflite'):
+            backend = 'tflite'
+        if backend not in ('numpy', 'nnue') and not model_path.endswith('.tflite') and get_tensorflow() is None:
+            backend = 'nnue'
+        try:
+            return load_evaluator(model_path, backend), f"{backend}:{model_path}"
+        except Exception as e:
+            print(f"Nie udało się wczytać modelu '{model_path}' ({backend}): {e}")
+    if backend == 'numpy':  # Pełna sieć dla każdego liścia - do porównania z akumulatorem
+        return NumpyEvaluator.random(seed=0), 'numpy:random'
+    return NnueEvaluator.random(seed=0), 'nnue:random'
+
+
+def bench_search(evaluator, depths=DEFAULT_DEPTHS, search_algorithm='alphabeta', fens=BENCHMARK_FENS, workers=1):
+    """
+    Czas do ruchu i węzły/s dla każdej pozycji i głębokości. Przed każdym pomiarem czyścimy
+    tablicę transpozycji, a cache ocen jest wyłączony, więc pomiary nie zależą od kolejności.
+    """
+    player = ChessAIPlayer(use_tensorflow=True, evaluator=evaluator, search_algorithm=search_algorithm,
+                           workers=workers, eval_cache_size=0)
+    if workers > 1:
+        player.get_best_move(chess.Board(), depth=2)  # Start procesów roboczych poza pomiarem
+    positions = []
+    per_depth = {}
+    for name, fen in fens:
+        for depth in depths:
+            board = chess.Board(fen)
+            player.new_game()
+            start_time = time.perf_counter()
+            move = player.get_best_move(board, depth=depth)
+            elapsed = time.perf_counter() - start_time
+            stats = player.last_search_stats
+            nodes = stats.nodes
+            positions.append({
+                'position': name,
+                'depth': depth,
+                'move': move.uci() if move else None,
+                'score': stats.score,
+                'time': elapsed,
+                'nodes': nodes,
+                'leaf_evals': stats.leaf_evals,
+                'nn_batches': stats.nn_batches,
+                'nodes_per_sec': nodes / elapsed if elapsed else 0.0,
+                'movegen_time': stats.movegen_time,
+                'encode_time': stats.encode_time,
+                'inference_time': stats.inference_time,
+            })
+            totals = per_depth.setdefault(depth, {'time': 0.0, 'nodes': 0})
+            totals['time'] += elapsed
+            totals['nodes'] += nodes
+
+    player.quit_engine()
+
+    total_time = sum(totals['time'] for totals in per_depth.values())
+    total_nodes = sum(totals['nodes'] for totals in per_depth.values())
+    return {
+        'algorithm': search_algorithm,
+        'workers': workers,
+        'positions': positions,
+        'depths': {str(depth): {'avg_time_to_move': totals['time'] / len(fens),
+                                'nodes_per_sec': totals['nodes'] / totals['time'] if totals['time'] else 0.0}
+                   for depth, totals in per_depth.items()},
+        'nodes_per_sec': total_nodes / total_time if total_time else 0.0,
+    }
+
+
+def bench_parallel(evaluator, depth=3, worker_counts=DEFAULT_PARALLEL_WORKERS, fens=BENCHMARK_FENS):
+    """
+    Skalowanie przeszukiwania równoległego: łączny czas do ruchu na tej samej głębokości dla każdej
+    liczby procesów, przyspieszenie i wydajność (przyspieszenie / procesy) względem jednego procesu
+    oraz to, czy wynik jest ten sam co w przeszukiwaniu sekwencyjnym (ten sam ruch albo ruch
+    o tej samej ocenie - SCORE_TOLERANCE).
+    """
+    worker_counts = sorted(set(worker_counts) | {1})
+    runs = {workers: bench_search(evaluator, (depth,), fens=fens, workers=workers) for workers in worker_counts}
+    serial = runs[1]
+    serial_time = sum(position['time'] for position in serial['positions'])
+    results = {}
+    for workers, run in runs.items():
+        total_time = sum(position['time'] for position in run['positions'])
+        speedup = serial_time / total_time if total_time else 0.0
+        results[str(workers)] = {
+            'time': total_time,
+            'nodes_per_sec': run['nodes_per_sec'],
+            'speedup': speedup,
+            'efficiency': speedup / workers,
+            'same_as_serial': all(
+                position['move'] == reference['move'] or abs(position['score'] - reference['score']) <= SCORE_TOLERANCE
+                for position, reference in zip(run['positions'], serial['positions'])),
+        }
+    return {'depth': depth, 'cpu_count': os.cpu_count(), 'workers': results}
+
+
+def _sample_boards(count, seed=0):
+    """Stały zbiór `count` pozycji z losowych partii (ten sam dla tego samego ziarna)."""
+    rng = random.Random(seed)
+    boards = []
+    board = chess.Board()
+    while len(boards) < count:
+        moves = list(board.legal_moves)
+        if not moves or board.ply() >= 80:
+            board.reset()
+            continue
+        board.push(rng.choice(moves))
+        boards.append(board.copy(stack=False))
+    return boards
+
+
+def bench_encoder(count=20000, batch_size=1024, seed=0):
+    """Pozycje/s: kodowanie pojedyncze (jak w przeszukiwaniu), wsadowe i samo pakowanie bitboardów."""
+    boards = _sample_boards(count, seed)
+    out = np.empty((batch_size, encode_board(boards[0]).shape[0]), dtype=np.float32)
+
+    start_time = time.perf_counter()
+    for index, board in enumerate(boards):
+        encode_board(board, out[index % batch_size])
+    single_time = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    for start in range(0, count, batch_size):
+        chunk = boards[start:start + batch_size]
+        encode_boards(chunk, out[:len(chunk)])
+    batch_time = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    for start in range(0, count, batch_size):
+        pack_boards(boards[start:start + batch_size])
+    pack_time = time.perf_counter() - start_time
+
+    return {
+        'boards': count,
+        'boards_per_sec': count / single_time,
+        'batch_boards_per_sec': count / batch_time,
+        'pack_boards_per_sec': count / pack_time,
+    }
+
+
+def bench_inference(evaluator, batch_sizes=DEFAULT_BATCH_SIZES, repeats=50):
+    """Opóźnienie jednego wywołania sieci (ms) i pozycje/s dla każdego rozmiaru batcha."""
+    results = {}
+    for batch_size in batch_sizes:
+        latency = measure_latency(evaluator, batch_size, repeats=repeats)
+        results[str(batch_size)] = {'latency_ms': latency * 1000.0,
+                                    'positions_per_sec': batch_size / latency if latency else 0.0}
+    return {'batch_sizes': results}
+
+
+def bench_generator(samples=5000, seed=0):
+    """Próbki/s generatora (jeden proces, bez zapisu na dysk) - ta sama praca co jeden shard."""
+    start_time = time.perf_counter()
+    _generate_shard((0, samples, seed, StratifiedSampler()))
+    elapsed = time.perf_counter() - start_time
+    return {'samples': samples, 'samples_per_sec': samples / elapsed}
+
+
+def bench_training(samples=20000, batch_size=256, seed=0):
+    """
+    Próbki/s jednej epoki treningu na potoku tf.data z shardów (tymczasowe shardy z generatora).
+    Pierwsza epoka zawiera kompilację grafu, więc mierzymy drugą.
+    """
+    if get_tensorflow() is None:
+        return {'skipped': 'TensorFlow nie jest zainstalowany'}
+    from chess_model_trainer import build_model, make_dataset
+    from chess_board_encoder import INPUT_SIZE
+
+    data_dir = tempfile.mkdtemp(prefix='chess_bench_')
+    try:
+        _, records, _ = _generate_shard((0, samples, seed, StratifiedSampler()))
+        shard_path = write_shard(records, data_dir, 0)
+        dataset = make_dataset([shard_path], batch_size=batch_size, shuffle=True)
+        model = build_model(INPUT_SIZE)
+        model.fit(dataset, epochs=1, verbose=0)
+        start_time = time.perf_counter()
+        model.fit(dataset, epochs=1, verbose=0)
+        elapsed = time.perf_counter() - start_time
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+    return {'samples': samples, 'batch_size': batch_size, 'samples_per_sec': samples / elapsed}
+
+
+def run_benchmarks(sections=SECTIONS, depths=DEFAULT_DEPTHS, batch_sizes=DEFAULT_BATCH_SIZES,
+                   model_path=MODEL_PATH, backend=DEFAULT_BACKEND, random_weights=False, quick=False,
+                   search_workers=1, parallel_workers=DEFAULT_PARALLEL_WORKERS):
+    """Uruchamia wybrane sekcje i zwraca słownik gotowy do zapisu jako JSON."""
+    commit, dirty = git_revision()
+    evaluator, evaluator_name = benchmark_evaluator(model_path, backend, random_weights)
+    scale = 0.1 if quick else 1.0
+    results = {}
+    for section in sections:
+        print(f"Benchmark: {section}...")
+        start_time = time.perf_counter()
+        if section == 'search':
+            results[section] = bench_search(evaluator, depths, workers=search_workers)
+        elif section == 'parallel':
+            results[section] = bench_parallel(evaluator, max(depths), parallel_workers)
+        elif section == 'encoder':
+            results[section] = bench_encoder(int(20000 * scale))
+        elif section == 'inference':
+            results[section] = bench_inference(evaluator, batch_sizes, repeats=10 if quick else 50)
+        elif section == 'generator':
+            results[section] = bench_generator(int(5000 * scale))
+        elif section == 'training':
+            results[section] = bench_training(int(20000 * scale))
+        print(f"  gotowe w {time.perf_counter() - start_time:.1f} s")
+
+    return {
+        'format_version': RESULTS_FORMAT_VERSION,
+        'commit': commit,
+        'dirty': dirty,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'machine': {'platform': platform.platform(), 'python': platform.python_version(),
+                    'numpy': np.__version__, 'cpu_count': os.cpu_count()},
+        'evaluator': evaluator_name,
+        'quick': quick,
+        'results': results,
+    }
+
+
+def print_report(report):
+    results = report['results']
+    print(f"\nCommit: {report['commit'] or '?'}{' (zmiany niezatwierdzone)' if report['dirty'] else ''}, "
+          f"sieć: {report['evaluator']}")
+    if 'search' in results:
+        for depth, stats in results['search']['depths'].items():
+            print(f"Przeszukiwanie, głębokość {depth}: {stats['avg_time_to_move'] * 1000:.1f} ms/ruch, "
+                  f"{stats['nodes_per_sec']:.0f} węzłów/s")
+    if 'parallel' in results:
+        parallel = results['parallel']
+        for workers, stats in parallel['workers'].items():
+            print(f"Równolegle, głębokość {parallel['depth']}, procesy {workers} (CPU: {parallel['cpu_count']}): "
+                  f"{stats['time']:.2f} s, przyspieszenie {stats['speedup']:.2f}x, "
+                  f"wydajność {stats['efficiency']:.0%}{'' if stats['same_as_serial'] else ', INNY WYNIK'}")
+    if 'encoder' in results:
+        stats = results['encoder']
+        print(f"Koder: {stats['boards_per_sec']:.0f} pozycji/s (pojedynczo), "
+              f"{stats['batch_boards_per_sec']:.0f} pozycji/s (wsadowo)")
+    if 'inference' in results:
+        for batch_size, stats in results['inference']['batch_sizes'].items():
+            print(f"Inferencja, batch {batch_size}: {stats['latency_ms']:.3f} ms, "
+                  f"{stats['positions_per_sec']:.0f} pozycji/s")
+    for section in ('generator', 'training'):
+        if section in results:
+            stats = results[section]
+            if 'skipped' in stats:
+                print(f"{section}: pominięto ({stats['skipped']})")
+            else:
+                print(f"{section}: {stats['samples_per_sec']:.0f} próbek/s")
+
+
+def compare_reports(old, new):
+    """Wypisuje stosunek nowy/stary dla najważniejszych metryk (> 1 = szybciej)."""
+    print(f"\nPorównanie z {(old.get('commit') or '?')[:10]}:")
+    for section, metric in HEADLINE_METRICS:
+        old_value = old.get('results', {}).get(section, {}).get(metric)
+        new_value = new.get('results', {}).get(section, {}).get(metric)
+        if old_value and new_value:
+            print(f"  {section}.{metric}: {old_value:.0f} -> {new_value:.0f} ({new_value / old_value:.2f}x)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmarki przeszukiwania, kodera, inferencji i danych.")
+    parser.add_argument('--sections', nargs='+', default=list(SECTIONS), choices=SECTIONS)
+    parser.add_argument('--depths', nargs='+', type=int, default=list(DEFAULT_DEPTHS))
+    parser.add_argument('--batch-sizes', nargs='+', type=int, default=list(DEFAULT_BATCH_SIZES))
+    parser.add_argument('--model', default=MODEL_PATH)
+    parser.add_argument('--backend', default=DEFAULT_BACKEND)
+    parser.add_argument('--random-weights', action='store_true', help="Sieć z losowymi wagami zamiast modelu")
+    parser.add_argument('--quick', action='store_true', help="Mniejsze próbki (szybki test, mniej dokładny)")
+    parser.add_argument('--search-workers', type=int, default=1,
+                        help="Procesy przeszukiwania równoległego (porównaj z 1, żeby zmierzyć skalowanie)")
+    parser.add_argument('--parallel-workers', nargs='+', type=int, default=list(DEFAULT_PARALLEL_WORKERS),
+                        help="Liczby procesów w sekcji parallel (skalowanie na największej z --depths)")
+    parser.add_argument('--output', default='benchmark_results.json', help="Plik wynikowy JSON")
+    parser.add_argument('--compare', default=None, help="Wcześniejszy plik wynikowy do porównania")
+    args = parser.parse_args()
+
+    benchmark_report = run_benchmarks(args.sections, args.depths, args.batch_sizes, args.model, args.backend,
+                                      args.random_weights, args.quick, args.search_workers, args.parallel_workers)
+    print_report(benchmark_report)
+    if args.compare:
+        with open(args.compare) as f:
+            compare_reports(json.load(f), benchmark_report)
+    with open(args.output, 'w') as f:
+        json.dump(benchmark_report, f, indent=2)
+    print(f"\nWyniki zapisane do '{args.output}'")
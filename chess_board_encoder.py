@@ -0,0 +1,90 @@
+"""
+Wspólny koder szachownicy dla generatora danych i silnika AI.
+
+Reprezentacja (13x8x8, spłaszczona do 832 liczb float32):
+- warstwy 0-5: białe figury (pion, skoczek, goniec, wieża, hetman, król),
+- warstwy 6-11: czarne figury w tej samej kolejności,
+- warstwa 12: tura (same jedynki dla białych, same zera dla czarnych).
+Indeks w warstwie to numer pola python-chess (a1 = 0, h8 = 63), czyli rząd * 8 + kolumna.
+
+Zamiast pętli po 64 polach budujemy warstwy prosto z bitboardów i rozpakowujemy je
+przez np.unpackbits. Ta sama postać spakowana (12 bitboardów = 96 bajtów + bajt tury)
+służy jako zwarty format próbek na dysku.
+"""
+
+import chess
+import numpy as np
+
+PIECE_PLANES = 12
+INPUT_SIZE = (PIECE_PLANES + 1) * 64  # 832
+PACKED_SIZE = PIECE_PLANES * 8  # 96 bajtów bitboardów na pozycję
+
+
+def board_bitboards(board):
+    """Zwraca 12 bitboardów (int) w kolejności warstw reprezentacji."""
+    white = board.occupied_co[chess.WHITE]
+    black = board.occupied_co[chess.BLACK]
+    masks = (board.pawns, board.knights, board.bishops, board.rooks, board.queens, board.kings)
+    return [mask & white for mask in masks] + [mask & black for mask in masks]
+
+
+def _bitboard_bytes(board):
+    return b''.join(bitboard.to_bytes(8, 'little') for bitboard in board_bitboards(board))
+
+
+def pack_board(board):
+    """Zwarta postać pozycji: (96 bajtów bitboardów jako uint8, tura 1/0)."""
+    planes = np.frombuffer(_bitboard_bytes(board), dtype=np.uint8)
+    return planes, 1 if board.turn == chess.WHITE else 0
+
+
+def pack_boards(boards, planes_out=None, turn_out=None):
+    """Pakuje listę szachownic do tablic (N, 96) uint8 i (N,) uint8."""
+    count = len(boards)
+    if planes_out is None:
+        planes_out = np.empty((count, PACKED_SIZE), dtype=np.uint8)
+    if turn_out is None:
+        turn_out = np.empty(count, dtype=np.uint8)
+    if count:
+        planes_out[:count] = np.frombuffer(b''.join(_bitboard_bytes(board) for board in boards),
+                                           dtype=np.uint8).reshape(count, PACKED_SIZE)
+        turn_out[:count] = [1 if board.turn == chess.WHITE else 0 for board in boards]
+    return planes_out, turn_out
+
+
+def expand_packed(planes, turn, out=None):
+    """Rozwija spakowane pozycje (N, 96) + tura (N,) do wejścia sieci (N, 832) float32."""
+    planes = np.asarray(planes, dtype=np.uint8)
+    count = planes.shape[0]
+    if out is None:
+        out = np.empty((count, INPUT_SIZE), dtype=np.float32)
+    out[:count, :PIECE_PLANES * 64] = np.unpackbits(planes, axis=1, bitorder='little')
+    out[:count, PIECE_PLANES * 64:] = np.asarray(turn, dtype=np.float32)[:, None]
+    return out
+
+
+def pack_encoded(X):
+    """Odwrotność expand_packed: wejście sieci (N, 832) -> (N, 96) uint8 bitboardów i (N,) uint8 tury."""
+    X = np.asarray(X)
+    bits = X[:, :PIECE_PLANES * 64] > 0.5
+    planes = np.packbits(bits, axis=1, bitorder='little')
+    turn = (X[:, PIECE_PLANES * 64] > 0.5).astype(np.uint8)
+    return planes, turn
+
+
+def encode_board(board, out=None):
+    """Reprezentacja jednej pozycji jako wektor (832,) float32 (opcjonalnie zapisywana do `out`)."""
+    if out is None:
+        out = np.empty(INPUT_SIZE, dtype=np.float32)
+    bits = np.unpackbits(np.frombuffer(_bitboard_bytes(board), dtype=np.uint8), bitorder='little')
+    out[:PIECE_PLANES * 64] = bits
+    out[PIECE_PLANES * 64:] = 1.0 if board.turn == chess.WHITE else 0.0
+    return out
+
+
+def encode_boards(boards, out=None):
+    """Koduje listę pozycji do (wstępnie zaalokowanego) bufora (N, 832) float32."""
+    if out is None:
+        out = np.empty((len(boards), INPUT_SIZE), dtype=np.float32)
+    planes, turn = pack_boards(boards)
+    return expand_packed(planes, turn, out)
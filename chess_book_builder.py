@@ -0,0 +1,124 @@
+"""
+Budowanie książki otwarć Polyglot (.bin) z własnych partii PGN (np. z chess_match_runner.py --pgn).
+
+Dla każdej pozycji z pierwszych --max-ply półruchów zliczamy zagrane ruchy z wagą zależną od
+wyniku partii z perspektywy grającego (domyślnie wygrana 2, remis 1, przegrana 0). Zostają ruchy
+zagrane co najmniej --min-games razy; wagi w każdej pozycji skalujemy do zakresu 16 bitów.
+
+Format wpisu Polyglot (16 bajtów, big-endian): klucz Zobrista (8), ruch (2), waga (2), learn (4),
+wpisy posortowane po kluczu. Ruch: pole docelowe w bitach 0-5, startowe w 6-11, promocja w 12-14;
+roszada zapisywana jest jako "król bije własną wieżę" (e1h1, e1a1, e8h8, e8a8).
+
+Przykład:
+    python chess_book_builder.py mecz.pgn --output ksiazka.bin --max-ply 16
+"""
+
+import argparse
+import struct
+from collections import defaultdict
+
+import chess
+import chess.pgn
+import chess.polyglot
+
+DEFAULT_MAX_PLY = 20
+DEFAULT_MIN_GAMES = 2
+DEFAULT_RESULT_WEIGHTS = (2, 1, 0)  # Wygrana, remis, przegrana grającego ruch
+
+_ENTRY = struct.Struct('>QHHI')
+_PROMOTION_CODES = {None: 0, chess.KNIGHT: 1, chess.BISHOP: 2, chess.ROOK: 3, chess.QUEEN: 4}
+
+
+def polyglot_move(board, move):
+    """Kodowanie ruchu Polyglot (roszada jako ruch króla na pole wieży)."""
+    to_square = move.to_square
+    if board.is_castling(move) and board.piece_type_at(to_square) != chess.ROOK:
+        rank = chess.square_rank(move.from_square)
+        to_square = chess.square(7 if board.is_kingside_castling(move) else 0, rank)
+    return to_square | (move.from_square << 6) | (_PROMOTION_CODES[move.promotion] << 12)
+
+
+def _result_score(result, color):
+    """1 wygrana, 0.5 remis, 0 przegrana dla strony `color`; None dla nieznanego wyniku."""
+    if result == '1/2-1/2':
+        return 0.5
+    if result in ('1-0', '0-1'):
+        return 1.0 if (result == '1-0') == (color == chess.WHITE) else 0.0
+    return None
+
+
+def collect_moves(pgn_paths, max_ply=DEFAULT_MAX_PLY, result_weights=DEFAULT_RESULT_WEIGHTS):
+    """
+    Zlicza ruchy z partii: {klucz Zobrista: {kod ruchu: [waga, liczba partii]}}.
+    Partie bez wyniku ('*') są pomijane.
+    """
+    win_weight, draw_weight, loss_weight = result_weights
+    stats = defaultdict(lambda: defaultdict(lambda: [0, 0]))
+    games = 0
+    for path in pgn_paths:
+        with open(path, encoding='utf-8', errors='replace') as f:
+            while True:
+                game = chess.pgn.read_game(f)
+                if game is None:
+                    break
+                result = game.headers.get('Result', '*')
+                board = game.board()
+                if _result_score(result, chess.WHITE) is None:
+                    continue
+                games += 1
+                for move in game.mainline_moves():
+                    if board.ply() >= max_ply:
+                        break
+                    score = _result_score(result, board.turn)
+                    weight = win_weight if score == 1.0 else draw_weight if score == 0.5 else loss_weight
+                    entry = stats[chess.polyglot.zobrist_hash(board)][polyglot_move(board, move)]
+                    entry[0] += weight
+                    entry[1] += 1
+                    board.push(move)
+    return stats, games
+
+
+def build_entries(stats, min_games=DEFAULT_MIN_GAMES):
+    """Wpisy (klucz, ruch, waga) posortowane po kluczu, a w pozycji od największej wagi."""
+    entries = []
+    for key, moves in stats.items():
+        kept = [(code, weight) for code, (weight, count) in moves.items() if count >= min_games and weight > 0]
+        if not kept:
+            continue
+        max_weight = max(weight for _, weight in kept)
+        scale = min(1.0, 0xFFFF / max_weight)
+        for code, weight in kept:
+            entries.append((key, code, max(1, int(weight * scale))))
+    entries.sort(key=lambda entry: (entry[0], -entry[2], entry[1]))
+    return entries
+
+
+def write_book(entries, output_path):
+    with open(output_path, 'wb') as f:
+        for key, code, weight in entries:
+            f.write(_ENTRY.pack(key, code, weight, 0))
+
+
+def build_book(pgn_paths, output_path, max_ply=DEFAULT_MAX_PLY, min_games=DEFAULT_MIN_GAMES,
+               result_weights=DEFAULT_RESULT_WEIGHTS):
+    stats, games = collect_moves(pgn_paths, max_ply, result_weights)
+    entries = build_entries(stats, min_games)
+    write_book(entries, output_path)
+    positions = len({key for key, _, _ in entries})
+    print(f"Książka '{output_path}': {games} partii, {positions} pozycji, {len(entries)} wpisów "
+          f"({len(entries) * _ENTRY.size / 1024:.1f} KB)")
+    return entries
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Buduje książkę otwarć Polyglot z partii PGN.")
+    parser.add_argument('pgn', nargs='+', help="Pliki PGN (np. z chess_match_runner.py --pgn)")
+    parser.add_argument('--output', default='book.bin')
+    parser.add_argument('--max-ply', type=int, default=DEFAULT_MAX_PLY, help="Ile półruchów od początku partii")
+    parser.add_argument('--min-games', type=int, default=DEFAULT_MIN_GAMES,
+                        help="Minimalna liczba partii, w których zagrano ruch")
+    parser.add_argument('--weights', type=int, nargs=3, default=list(DEFAULT_RESULT_WEIGHTS),
+                        metavar=('WYGRANA', 'REMIS', 'PRZEGRANA'), help="Wagi ruchu zależnie od wyniku partii")
+    args = parser.parse_args()
+
+    build_book(args.pgn, args.output, args.max_ply, args.min_games, tuple(args.weights))
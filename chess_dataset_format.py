@@ -0,0 +1,291 @@
+"""
+Binarny format zbioru danych (.chessds) zamiast pickle z wejściami float32.
+
+Pickle trzyma każdą pozycję jako 832 liczby float32 (3.3 KB) i trzeba go wczytać w całości.
+Warstwy są binarne, więc wystarczy rekord SAMPLE_DTYPE: 12 bitboardów (96 B), tura (1 B)
+i ocena (4 B) = 101 B, a po kompresji zlib (bitboardy to głównie zera) jeszcze kilka razy mniej.
+
+Układ pliku (little-endian):
+- nagłówek (64 B): magia b'CHDS', wersja, rozmiar rekordu, rekordów w kawałku, liczba rekordów,
+  liczba kawałków, kompresja, przesunięcie indeksu,
+- kawałki: po `chunk_records` rekordów, każdy kompresowany osobno,
+- indeks: dla każdego kawałka (przesunięcie, rozmiar po kompresji, liczba rekordów, crc32).
+
+Indeks pozwala czytać dowolny rekord bez rozpakowywania reszty pliku (dostęp losowy),
+a czytnik rozwija rekordy do wejścia sieci (N, 832) dopiero przy odczycie.
+
+Konwersja:
+    python chess_dataset_format.py chess_data.pkl chess_data.chessds
+    python chess_dataset_format.py chess_data_shards chess_data.chessds
+    python chess_dataset_format.py chess_data.chessds chess_data.pkl
+"""
+
+import argparse
+import os
+import pickle
+import struct
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+from chess_board_encoder import expand_packed, pack_encoded
+from chess_dataset_generator import SAMPLE_DTYPE, list_shards
+
+DATASET_EXTENSION = '.chessds'
+FORMAT_VERSION = 1
+MAGIC = b'CHDS'
+DEFAULT_CHUNK_RECORDS = 16384  # ~1.6 MB przed kompresją
+DEFAULT_COMPRESSION_LEVEL = 6
+CHUNK_CACHE_SIZE = 4  # Ile rozpakowanych kawałków trzyma czytnik (dla dostępu losowego)
+
+COMPRESSION_NONE = 0
+COMPRESSION_ZLIB = 1
+
+_HEADER = struct.Struct('<4sHHIQIB3xQ')
+HEADER_SIZE = 64
+_INDEX_DTYPE = np.dtype([('offset', '<u8'), ('size', '<u4'), ('records', '<u4'), ('crc', '<u4')])
+
+
+class DatasetWriter:
+    """
+    Zapis rekordów SAMPLE_DTYPE kawałkami; plik powstaje atomowo (plik tymczasowy + os.replace)
+    przy close(). Można używać jako menedżera kontekstu.
+    """
+
+    def __init__(self, path, chunk_records=DEFAULT_CHUNK_RECORDS, compression_level=DEFAULT_COMPRESSION_LEVEL):
+        self.path = path
+        self.chunk_records = max(1, int(chunk_records))
+        self.compression_level = compression_level
+        self._tmp_path = path + '.tmp'
+        self._file = open(self._tmp_path, 'wb')
+        self._file.write(b'\0' * HEADER_SIZE)
+        self._pending = []
+        self._pending_count = 0
+        self._index = []
+        self.count = 0
+
+    def write(self, records):
+        records = np.asarray(records, dtype=SAMPLE_DTYPE)
+        self._pending.append(records)
+        self._pending_count += len(records)
+        while self._pending_count >= self.chunk_records:
+            self._write_chunk(self.chunk_records)
+
+    def _write_chunk(self, size):
+        records = np.concatenate(self._pending)
+        chunk, rest = records[:size], records[size:]
+        self._pending, self._pending_count = [rest], len(rest)
+        raw = chunk.tobytes()
+        data = zlib.compress(raw, self.compression_level) if self.compression_level else raw
+        self._index.append((self._file.tell(), len(data), len(chunk), zlib.crc32(data)))
+        self._file.write(data)
+        self.count += len(chunk)
+
+    def close(self):
+        if self._file is None:
+            return
+        if self._pending_count:
+            self._write_chunk(self._pending_count)
+        index_offset = self._file.tell()
+        self._file.write(np.array(self._index, dtype=_INDEX_DTYPE).tobytes())
+        compression = COMPRESSION_ZLIB if self.compression_level else COMPRESSION_NONE
+        header = _HEADER.pack(MAGIC, FORMAT_VERSION, SAMPLE_DTYPE.itemsize, self.chunk_records, self.count,
+                              len(self._index), compression, index_offset)
+        self._file.seek(0)
+        self._file.write(header.ljust(HEADER_SIZE, b'\0'))
+        self._file.close()
+        self._file = None
+        os.replace(self._tmp_path, self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self._file.close()
+            self._file = None
+            os.remove(self._tmp_path)
+
+
+class DatasetReader:
+    """
+    Odczyt pliku .chessds: len(), reader[i] / reader[i:j] / reader.take(indeksy) zwracają
+    rekordy SAMPLE_DTYPE, a batches() - gotowe wejście sieci (X float32 (N, 832), y).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._lock = threading.Lock()
+        header = self._file.read(HEADER_SIZE)
+        if len(header) < HEADER_SIZE or header[:4] != MAGIC:
+            raise ValueError(f"'{path}' nie jest plikiem zbioru danych {DATASET_EXTENSION}")
+        (_, self.version, record_size, self.chunk_records, self.count, chunks, self.compression,
+         index_offset) = _HEADER.unpack(header[:_HEADER.size])
+        if self.version > FORMAT_VERSION:
+            raise ValueError(f"Nieobsługiwana wersja formatu {self.version} (obsługiwana: {FORMAT_VERSION})")
+        if record_size != SAMPLE_DTYPE.itemsize:
+            raise ValueError(f"Rozmiar rekordu {record_size} B nie pasuje do SAMPLE_DTYPE ({SAMPLE_DTYPE.itemsize} B)")
+        self._file.seek(index_offset)
+        self.index = np.frombuffer(self._file.read(chunks * _INDEX_DTYPE.itemsize), dtype=_INDEX_DTYPE)
+        # Numer pierwszego rekordu każdego kawałka (do wyszukiwania kawałka po indeksie rekordu)
+        self._chunk_starts = np.concatenate([[0], np.cumsum(self.index['records'], dtype=np.int64)])
+        self._cache = OrderedDict()
+
+    def __len__(self):
+        return int(self.count)
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+
+    def read_chunk(self, chunk_index):
+        """Rekordy jednego kawałka (ostatnio używane kawałki są trzymane w pamięci)."""
+        with self._lock:
+            records = self._cache.get(chunk_index)
+            if records is not None:
+                self._cache.move_to_end(chunk_index)
+                return records
+            entry = self.index[chunk_index]
+            self._file.seek(int(entry['offset']))
+            data = self._file.read(int(entry['size']))
+        if zlib.crc32(data) != int(entry['crc']):
+            raise ValueError(f"Uszkodzony kawałek {chunk_index} w '{self.path}' (niezgodna suma crc32)")
+        if self.compression == COMPRESSION_ZLIB:
+            data = zlib.decompress(data)
+        records = np.frombuffer(data, dtype=SAMPLE_DTYPE)
+        with self._lock:
+            self._cache[chunk_index] = records
+            if len(self._cache) > CHUNK_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return records
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return self.take(np.arange(len(self))[key])
+        index = int(key)
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(f"Indeks {key} poza zakresem (rekordów: {len(self)})")
+        chunk_index = int(np.searchsorted(self._chunk_starts, index, side='right')) - 1
+        return self.read_chunk(chunk_index)[index - self._chunk_starts[chunk_index]]
+
+    def take(self, indices):
+        """Rekordy o podanych indeksach (w tej samej kolejności); każdy kawałek czytany raz."""
+        indices = np.asarray(indices, dtype=np.int64)
+        if indices.size and (indices.min() < 0 or indices.max() >= len(self)):
+            raise IndexError(f"Indeks poza zakresem (rekordów: {len(self)})")
+        out = np.empty(len(indices), dtype=SAMPLE_DTYPE)
+        chunk_ids = np.searchsorted(self._chunk_starts, indices, side='right') - 1
+        for chunk_index in np.unique(chunk_ids):
+            selected = np.nonzero(chunk_ids == chunk_index)[0]
+            out[selected] = self.read_chunk(int(chunk_index))[indices[selected] - self._chunk_starts[chunk_index]]
+        return out
+
+    def iter_chunks(self, chunk_ids=None):
+        for chunk_index in (range(len(self.index)) if chunk_ids is None else chunk_ids):
+            yield self.read_chunk(int(chunk_index))
+
+    def batches(self, batch_size, shuffle=False, seed=None, chunk_ids=None):
+        """
+        Batche (X (N, 832) float32, y (N,) float32) rozwijane w locie. Z `shuffle` mieszamy
+        kolejność kawałków i rekordy w obrębie kawałka - w pamięci jest zawsze tylko jeden kawałek.
+        """
+        rng = np.random.default_rng(seed)
+        chunk_ids = np.arange(len(self.index)) if chunk_ids is None else np.asarray(chunk_ids)
+        if shuffle:
+            chunk_ids = rng.permutation(chunk_ids)
+        for records in self.iter_chunks(chunk_ids):
+            if shuffle:
+                records = records[rng.permutation(len(records))]
+            for start in range(0, len(records), batch_size):
+                batch = records[start:start + batch_size]
+                yield expand_packed(batch['planes'], batch['turn']), batch['y'].copy()
+
+    def read_all(self):
+        """Wszystkie rekordy jako jedna tablica SAMPLE_DTYPE."""
+        if not len(self.index):
+            return np.empty(0, dtype=SAMPLE_DTYPE)
+        return np.concatenate(list(self.iter_chunks()))
+
+
+def records_from_arrays(X, y):
+    """Rekordy SAMPLE_DTYPE z wejść sieci (N, 832) i ocen (N,)."""
+    records = np.empty(len(X), dtype=SAMPLE_DTYPE)
+    records['planes'], records['turn'] = pack_encoded(X)
+    records['y'] = y
+    return records
+
+
+def pickle_to_dataset(pickle_path, output_path, chunk_records=DEFAULT_CHUNK_RECORDS):
+    with open(pickle_path, 'rb') as f:
+        data = pickle.load(f)
+    with DatasetWriter(output_path, chunk_records) as writer:
+        writer.write(records_from_arrays(data['X'], data['y']))
+    return writer.count
+
+
+def shards_to_dataset(shard_dir, output_path, chunk_records=DEFAULT_CHUNK_RECORDS):
+    """Łączy shardy .npy z chess_dataset_generator / chess_pgn_ingest w jeden plik (shard po shardzie)."""
+    with DatasetWriter(output_path, chunk_records) as writer:
+        for path in list_shards(shard_dir):
+            writer.write(np.load(path, mmap_mode='r'))
+    return writer.count
+
+
+def dataset_to_pickle(dataset_path, pickle_path):
+    """Odwrotna konwersja do formatu {'X': (N, 832) float32, 'y': (N,)} czytanego przez train_model."""
+    with DatasetReader(dataset_path) as reader:
+        records = reader.read_all()
+    X = expand_packed(records['planes'], records['turn'])
+    with open(pickle_path, 'wb') as f:
+        pickle.dump({'X': X, 'y': records['y'].astype(np.float64)}, f)
+    return len(records)
+
+
+def _timed_load(path):
+    start = time.perf_counter()
+    if path.endswith(DATASET_EXTENSION):
+        with DatasetReader(path) as reader:
+            count = sum(len(X) for X, _ in reader.batches(DEFAULT_CHUNK_RECORDS))
+    else:
+        with open(path, 'rb') as f:
+            count = len(pickle.load(f)['y'])
+    return count, time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=f"Konwersja zbioru danych między pickle / shardami a {DATASET_EXTENSION}.")
+    parser.add_argument('input', help=f"Plik .pkl, katalog shardów albo plik {DATASET_EXTENSION}")
+    parser.add_argument('output', help=f"Plik {DATASET_EXTENSION} (albo .pkl przy konwersji odwrotnej)")
+    parser.add_argument('--chunk-records', type=int, default=DEFAULT_CHUNK_RECORDS, help="Rekordów w kawałku")
+    args = parser.parse_args()
+
+    if args.input.endswith(DATASET_EXTENSION):
+        converted = dataset_to_pickle(args.input, args.output)
+    elif os.path.isdir(args.input):
+        converted = shards_to_dataset(args.input, args.output, args.chunk_records)
+    else:
+        converted = pickle_to_dataset(args.input, args.output, args.chunk_records)
+
+    input_size = (sum(os.path.getsize(path) for path in list_shards(args.input)) if os.path.isdir(args.input)
+                  else os.path.getsize(args.input))
+    output_size = os.path.getsize(args.output)
+    ratio = max(input_size, output_size) / max(1, min(input_size, output_size))
+    print(f"Skonwertowano {converted} próbek: {input_size / 1e6:.1f} MB -> {output_size / 1e6:.1f} MB "
+          f"({ratio:.1f}x {'mniej' if output_size <= input_size else 'więcej'})")
+    for path in (args.input, args.output):
+        if not os.path.isdir(path):
+            count, elapsed = _timed_load(path)
+            print(f"Wczytanie '{path}' ({count} próbek, do wejścia float32): {elapsed:.2f} s")
@@ -1,7 +1,34 @@
+import argparse
 import chess
 import numpy as np
 import random
 import pickle
+import os
+import time
+from collections import Counter, deque
+from multiprocessing import Pool
+
+from chess_board_encoder import encode_board, pack_board, PACKED_SIZE
+from chess_position_filter import DEFAULT_ERROR_RATE, DEFAULT_EXACT_LIMIT, ExactKeySet, create_filter
+from chess_transposition import position_key
+
+DATA_PATH = 'chess_data.pkl'
+SHARD_DIR = 'chess_data_shards'
+SHARD_PATTERN = 'shard_{:06d}.npy'
+DEFAULT_SHARD_SIZE = 100000
+
+# Rekord próbki w shardzie: spakowane bitboardy (96 B), tura (1 B) i ocena (4 B) = 101 B zamiast 3.3 KB
+SAMPLE_DTYPE = np.dtype([('planes', np.uint8, (PACKED_SIZE,)), ('turn', np.uint8), ('y', np.float32)])
+
+# Fazy partii według materiału bez pionów (obie strony razem, na starcie 62)
+PHASES = ('otwarcie', 'gra środkowa', 'końcówka')
+PHASE_MATERIAL = (46, 20)  # >= 46 otwarcie, >= 20 gra środkowa, mniej - końcówka
+STRATUM_PROBE_GAMES = 500  # Partie próbne, z których szacujemy, jak często losowa gra trafia w warstwę
+STRATUM_MIN_RATE = 0.02  # Warstwy odwiedzane rzadziej (odsetek partii) są pomijane z ostrzeżeniem
+MAX_CANDIDATES_FACTOR = 20  # Deduplikacja kończy się po tylu kandydatach na jedną żądaną próbkę
+
+# Metadane próbki (tylko w pamięci, nie trafiają do shardów)
+INFO_DTYPE = np.dtype([('key', np.uint64), ('ply', np.uint16), ('phase', np.uint8)])
 
 
 def create_board_representation(board):
@@ -9,89 +36,413 @@ def create_board_representation(board):
     Tworzy uproszczoną wektorową reprezentację szachownicy dla sieci neuronowej.
     Dla każdej figury (6 typów * 2 kolory = 12) tworzymy warstwę 8x8,
     a także warstwę dla tury. Sumarycznie 13x8x8.
+    Kodowanie jest wspólne z silnikiem AI (chess_board_encoder), więc nie może się rozjechać.
     """
-    representation = np.zeros((13, 8, 8), dtype=np.float32)
-
-    piece_to_index = {
-        chess.PAWN: 0, chess.KNIGHT: 1, chess.BISHOP: 2,
-        chess.ROOK: 3, chess.QUEEN: 4, chess.KING: 5
-    }
-
-    for square in chess.SQUARES:
-        piece = board.piece_at(square)
-        if piece:
-            row, col = chess.square_rank(square), chess.square_file(square)
-            piece_idx = piece_to_index[piece.piece_type]
-
-            # Warstwy dla białych figur (0-5)
-            if piece.color == chess.WHITE:
-                representation[piece_idx, row, col] = 1.0
-            # Warstwy dla czarnych figur (6-11)
-            else:
-                representation[piece_idx + 6, row, col] = 1.0
-
-    # Warstwa dla tury (12)
-    if board.turn == chess.WHITE:
-        representation[12, :, :] = 1.0  # Cała warstwa na 1 jeśli białe
-    else:
-        representation[12, :, :] = 0.0  # Cała warstwa na 0 jeśli czarne
+    return encode_board(board)
+
 
-    return representation.flatten()  # Spłaszczamy do jednowymiarowego wektora
+def random_legal_move(board, rng, attempts=8):
+    """
+    Losowy legalny ruch bez budowania pełnej listy legalnych ruchów.
+    Losujemy spośród ruchów pseudolegalnych (tańszych w generowaniu) i sprawdzamy legalność;
+    odrzucanie zachowuje równomierny rozkład. Po kilku nieudanych próbach (np. szach)
+    wracamy do pełnej listy. Zwraca None, jeśli gra jest skończona.
+    """
+    moves = list(board.generate_pseudo_legal_moves())
+    for _ in range(attempts):
+        if not moves:
+            break
+        move = moves[rng.randrange(len(moves))]
+        if board.is_legal(move):
+            return move
+    legal_moves = list(board.legal_moves)
+    return rng.choice(legal_moves) if legal_moves else None
 
 
-def generate_synthetic_data(num_samples=1000):
+def play_random_position(board, rng, plies=None):
+    """Ustawia na `board` pozycję po `plies` (domyślnie 1-20) losowych ruchach od startu i zwraca jej "ocenę"."""
+    board.reset()
+    # Wykonaj losową liczbę ruchów, aby uzyskać różne pozycje
+    for _ in range(plies if plies is not None else rng.randint(1, 20)):
+        move = random_legal_move(board, rng)
+        if move is None:
+            break  # Gra skończona
+        board.push(move)
+    return score_position(board, rng)
+
+
+def score_position(board, rng):
+    """"Ocena" pozycji na `board` (mat/pat/remis albo losowa)."""
+    # Przypisz "ocenę" pozycji - tym razem symulujemy, że białe mają 1, czarne -1, remis 0
+    # TO JEST BARDZO UPROSZCZONA I NIEREALISTYCZNA OCENA DLA CELÓW DEMONSTRACYJNYCH
+    if board.is_checkmate():
+        # Jeśli białe matują, to +1; jeśli czarne matują, to -1.
+        return 1.0 if board.turn == chess.BLACK else -1.0  # Wygrywa ten, kto matuje
+    elif board.is_stalemate():
+        return 0.0
+    elif board.is_insufficient_material():
+        return 0.0
+    # Losowa ocena dla pozycji w trakcie gry - ZUPEŁNIE LOSOWA!
+    # W PRAWDZIE: Ocena jest generowana przez silnik szachowy lub sieć neuronową.
+    return rng.uniform(-1.0, 1.0)
+
+
+def material_phase(board):
+    """Indeks fazy partii w PHASES na podstawie materiału bez pionów (obie strony razem)."""
+    material = (3 * chess.popcount(board.knights | board.bishops) + 5 * chess.popcount(board.rooks)
+                + 9 * chess.popcount(board.queens))
+    if material >= PHASE_MATERIAL[0]:
+        return 0
+    return 1 if material >= PHASE_MATERIAL[1] else 2
+
+
+class StratifiedSampler:
+    """
+    Pozycje w zadanych proporcjach warstw: przedziałów liczby półruchów i (z `phase_weights`) faz partii.
+    `ply_edges` to granice przedziałów [e0, e1), [e1, e2), ...; udział warstwy jest proporcjonalny do
+    iloczynu wagi przedziału i wagi fazy. Gramy losowe partie do ostatniej granicy, z każdej bierzemy
+    najwyżej jedną pozycję na warstwę (losową spośród odwiedzonych) i wydajemy ją tylko wtedy, gdy
+    warstwa ma niedobór względem swojego udziału - rzadkie warstwy nie są zastępowane innymi.
+    calibrate() pomija warstwy, do których losowa gra prawie nie dociera (np. końcówka po 10 półruchach);
+    raport generatora ostrzega o nich i o warstwach, których udział wyszedł za mały.
+    Domyślnie jeden przedział 1-20 bez faz: dokładnie play_random_position (te same dane co wcześniej).
+    """
+
+    def __init__(self, ply_edges=(1, 21), ply_weights=None, phase_weights=None):
+        self.ply_edges = [int(edge) for edge in ply_edges]
+        if len(self.ply_edges) < 2 or self.ply_edges[0] < 1 or any(
+                low >= high for low, high in zip(self.ply_edges, self.ply_edges[1:])):
+            raise ValueError(f"Granice przedziałów półruchów muszą być rosnące i >= 1: {ply_edges}")
+        self.buckets = list(zip(self.ply_edges, self.ply_edges[1:]))
+        ply_weights = list(ply_weights) if ply_weights else [1.0] * len(self.buckets)
+        if len(ply_weights) != len(self.buckets):
+            raise ValueError(f"Podano {len(ply_weights)} wag dla {len(self.buckets)} przedziałów półruchów")
+        self.phase_weights = list(phase_weights) if phase_weights else None
+        if self.phase_weights is not None and len(self.phase_weights) != len(PHASES):
+            raise ValueError(f"Wagi faz muszą mieć {len(PHASES)} elementy ({', '.join(PHASES)})")
+        weights = np.outer(ply_weights, self.phase_weights or [1.0]).ravel()
+        if (weights < 0).any() or not weights.sum():
+            raise ValueError("Wagi warstw muszą być nieujemne i nie wszystkie zerowe")
+        self.shares = weights / weights.sum()  # Udziały docelowe podane przez użytkownika
+        self.targets = self.shares.copy()  # Udziały po pominięciu nieosiągalnych warstw (calibrate)
+        self.reach = None  # Odsetek partii próbnych, które odwiedziły warstwę
+        # Przedział dla każdego półruchu 0..ostatnia granica (-1 = poza przedziałami)
+        self._bucket_by_ply = self.bucket_of(np.arange(self.ply_edges[-1])).tolist()
+        for ply in range(self.ply_edges[0]):
+            self._bucket_by_ply[ply] = -1
+
+    @property
+    def plain(self):
+        """Jeden przedział bez faz - każda próbka to osobna partia (jak play_random_position)."""
+        return len(self.buckets) == 1 and self.phase_weights is None
+
+    def bucket_labels(self):
+        return [f"{low}-{high - 1}" for low, high in self.buckets]
+
+    def bucket_of(self, plies):
+        """Indeksy przedziałów dla tablicy liczb półruchów (partie zakończone wcześniej trafiają do niższych)."""
+        index = np.searchsorted(self.ply_edges, plies, side='right') - 1
+        return np.clip(index, 0, len(self.buckets) - 1)
+
+    def stratum_of(self, bucket, phase):
+        return bucket * len(PHASES) + phase if self.phase_weights is not None else bucket
+
+    def stratum_label(self, stratum):
+        if self.phase_weights is None:
+            return self.bucket_labels()[stratum]
+        bucket, phase = divmod(stratum, len(PHASES))
+        return f"{self.bucket_labels()[bucket]} / {PHASES[phase]}"
+
+    def _play_game(self, board, rng, keep=True):
+        """Jedna losowa partia; zwraca {warstwa: (liczba odwiedzin, kopia losowo wybranej pozycji)}."""
+        picks = {}
+        board.reset()
+        for ply in range(1, self.ply_edges[-1]):
+            move = random_legal_move(board, rng)
+            if move is None:
+                break  # Gra skończona
+            board.push(move)
+            bucket = self._bucket_by_ply[ply]
+            if bucket < 0:
+                continue
+            stratum = self.stratum_of(bucket, material_phase(board))
+            if not self.targets[stratum]:
+                continue
+            count, chosen = picks.get(stratum, (0, None))
+            count += 1
+            # Losowanie z rezerwuarem: każda odwiedzona pozycja warstwy ma tę samą szansę
+            if keep and rng.randrange(count) == 0:
+                chosen = board.copy(stack=False)
+            picks[stratum] = (count, chosen)
+        return picks
+
+    def calibrate(self, rng):
+        """Szacuje osiągalność warstw na STRATUM_PROBE_GAMES partiach i pomija te poniżej STRATUM_MIN_RATE."""
+        if self.plain or self.reach is not None:
+            return
+        self.targets = self.shares.copy()
+        visits = np.zeros(len(self.shares))
+        board = chess.Board()
+        for _ in range(STRATUM_PROBE_GAMES):
+            for stratum in self._play_game(board, rng, keep=False):
+                visits[stratum] += 1
+        self.reach = visits / STRATUM_PROBE_GAMES
+        self.targets[self.reach < STRATUM_MIN_RATE] = 0.0
+        if not self.targets.sum():
+            raise ValueError("Losowe partie nie docierają do żadnej warstwy o dodatniej wadze")
+        self.targets /= self.targets.sum()
+
+    def positions(self, rng):
+        """Nieskończony strumień (plansza, "ocena"); plansza jest ważna do pobrania następnej pozycji."""
+        board = chess.Board()
+        if self.plain:
+            low, high = self.buckets[0]
+            while True:
+                yield board, play_random_position(board, rng, rng.randrange(low, high))
+        self.calibrate(rng)
+        emitted = np.zeros(len(self.targets))
+        total = 0
+        while True:
+            picks = self._play_game(board, rng)
+            # Najpierw warstwy z największym niedoborem; nadmiarowe pozycje z tej partii przepadają
+            for stratum in sorted(picks, key=lambda s: emitted[s] - self.targets[s] * total):
+                if emitted[stratum] < self.targets[stratum] * (total + 1):
+                    chosen = picks[stratum][1]
+                    emitted[stratum] += 1
+                    total += 1
+                    yield chosen, score_position(chosen, rng)
+
+
+def _position_info(board):
+    return position_key(board), board.ply(), material_phase(board)
+
+
+def _print_report(candidates, unique, key_filter, strata, sampler):
+    """
+    Raport: odsetek unikalnych pozycji, użyty filtr, liczności warstw (przedział półruchów x faza)
+    i ostrzeżenia o warstwach pominiętych albo z udziałem wyraźnie poniżej docelowego.
+    """
+    if key_filter is not None:
+        kind = 'dokładny zbiór' if isinstance(key_filter, ExactKeySet) else \
+            f"filtr Blooma ({key_filter.hashes} funkcji skrótu)"
+        print(f"Unikalne pozycje: {unique}/{candidates} ({unique / max(1, candidates):.1%}), "
+              f"{kind}, ~{key_filter.memory_bytes() / 2 ** 20:.2f} MB")
+    labels = sampler.bucket_labels()
+    print("Próbki w warstwach (półruchy / " + " / ".join(PHASES) + "):")
+    for bucket, label in enumerate(labels):
+        counts = [strata[bucket, phase] for phase in range(len(PHASES))]
+        print(f"  {label:>9}: " + " / ".join(str(count) for count in counts))
+
+    if sampler.plain:
+        return
+    achieved = np.zeros(len(sampler.shares))
+    for (bucket, phase), count in strata.items():
+        achieved[sampler.stratum_of(bucket, phase)] += count
+    achieved /= max(1, unique)
+    for stratum, share in enumerate(sampler.shares):
+        if not share:
+            continue
+        if not sampler.targets[stratum]:
+            print(f"Uwaga: warstwa {sampler.stratum_label(stratum)} pominięta - losowe partie docierają do niej "
+                  f"w {sampler.reach[stratum]:.1%} przypadków (cel {share:.1%})")
+        elif achieved[stratum] < 0.8 * share:
+            print(f"Uwaga: warstwa {sampler.stratum_label(stratum)} niedopełniona: "
+                  f"{achieved[stratum]:.1%} próbek zamiast {share:.1%}")
+
+
+def generate_synthetic_data(num_samples=1000, dedup=False, sampler=None):
     """
     Generuje syntetyczne dane: pozycje na szachownicy i ich "losowe" oceny.
     To jest tylko dla celów DEMONSTRACYJNYCH.
     W PRAWDZIWEJ aplikacji:
     - używałbyś prawdziwych partii PGN
     - ocena byłaby wynikiem głębokiej analizy Stockfisha lub samogrania AlphaZero.
+    Trzyma wszystko w pamięci i zapisuje jeden plik pickle - dla dużych zbiorów
+    użyj generate_sharded_data.
     """
+    sampler = sampler or StratifiedSampler()
+    key_filter = ExactKeySet() if dedup else None
+    max_candidates = num_samples * MAX_CANDIDATES_FACTOR if dedup else num_samples
     data_X = []
     data_y = []
+    strata = Counter()
 
-    board = chess.Board()
-
-    for _ in range(num_samples):
-        # Wykonaj losową liczbę ruchów, aby uzyskać różne pozycje
-        for _ in range(random.randint(1, 20)):
-            if board.legal_moves:
-                move = random.choice(list(board.legal_moves))
-                board.push(move)
-            else:
-                break  # Gra skończona
+    candidates = 0
+    positions = sampler.positions(random)
+    while len(data_y) < num_samples and candidates < max_candidates:
+        board, score = next(positions)
+        candidates += 1
+        key, plies, phase = _position_info(board)
+        if key_filter is not None and not key_filter.add_many([key])[0]:
+            continue  # Ta pozycja już jest w zbiorze
 
         # Zapisz reprezentację pozycji
         data_X.append(create_board_representation(board))
-
-        # Przypisz "ocenę" pozycji - tym razem symulujemy, że białe mają 1, czarne -1, remis 0
-        # TO JEST BARDZO UPROSZCZONA I NIEREALISTYCZNA OCENA DLA CELÓW DEMONSTRACYJNYCH
-        if board.is_checkmate():
-            # Jeśli białe matują, to +1; jeśli czarne matują, to -1.
-            score = 1.0 if board.turn == chess.BLACK else -1.0  # Wygrywa ten, kto matuje
-        elif board.is_stalemate():
-            score = 0.0
-        elif board.is_insufficient_material():
-            score = 0.0
-        else:
-            # Losowa ocena dla pozycji w trakcie gry - ZUPEŁNIE LOSOWA!
-            # W PRAWDZIE: Ocena jest generowana przez silnik szachowy lub sieć neuronową.
-            score = random.uniform(-1.0, 1.0)
-
         data_y.append(score)
-
-        board.reset()  # Resetuj szachownicę dla kolejnej próbki
+        strata[int(sampler.bucket_of(plies)), phase] += 1
 
     X = np.array(data_X)
     y = np.array(data_y)
 
     # Zapisz dane do pliku
-    with open('chess_data.pkl', 'wb') as f:
+    with open(DATA_PATH, 'wb') as f:
         pickle.dump({'X': X, 'y': y}, f)
 
-    print(f"Wygenerowano {num_samples} syntetycznych próbek danych.")
+    if len(y) < num_samples:
+        print(f"Uwaga: po {candidates} kandydatach zebrano tylko {len(y)} unikalnych pozycji.")
+    print(f"Wygenerowano {len(y)} syntetycznych próbek danych.")
     print(f"Kształt X: {X.shape}, Kształt y: {y.shape}")
+    _print_report(candidates, len(y), key_filter, strata, sampler)
+
+
+def shard_seed(seed, shard_index):
+    """Ziarno dla danego sharda - zależy tylko od ziarna bazowego i numeru sharda, nie od liczby procesów."""
+    return int(np.random.SeedSequence([seed, shard_index]).generate_state(1)[0])
+
+
+def _generate_shard(task):
+    """
+    Praca jednego procesu: generuje kompletny shard próbek w formacie SAMPLE_DTYPE
+    oraz INFO_DTYPE (klucz pozycji, liczba półruchów, faza) dla deduplikacji i raportu.
+    """
+    shard_index, num_samples, seed, sampler = task
+    rng = random.Random(shard_seed(seed, shard_index))
+    records = np.empty(num_samples, dtype=SAMPLE_DTYPE)
+    info = np.empty(num_samples, dtype=INFO_DTYPE)
+    for i, (board, score) in zip(range(num_samples), sampler.positions(rng)):
+        records['y'][i] = score
+        records['planes'][i], records['turn'][i] = pack_board(board)
+        info[i] = _position_info(board)
+    return shard_index, records, info
+
+
+def write_shard(records, output_dir, shard_index):
+    """Zapisuje shard jako .npy (atomowo przez plik tymczasowy), żeby dało się go czytać przez mmap."""
+    path = os.path.join(output_dir, SHARD_PATTERN.format(shard_index))
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.save(f, records)
+    os.replace(tmp_path, path)
+    return path
+
+
+def list_shards(data_dir):
+    """Posortowana lista plików shardów w katalogu."""
+    return sorted(os.path.join(data_dir, name) for name in os.listdir(data_dir)
+                  if name.startswith('shard_') and name.endswith('.npy'))
+
+
+def generate_sharded_data(num_samples, output_dir=SHARD_DIR, shard_size=DEFAULT_SHARD_SIZE, workers=None, seed=0,
+                          dedup=False, sampler=None, exact_limit=DEFAULT_EXACT_LIMIT, error_rate=DEFAULT_ERROR_RATE):
+    """
+    Równoległe generowanie danych: każdy shard powstaje w osobnym procesie (z własnym ziarnem)
+    i jest od razu zapisywany na dysk, więc zużycie pamięci nie zależy od liczby próbek.
+    Z dedup=True powtórzone pozycje (ten sam position_key) są odrzucane, a zadania generowane dalej,
+    aż zbierze się num_samples unikalnych próbek (najwyżej MAX_CANDIDATES_FACTOR razy więcej kandydatów).
+    Do `exact_limit` próbek filtrem jest dokładny zbiór, powyżej filtr Blooma z `error_rate`.
+    Wyniki zadań są odbierane po kolei, więc shardy zależą tylko od ziarna, nie od liczby procesów.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    sampler = sampler or StratifiedSampler()
+    # Osiągalność warstw szacujemy raz, tutaj - procesy dostają już skalibrowany sampler
+    sampler.calibrate(random.Random(seed))
+    key_filter = create_filter(num_samples, exact_limit, error_rate) if dedup else None
+    max_candidates = num_samples * MAX_CANDIDATES_FACTOR if dedup else num_samples
+    tasks = ((shard_index, min(shard_size, max_candidates - start), seed, sampler)
+             for shard_index, start in enumerate(range(0, max_candidates, shard_size)))
+    expected_shards = (num_samples + shard_size - 1) // shard_size
+
+    start_time = time.perf_counter()
+    candidates = 0
+    written = 0
+    shard_count = 0
+    buffered = []
+    buffered_count = 0
+    strata = Counter()
+
+    def flush(count):
+        nonlocal buffered, buffered_count, written, shard_count
+        records = np.concatenate(buffered)
+        write_shard(records[:count], output_dir, shard_count)
+        buffered = [records[count:]]
+        buffered_count -= count
+        written += count
+        shard_count += 1
+        elapsed = time.perf_counter() - start_time
+        print(f"Shard {shard_count}/{expected_shards} zapisany ({written}/{num_samples} próbek, "
+              f"{written / elapsed:.0f} próbek/s)")
+
+    with Pool(processes=workers) as pool:
+        # Okno zadań w locie: zadania tworzymy leniwie, bo przy deduplikacji nie wiadomo, ile ich trzeba
+        window = deque()
+        for task in tasks:
+            window.append(pool.apply_async(_generate_shard, (task,)))
+            if len(window) >= 2 * (workers or os.cpu_count() or 1):
+                break
+        while window and written + buffered_count < num_samples:
+            _, records, info = window.popleft().get()
+            task = next(tasks, None)
+            if task is not None:
+                window.append(pool.apply_async(_generate_shard, (task,)))
+            new = key_filter.add_many(info['key']) if key_filter is not None else np.ones(len(records), dtype=bool)
+            kept = np.flatnonzero(new)
+            missing = num_samples - written - buffered_count
+            # Kandydatów liczymy tylko do tej próbki, która domknęła zbiór
+            candidates += int(kept[missing - 1]) + 1 if len(kept) > missing else len(records)
+            kept = kept[:missing]
+            records, info = records[kept], info[kept]
+            strata.update(zip(sampler.bucket_of(info['ply']).tolist(), info['phase'].tolist()))
+            buffered.append(records)
+            buffered_count += len(records)
+            while buffered_count >= shard_size:
+                flush(shard_size)
+        pool.terminate()  # Zadania z okna, które nie są już potrzebne
+    if buffered_count:
+        flush(buffered_count)
+
+    if written < num_samples:
+        print(f"Uwaga: po {candidates} kandydatach zebrano tylko {written} unikalnych pozycji.")
+    print(f"Wygenerowano {written} syntetycznych próbek danych w {shard_count} shardach w '{output_dir}'.")
+    _print_report(candidates, written, key_filter, strata, sampler)
+
+
+def _int_list(value):
+    return [int(item) for item in value.split(',')]
+
+
+def _float_list(value):
+    return [float(item) for item in value.split(',')]
 
 
 if __name__ == '__main__':
-    generate_synthetic_data(num_samples=5000)  # Możesz zwiększyć tę liczbę, jeśli chcesz
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Generator syntetycznych danych treningowych.")
+    parser.add_argument('--samples', type=int, default=5000, help="Liczba próbek")  # Możesz zwiększyć tę liczbę
+    parser.add_argument('--shards', metavar='KATALOG', nargs='?', const=SHARD_DIR, default=None,
+                        help=f"Zapisuj równolegle shardy .npy do katalogu (domyślnie '{SHARD_DIR}') zamiast pickle")
+    parser.add_argument('--shard-size', type=int, default=DEFAULT_SHARD_SIZE, help="Liczba próbek w shardzie")
+    parser.add_argument('--workers', type=int, default=None, help="Liczba procesów (domyślnie liczba rdzeni)")
+    parser.add_argument('--seed', type=int, default=0, help="Ziarno bazowe (shard i używa ziarna pochodnego)")
+    parser.add_argument('--dedup', action='store_true',
+                        help="Odrzucaj powtórzone pozycje i generuj dalej, aż będzie --samples unikalnych")
+    parser.add_argument('--exact-limit', type=int, default=DEFAULT_EXACT_LIMIT,
+                        help="Do tylu próbek deduplikacja dokładnym zbiorem, powyżej filtrem Blooma")
+    parser.add_argument('--bloom-error', type=float, default=DEFAULT_ERROR_RATE,
+                        help="Odsetek nowych pozycji, które filtr Blooma może błędnie odrzucić")
+    parser.add_argument('--ply-buckets', type=_int_list, default=[1, 21], metavar='GRANICE',
+                        help="Granice przedziałów liczby półruchów, np. 1,11,21,61 (domyślnie 1,21)")
+    parser.add_argument('--ply-weights', type=_float_list, default=None, metavar='WAGI',
+                        help="Wagi przedziałów półruchów (domyślnie równe)")
+    parser.add_argument('--phase-weights', type=_float_list, default=None, metavar='WAGI',
+                        help="Wagi faz otwarcie,gra środkowa,końcówka (domyślnie bez podziału na fazy)")
+    args = parser.parse_args()
+
+    try:
+        sampler = StratifiedSampler(args.ply_buckets, args.ply_weights, args.phase_weights)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.shards:
+        generate_sharded_data(args.samples, args.shards, args.shard_size, args.workers, args.seed,
+                              dedup=args.dedup, sampler=sampler, exact_limit=args.exact_limit,
+                              error_rate=args.bloom_error)
+    else:
+        generate_synthetic_data(num_samples=args.samples, dedup=args.dedup, sampler=sampler)
@@ -0,0 +1,130 @@
+"""
+Cache ocen sieci: klucz pozycji (position_key) -> ocena, z usuwaniem najdawniej używanych (LRU).
+
+W przeciwieństwie do tablicy transpozycji (czyszczonej przy nowej grze) cache żyje przez cały
+proces i jest współdzielony przez wszystkich graczy używających tego samego modelu, więc pozycje
+z otwarcia czy powtarzające się końcówki są oceniane przez sieć tylko raz. Kluczem rejestru jest
+(ścieżka modelu, mtime, backend) - nadpisanie pliku modelu daje nowy, pusty cache.
+
+Opcjonalnie cache można zapisać na dysk (np.savez) i wczytać w nowym procesie - plik pamięta,
+dla jakiego modelu powstał, więc nieaktualny cache jest ignorowany.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from chess_model_registry import model_key
+from chess_transposition import key_scheme_tag
+
+DEFAULT_EVAL_CACHE_SIZE = 200000  # Pozycji (~30 MB w słowniku Pythona)
+
+_caches = {}
+_lock = threading.Lock()
+
+
+class EvaluationCache:
+    """Ograniczony cache LRU z licznikami trafień i chybień (do dobierania rozmiaru)."""
+
+    def __init__(self, capacity=DEFAULT_EVAL_CACHE_SIZE, owner=None):
+        self.capacity = max(1, int(capacity))
+        self.owner = owner  # (ścieżka, mtime, backend) modelu, dla którego liczono oceny
+        self._scores = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._scores)
+
+    def get(self, key):
+        """Ocena pozycji albo None; trafienie przesuwa wpis na koniec kolejki LRU."""
+        with self._lock:
+            score = self._scores.get(key)
+            if score is None:
+                self.misses += 1
+            else:
+                self._scores.move_to_end(key)
+                self.hits += 1
+            return score
+
+    def put(self, key, score):
+        with self._lock:
+            self._scores[key] = score
+            self._scores.move_to_end(key)
+            if len(self._scores) > self.capacity:
+                self._scores.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._scores.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {'size': len(self._scores), 'capacity': self.capacity, 'hits': self.hits, 'misses': self.misses,
+                'evictions': self.evictions, 'hit_rate': self.hits / lookups if lookups else 0.0}
+
+    def summary(self):
+        stats = self.stats()
+        return (f"Cache ocen: {stats['size']}/{stats['capacity']} pozycji, {stats['hits']} trafień, "
+                f"{stats['misses']} chybień ({stats['hit_rate']:.0%}), {stats['evictions']} usuniętych")
+
+    def save(self, path):
+        """Zapisuje wpisy (od najdawniej używanego) razem z opisem modelu; zapis atomowy."""
+        with self._lock:
+            keys = np.fromiter(self._scores.keys(), dtype=np.uint64, count=len(self._scores))
+            scores = np.fromiter(self._scores.values(), dtype=np.float32, count=len(self._scores))
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, keys=keys, scores=scores, owner=np.array(_owner_tag(self.owner)))
+        os.replace(tmp_path, path)
+
+    def load(self, path):
+        """Wczytuje zapisany cache, jeśli powstał dla tego samego modelu; zwraca liczbę wczytanych wpisów."""
+        if not os.path.exists(path):
+            return 0
+        try:
+            with np.load(path) as data:
+                if str(data['owner']) != _owner_tag(self.owner):
+                    return 0
+                keys, scores = data['keys'][-self.capacity:], data['scores'][-self.capacity:]
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Nie udało się wczytać cache ocen '{path}': {e}")
+            return 0
+        with self._lock:
+            for key, score in zip(keys.tolist(), scores.tolist()):
+                self._scores[key] = score
+                self._scores.move_to_end(key)
+            while len(self._scores) > self.capacity:
+                self._scores.popitem(last=False)
+        return len(keys)
+
+
+def _owner_tag(owner):
+    # position_key opiera się na hash() krotki - klucze pasują tylko przy tym samym schemacie i interpreterze
+    return repr((owner, key_scheme_tag()))
+
+
+def get_cache(model_path, backend, capacity=DEFAULT_EVAL_CACHE_SIZE, persist_path=None):
+    """
+    Cache współdzielony w procesie dla pliku modelu i backendu. Nowa wersja pliku modelu
+    (inny mtime) dostaje nowy cache, a stare są usuwane. Z `persist_path` cache przy tworzeniu
+    wczytuje zapisane oceny.
+    """
+    owner = model_key(model_path) + (backend,)
+    with _lock:
+        cache = _caches.get(owner)
+        if cache is None:
+            for stale_owner in [k for k in _caches if k[0] == owner[0] and k[2] == backend]:
+                del _caches[stale_owner]
+            cache = EvaluationCache(capacity, owner)
+            if persist_path:
+                loaded = cache.load(persist_path)
+                if loaded:
+                    print(f"Wczytano {loaded} ocen z cache '{persist_path}'.")
+            _caches[owner] = cache
+    return cache
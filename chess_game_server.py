@@ -0,0 +1,391 @@
+"""
+Serwer wielu partii naraz: sesje ChessGameLogic obsługiwane przez asyncio i lokalne API HTTP (JSON).
+
+Wszystkie sesje korzystają z jednej kolejki inferencji (chess_inference_queue), więc liście
+z przeszukiwań wielu partii trafiają do sieci wspólnymi batchami. Przeszukiwanie (kod synchroniczny)
+działa w puli wątków, a pętla asyncio w tym czasie obsługuje kolejne żądania.
+
+API:
+    POST   /games                 {"ai_color": "black", "depth": 2, "time_limit": null} -> stan partii
+    GET    /games/<id>            stan partii
+    POST   /games/<id>/move       {"move": "e2e4"} - ruch człowieka, potem odpowiedź AI (jeśli jego tura)
+    POST   /games/<id>/ai         ruch AI w bieżącej pozycji (np. partie AI kontra AI)
+    DELETE /games/<id>            zamyka sesję
+    GET    /stats                 liczba sesji i statystyki kolejki inferencji
+
+Przykład:
+    python chess_game_server.py --port 8765 --latency-slo-ms 20
+    python chess_game_server.py --bench 64   # 64 partie AI kontra AI w procesie, bez HTTP
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+import chess
+
+from chess_inference import load_evaluator
+from chess_inference_queue import DEFAULT_MAX_BATCH, DEFAULT_MAX_DELAY_MS, InferenceQueue
+from chess_logic import MODEL_PATH, ChessGameLogic
+from chess_model_registry import get_tensorflow
+
+DEFAULT_PORT = 8765
+DEFAULT_MAX_SESSIONS = 512
+DEFAULT_SEARCH_THREADS = 64
+DEFAULT_SESSION_TT_MB = 4  # Setki sesji - mała tablica transpozycji na partię
+DEFAULT_SESSION_EVAL_CACHE = 20000
+SESSION_IDLE_TIMEOUT = 1800.0  # Sekundy bez żądań, po których sesja jest zamykana
+MAX_REQUEST_BODY = 65536
+
+_STATUS_TEXT = {200: 'OK', 201: 'Created', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+                409: 'Conflict', 413: 'Payload Too Large', 500: 'Internal Server Error',
+                503: 'Service Unavailable'}
+
+
+class RequestError(Exception):
+    """Błąd żądania API z kodem HTTP."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class GameSession:
+    """Jedna partia: ChessGameLogic z AI na wybranych kolorach i blokada, żeby ruchy szły po kolei."""
+
+    def __init__(self, session_id, ai_colors, depth, time_limit, evaluator):
+        self.id = session_id
+        self.logic = ChessGameLogic()
+        self.logic.ai_evaluator = evaluator
+        self.logic.ai_tt_size_mb = DEFAULT_SESSION_TT_MB
+        self.logic.ai_eval_cache_size = DEFAULT_SESSION_EVAL_CACHE
+        for color in ai_colors:
+            self.logic.set_player_type(color, 'AI_TF')
+        if ai_colors:
+            self.logic.initialize_ai('AI_TF', skill_level=depth, time_limit=time_limit)
+        self.lock = asyncio.Lock()
+        self.last_active = time.monotonic()
+        self.last_ai_move = None
+        self.last_search_stats = None
+
+    def is_ai_turn(self):
+        return not self.logic.is_game_over() and self.logic.get_current_player_type() == 'AI_TF'
+
+    def state(self):
+        board = self.logic.board
+        return {
+            'id': self.id,
+            'fen': board.fen(),
+            'turn': self.logic.get_turn_color(),
+            'moves': [move.uci() for move in board.move_stack],
+            'check': self.logic.is_check(),
+            'game_over': self.logic.is_game_over(),
+            'result': self.logic.get_game_result(),
+            'last_ai_move': self.last_ai_move,
+            'search': self.last_search_stats.as_dict() if self.last_search_stats else None,
+        }
+
+    def close(self):
+        if self.logic.ai_engine:
+            self.logic.ai_engine.quit_engine()
+            self.logic.ai_engine = None
+
+
+class SessionManager:
+    """Sesje partii i wspólne zasoby: kolejka inferencji oraz pula wątków przeszukiwania."""
+
+    def __init__(self, evaluator, max_sessions=DEFAULT_MAX_SESSIONS, search_threads=DEFAULT_SEARCH_THREADS,
+                 max_batch=DEFAULT_MAX_BATCH, max_delay_ms=DEFAULT_MAX_DELAY_MS, latency_slo_ms=None,
+                 default_depth=2, default_time_limit=None):
+        self.queue = InferenceQueue(evaluator, max_batch, max_delay_ms, latency_slo_ms)
+        self.executor = ThreadPoolExecutor(max_workers=search_threads, thread_name_prefix='search')
+        self.max_sessions = max_sessions
+        self.default_depth = default_depth
+        self.default_time_limit = default_time_limit
+        self.sessions = {}
+        self._ids = itertools.count(1)
+        self.moves_played = 0
+        self.started = time.monotonic()
+
+    def create(self, ai_color='black', depth=None, time_limit=None):
+        if len(self.sessions) >= self.max_sessions:
+            raise RequestError(503, f"Osiągnięto limit {self.max_sessions} sesji")
+        colors = {'white': [chess.WHITE], 'black': [chess.BLACK], 'both': [chess.WHITE, chess.BLACK], 'none': []}
+        if not isinstance(ai_color, str) or ai_color not in colors:
+            raise RequestError(400, "ai_color musi być jednym z: white, black, both, none")
+        # bool to podklasa int, ale {"depth": true} to raczej pomyłka niż głębokość 1
+        if depth is not None and (isinstance(depth, bool) or not isinstance(depth, int) or depth <= 0):
+            raise RequestError(400, "depth musi być dodatnią liczbą całkowitą albo null")
+        if time_limit is not None and (isinstance(time_limit, bool) or not isinstance(time_limit, (int, float))
+                                       or not time_limit > 0):
+            raise RequestError(400, "time_limit musi być dodatnią liczbą sekund albo null")
+        session_id = str(next(self._ids))
+        session = GameSession(session_id, colors[ai_color], depth or self.default_depth,
+                              time_limit if time_limit is not None else self.default_time_limit, self.queue)
+        self.sessions[session_id] = session
+        return session
+
+    def get(self, session_id):
+        session = self.sessions.get(session_id)
+        if session is None:
+            raise RequestError(404, f"Brak sesji '{session_id}'")
+        session.last_active = time.monotonic()
+        return session
+
+    def close(self, session_id):
+        self.get(session_id).close()
+        del self.sessions[session_id]
+
+    async def ai_move(self, session):
+        """Ruch AI w sesji; przeszukiwanie w puli wątków, oceny przez wspólną kolejkę."""
+        if not session.is_ai_turn():
+            raise RequestError(409, "Teraz nie jest tura AI albo partia się skończyła")
+        board = session.logic.board.copy()
+        loop = asyncio.get_running_loop()
+        move = await loop.run_in_executor(self.executor, self._search, session, board)
+        if move is None or not session.logic.make_move_object(move):
+            raise RequestError(409, "AI nie znalazło legalnego ruchu")
+        session.last_ai_move = move.uci()
+        session.last_search_stats = session.logic.ai_engine.last_search_stats
+        self.moves_played += 1
+        return move
+
+    def _search(self, session, board):
+        with self.queue.searching():
+            return session.logic.get_ai_move(board)
+
+    async def human_move(self, session, uci):
+        try:
+            move = chess.Move.from_uci(uci)
+        except (TypeError, ValueError):
+            raise RequestError(400, f"Niepoprawny ruch '{uci}'")
+        if session.is_ai_turn() or session.logic.is_game_over():
+            raise RequestError(409, "Teraz nie jest tura człowieka")
+        # Promocja bez podanej figury - domyślnie hetman, jak w GUI
+        if move not in session.logic.snapshot().legal_move_set and move.promotion is None:
+            move = chess.Move(move.from_square, move.to_square, promotion=chess.QUEEN)
+        if not session.logic.make_move_object(move):
+            raise RequestError(400, f"Nielegalny ruch '{uci}'")
+        session.last_ai_move = None
+        if session.is_ai_turn():
+            await self.ai_move(session)
+
+    def close_idle(self, timeout=SESSION_IDLE_TIMEOUT):
+        now = time.monotonic()
+        for session_id in [sid for sid, s in self.sessions.items() if now - s.last_active > timeout]:
+            if not self.sessions[session_id].lock.locked():
+                self.close(session_id)
+
+    def stats(self):
+        elapsed = time.monotonic() - self.started
+        return {'sessions': len(self.sessions), 'moves_played': self.moves_played,
+                'moves_per_sec': self.moves_played / elapsed if elapsed else 0.0, 'inference': self.queue.stats()}
+
+    def shutdown(self):
+        for session_id in list(self.sessions):
+            self.close(session_id)
+        self.executor.shutdown(wait=True)
+        self.queue.close()
+
+    async def handle(self, method, path, body):
+        """Obsługa jednego żądania API; zwraca (status, słownik JSON)."""
+        parts = [part for part in path.split('?')[0].split('/') if part]
+        if parts == ['stats'] and method == 'GET':
+            return 200, self.stats()
+        if parts == ['games'] and method == 'POST':
+            session = self.create(body.get('ai_color', 'black'), body.get('depth'), body.get('time_limit'))
+            async with session.lock:
+                try:
+                    if session.is_ai_turn():
+                        await self.ai_move(session)
+                except BaseException:
+                    # Nieudana sesja nie może zajmować miejsca w limicie max_sessions
+                    self.close(session.id)
+                    raise
+                return 201, session.state()
+        if len(parts) >= 2 and parts[0] == 'games':
+            session = self.get(parts[1])
+            if len(parts) == 2 and method == 'GET':
+                return 200, session.state()
+            if len(parts) == 2 and method == 'DELETE':
+                # Czekamy na trwające przeszukiwanie - nie wolno zamknąć silnika w jego trakcie
+                async with session.lock:
+                    if self.sessions.get(session.id) is not session:
+                        raise RequestError(404, f"Brak sesji '{session.id}'")
+                    self.close(session.id)
+                return 200, {'id': session.id, 'closed': True}
+            if len(parts) == 3 and method == 'POST' and parts[2] in ('move', 'ai'):
+                async with session.lock:
+                    if parts[2] == 'move':
+                        await self.human_move(session, body.get('move'))
+                    else:
+                        await self.ai_move(session)
+                    return 200, session.state()
+        raise RequestError(404 if method in ('GET', 'POST', 'DELETE') else 405, f"Nieznane żądanie {method} {path}")
+
+
+async def _read_request(reader):
+    """Minimalny parser HTTP/1.1: (metoda, ścieżka, nagłówki, ciało) albo None po zamknięciu połączenia."""
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    try:
+        method, path, _ = request_line.decode('latin-1').split(' ', 2)
+    except ValueError:
+        raise RequestError(400, "Niepoprawna linia żądania")
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get('content-length', 0) or 0)
+    except ValueError:
+        raise RequestError(400, "Niepoprawny nagłówek Content-Length")
+    if length > MAX_REQUEST_BODY:
+        raise RequestError(413, "Za duże ciało żądania")
+    body = await reader.readexactly(length) if length else b''
+    return method.upper(), path, headers, body
+
+
+def _write_response(writer, status, payload, keep_alive):
+    data = json.dumps(payload).encode('utf-8')
+    head = (f"HTTP/1.1 {status} {_STATUS_TEXT.get(status, '')}\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    writer.write(head.encode('latin-1') + data)
+
+
+async def _handle_connection(manager, reader, writer):
+    try:
+        while True:
+            keep_alive = False
+            try:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                method, path, headers, body = request
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                try:
+                    payload = json.loads(body) if body else {}
+                except ValueError:
+                    raise RequestError(400, "Ciało żądania nie jest poprawnym JSON")
+                if not isinstance(payload, dict):
+                    raise RequestError(400, "Ciało żądania musi być obiektem JSON")
+                status, response = await manager.handle(method, path, payload)
+            except RequestError as e:
+                status, response = e.status, {'error': str(e)}
+            except (ConnectionError, asyncio.IncompleteReadError):
+                raise
+            except Exception as e:  # Błąd serwera nie może zerwać połączenia bez odpowiedzi
+                traceback.print_exc()
+                status, response = 500, {'error': f"Błąd serwera: {e}"}
+            _write_response(writer, status, response, keep_alive)
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def _close_idle_sessions(manager, interval=60.0):
+    while True:
+        await asyncio.sleep(interval)
+        manager.close_idle()
+
+
+async def serve(manager, host='127.0.0.1', port=DEFAULT_PORT):
+    server = await asyncio.start_server(lambda r, w: _handle_connection(manager, r, w), host, port)
+    print(f"Serwer partii nasłuchuje na http://{host}:{port} (limit sesji: {manager.max_sessions})")
+    cleanup = asyncio.create_task(_close_idle_sessions(manager))
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        cleanup.cancel()
+
+
+async def benchmark_sessions(manager, games, moves_per_game=10):
+    """
+    Rozgrywa `games` partii AI kontra AI równolegle (po `moves_per_game` półruchów) bez HTTP
+    i zwraca liczbę ruchów na sekundę - do sprawdzania, jak przepustowość rośnie z liczbą partii.
+    """
+    sessions = [manager.create('both') for _ in range(games)]
+    start_time = time.perf_counter()
+
+    async def play(session):
+        for _ in range(moves_per_game):
+            if not session.is_ai_turn():
+                break
+            async with session.lock:
+                await manager.ai_move(session)
+
+    await asyncio.gather(*(play(session) for session in sessions))
+    elapsed = time.perf_counter() - start_time
+    moves = sum(len(session.logic.board.move_stack) for session in sessions)
+    for session in sessions:
+        manager.close(session.id)
+    return moves / elapsed
+
+
+def server_evaluator(model_path=MODEL_PATH, backend='numpy'):
+    """
+    Evaluator za kolejką. Backend 'nnue' nic tu nie daje - akumulator omija batche, a właśnie
+    sklejanie batchy z wielu partii jest celem kolejki - więc zamieniamy go na 'numpy'.
+    """
+    backend = 'numpy' if backend == 'nnue' else backend
+    if backend != 'numpy' and not model_path.endswith('.tflite') and get_tensorflow() is None:
+        print("Brak TensorFlow - ocena sieci przez backend NumPy.")
+        backend = 'numpy'
+    print(f"Ładowanie modelu '{model_path}' (backend: {backend})")
+    return load_evaluator(model_path, backend)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Serwer wielu partii ze wspólną, batchowaną inferencją.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--model', default=MODEL_PATH)
+    parser.add_argument('--backend', default='function', help="Backend inferencji (chess_inference)")
+    parser.add_argument('--max-sessions', type=int, default=DEFAULT_MAX_SESSIONS)
+    parser.add_argument('--search-threads', type=int, default=DEFAULT_SEARCH_THREADS,
+                        help="Ile przeszukiwań może trwać naraz")
+    parser.add_argument('--max-batch', type=int, default=DEFAULT_MAX_BATCH, help="Maks. pozycji w przebiegu sieci")
+    parser.add_argument('--max-delay-ms', type=float, default=DEFAULT_MAX_DELAY_MS,
+                        help="Ile najdłużej czekać na dołączenie kolejnych żądań do batcha")
+    parser.add_argument('--latency-slo-ms', type=float, default=None,
+                        help="Docelowe opóźnienie jednego żądania oceny (kolejka + sieć)")
+    parser.add_argument('--depth', type=int, default=2, help="Domyślna głębokość AI dla nowych partii")
+    parser.add_argument('--time-limit', type=float, default=None, help="Domyślny limit czasu na ruch (s)")
+    parser.add_argument('--bench', type=int, metavar='PARTIE', default=None,
+                        help="Zamiast serwera: tyle równoległych partii AI kontra AI i pomiar ruchów/s")
+    parser.add_argument('--bench-moves', type=int, default=10)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.model):
+        raise SystemExit(f"Model '{args.model}' nie znaleziony.")
+    manager = SessionManager(server_evaluator(args.model, args.backend), args.max_sessions, args.search_threads,
+                             args.max_batch, args.max_delay_ms, args.latency_slo_ms, args.depth, args.time_limit)
+    try:
+        if args.bench:
+            moves_per_sec = asyncio.run(benchmark_sessions(manager, args.bench, args.bench_moves))
+            inference = manager.queue.stats()
+            print(f"{args.bench} partii: {moves_per_sec:.1f} ruchów/s, "
+                  f"{inference['positions_per_batch']:.0f} pozycji i {inference['requests_per_batch']:.1f} "
+                  f"żądań na przebieg sieci, opóźnienie p50 {inference['latency_p50_ms']:.1f} ms, "
+                  f"p99 {inference['latency_p99_ms']:.1f} ms")
+        else:
+            asyncio.run(serve(manager, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        manager.shutdown()
@@ -1,11 +1,41 @@
 import sys
+import threading
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QPushButton, QVBoxLayout,
                              QWidget, QLabel, QMessageBox, QHBoxLayout, QComboBox,
                              QLineEdit, QFormLayout)
-from PyQt5.QtGui import QPixmap, QPainter, QColor
-from PyQt5.QtCore import Qt, QRect, pyqtSignal, QTimer
+from PyQt5.QtGui import QPixmap, QPainter, QColor, QDoubleValidator, QIntValidator
+from PyQt5.QtCore import Qt, QRect, pyqtSignal, QTimer, QThread, QLocale
 import chess
-from chess_logic import ChessGameLogic
+from chess_logic import ChessGameLogic, MAX_SEARCH_DEPTH
+
+MAX_TIME_LIMIT = 3600.0  # Górna granica pola czasu na ruch (s)
+
+
+class AIMoveWorker(QThread):
+    """
+    Wątek roboczy dla przeszukiwania AI. Pracuje na kopii szachownicy, a wynik oddaje sygnałem
+    razem z numerem partii, dzięki czemu ruch z anulowanej (starej) gry jest ignorowany.
+    """
+    move_ready = pyqtSignal(object, object, int)  # ruch, SearchStats (albo None), numer partii
+
+    def __init__(self, game_logic, board, game_id, parent=None):
+        super().__init__(parent)
+        self.game_logic = game_logic
+        self.board = board
+        self.game_id = game_id
+        self.stop_event = threading.Event()
+        # Silnik bierzemy w wątku GUI: nowa gra może podmienić game_logic.ai_engine w trakcie przeszukiwania
+        self.engine = game_logic.ai_engine
+        self.release_engine = False  # Ustawiane przy anulowaniu - silnik zamykamy po zakończeniu wątku
+
+    def run(self):
+        ai_move = self.game_logic.get_ai_move(board=self.board, stop_event=self.stop_event, engine=self.engine)
+        search_stats = self.engine.last_search_stats if self.engine else None
+        if not self.stop_event.is_set():
+            self.move_ready.emit(ai_move, search_stats, self.game_id)
+
+    def cancel(self):
+        self.stop_event.set()
 
 
 class ChessBoardWidget(QWidget):
@@ -20,6 +50,12 @@ class ChessBoardWidget(QWidget):
         self.setMinimumSize(480, 480)
         self.setMouseTracking(True)
         self.highlighted_legal_moves = []
+        # Przeskalowane obrazki figur dla bieżącego rozmiaru pola (unieważniane przy zmianie rozmiaru)
+        self._scaled_images = {}
+        self._scaled_size = None
+        # Stan ostatnio narysowanej pozycji - do odświeżania tylko zmienionych pól
+        self._painted_ply = 0
+        self._painted_pieces = {}
 
     def load_piece_images(self):
         images = {}
@@ -39,42 +75,127 @@ class ChessBoardWidget(QWidget):
                 print(f"Wyjątek podczas ładowania obrazka {path}: {e}")
         return images
 
+    def square_size(self):
+        return min(self.width(), self.height()) // 8
+
+    def _square_rect(self, square, square_size):
+        """Prostokąt pola (numer pola python-chess) we współrzędnych widgetu."""
+        col_idx = chess.square_file(square)
+        row_gui_idx = 7 - chess.square_rank(square)  # Odwrócenie rzędów dla GUI
+        return QRect(col_idx * square_size, row_gui_idx * square_size, square_size, square_size)
+
+    def _scaled_piece(self, piece_symbol, square_size):
+        """Obrazek figury przeskalowany do rozmiaru pola - skalujemy tylko raz na rozmiar."""
+        if square_size != self._scaled_size:
+            self._scaled_images = {}
+            self._scaled_size = square_size
+        scaled_image = self._scaled_images.get(piece_symbol)
+        if scaled_image is None:
+            image = self.piece_images.get(piece_symbol)
+            if not image or image.isNull():
+                return None
+            scaled_image = image.scaled(square_size, square_size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+            self._scaled_images[piece_symbol] = scaled_image
+        return scaled_image
+
+    def resizeEvent(self, event):
+        self._scaled_images = {}
+        self._scaled_size = None
+        super().resizeEvent(event)
+
     def paintEvent(self, event):
         painter = QPainter(self)
-        board_size = min(self.width(), self.height())
-        square_size = board_size // 8
+        square_size = self.square_size()
+        if square_size <= 0:
+            return
+
+        # Rysujemy tylko pola, które przecinają obszar do odświeżenia
+        dirty_rect = event.rect()
+        first_col = max(0, dirty_rect.left() // square_size)
+        last_col = min(7, dirty_rect.right() // square_size)
+        first_row = max(0, dirty_rect.top() // square_size)
+        last_row = min(7, dirty_rect.bottom() // square_size)
+
+        selected = chess.parse_square(self.selected_square) if self.selected_square else None
+        highlighted = {chess.parse_square(name) for name in self.highlighted_legal_moves}
+        piece_map = self.game_logic.get_piece_map()
 
-        # Rysowanie pól szachownicy
-        for row_idx in range(8):
-            for col_idx in range(8):
+        for row_idx in range(first_row, last_row + 1):
+            for col_idx in range(first_col, last_col + 1):
+                square = chess.square(col_idx, 7 - row_idx)  # Odwrócenie rzędów dla GUI
+                target_rect = QRect(col_idx * square_size, row_idx * square_size, square_size, square_size)
+
+                # Rysowanie pola szachownicy
                 color = QColor("#f0d9b5") if (row_idx + col_idx) % 2 == 0 else QColor("#b58863")
-                painter.fillRect(col_idx * square_size, row_idx * square_size, square_size, square_size, color)
-
-        # Podświetlenie zaznaczonego pola
-        if self.selected_square:
-            s_col, s_row_logic = self.get_coords_from_square_name(self.selected_square)
-            s_row_gui = 7 - s_row_logic  # Odwrócenie rzędów dla GUI
-            painter.fillRect(s_col * square_size, s_row_gui * square_size, square_size, square_size,
-                             QColor(255, 255, 0, 150))  # Żółty z przezroczystością
-
-        # Podświetlanie legalnych ruchów
-        for move_square_name in self.highlighted_legal_moves:
-            m_col, m_row_logic = self.get_coords_from_square_name(move_square_name)
-            m_row_gui = 7 - m_row_logic  # Odwrócenie rzędów dla GUI
-            painter.fillRect(m_col * square_size, m_row_gui * square_size, square_size, square_size,
-                             QColor(0, 255, 0, 80))  # Zielony z przezroczystością
-
-        # Rysowanie figur
-        for square_name, piece_symbol in self.game_logic.get_board_state().items():
-            if piece_symbol:
-                col_idx, row_logic_idx = self.get_coords_from_square_name(square_name)
-                row_gui_idx = 7 - row_logic_idx  # Odwrócenie rzędów dla GUI
-
-                image = self.piece_images.get(piece_symbol)
-                if image and not image.isNull():
-                    target_rect = QRect(col_idx * square_size, row_gui_idx * square_size, square_size, square_size)
-                    scaled_image = image.scaled(square_size, square_size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-                    painter.drawPixmap(target_rect.center() - scaled_image.rect().center(), scaled_image)
+                painter.fillRect(target_rect, color)
+
+                # Podświetlenie zaznaczonego pola i legalnych ruchów
+                if square == selected:
+                    painter.fillRect(target_rect, QColor(255, 255, 0, 150))  # Żółty z przezroczystością
+                if square in highlighted:
+                    painter.fillRect(target_rect, QColor(0, 255, 0, 80))  # Zielony z przezroczystością
+
+                # Rysowanie figury
+                piece = piece_map.get(square)
+                if piece:
+                    scaled_image = self._scaled_piece(piece.symbol(), square_size)
+                    if scaled_image:
+                        painter.drawPixmap(target_rect.center() - scaled_image.rect().center(), scaled_image)
+
+    def _update_squares(self, squares):
+        square_size = self.square_size()
+        for square in squares:
+            self.update(self._square_rect(square, square_size))
+
+    def set_selection(self, square_name, legal_moves):
+        """Zmienia zaznaczenie i odświeża tylko pola starego i nowego zaznaczenia."""
+        old_names = ([self.selected_square] if self.selected_square else []) + self.highlighted_legal_moves
+        self.selected_square = square_name
+        self.highlighted_legal_moves = legal_moves
+        new_names = ([square_name] if square_name else []) + legal_moves
+        self._update_squares({chess.parse_square(name) for name in old_names + new_names})
+
+    def refresh_position(self):
+        """
+        Odświeża tylko pola zmienione od ostatniego rysowania. Gdy od tego czasu wykonano
+        dokładnie jeden ruch, pola wynikają z samego ruchu; w innym przypadku porównujemy układ figur.
+        """
+        board = self.game_logic.board
+        ply = len(board.move_stack)
+        pieces = self.game_logic.get_piece_map()
+        if ply == self._painted_ply + 1:
+            changed = self._move_squares(board, board.peek())
+        else:
+            changed = {square for square in set(pieces) | set(self._painted_pieces)
+                       if pieces.get(square) != self._painted_pieces.get(square)}
+        self._painted_ply = ply
+        self._painted_pieces = pieces
+        self._update_squares(changed)
+
+    def reset_view(self):
+        """Czyści zaznaczenie i przerysowuje całą planszę (np. przy nowej grze)."""
+        self.selected_square = None
+        self.highlighted_legal_moves = []
+        self._painted_ply = len(self.game_logic.board.move_stack)
+        self._painted_pieces = self.game_logic.get_piece_map()
+        self.update()
+
+    def _move_squares(self, board, move):
+        """Pola zmienione przez ostatni (już wykonany) ruch, łącznie z roszadą i biciem w przelocie."""
+        squares = {move.from_square, move.to_square}
+        piece_type = board.piece_type_at(move.to_square)
+        file_delta = chess.square_file(move.to_square) - chess.square_file(move.from_square)
+        rank = chess.square_rank(move.from_square)
+        if piece_type == chess.KING and abs(file_delta) == 2:
+            # Roszada: wieża przechodzi z h na f albo z a na d
+            if file_delta > 0:
+                squares.update((chess.square(7, rank), chess.square(5, rank)))
+            else:
+                squares.update((chess.square(0, rank), chess.square(3, rank)))
+        elif piece_type == chess.PAWN and file_delta != 0:
+            # Bicie pionem - w przelocie zbity pion stoi obok pola startowego
+            squares.add(chess.square(chess.square_file(move.to_square), rank))
+        return squares
 
     def mousePressEvent(self, event):
         # W trybie AI vs AI, kliknięcia myszy są ignorowane
@@ -93,8 +214,7 @@ class ChessBoardWidget(QWidget):
             if self.selected_square:
                 # Drugie kliknięcie: spróbuj wykonać ruch
                 if self.game_logic.make_move(self.selected_square, clicked_square_name):
-                    self.selected_square = None
-                    self.highlighted_legal_moves = []
+                    self.set_selection(None, [])
                     self.game_state_changed.emit()  # Wyślij sygnał o zmianie stanu
                     # Jeśli gra się nie zakończyła i teraz jest tura AI, poproś o ruch AI
                     if not self.game_logic.is_game_over() and self.game_logic.get_current_player_type() != 'HUMAN':
@@ -103,22 +223,16 @@ class ChessBoardWidget(QWidget):
                     # Jeśli ruch nielegalny, ale kliknięto własną figurę, zmień zaznaczenie
                     piece_at_clicked = self.game_logic.get_piece_at(clicked_square_name)
                     if piece_at_clicked and (piece_at_clicked.color == self.game_logic.board.turn):
-                        self.selected_square = clicked_square_name
-                        self.highlighted_legal_moves = self.game_logic.get_legal_moves(self.selected_square)
+                        self.set_selection(clicked_square_name, self.game_logic.get_legal_moves(clicked_square_name))
                     else:
-                        self.selected_square = None  # Usuń zaznaczenie
-                        self.highlighted_legal_moves = []
+                        self.set_selection(None, [])  # Usuń zaznaczenie
             else:
                 # Pierwsze kliknięcie: zaznacz figurę
                 piece = self.game_logic.get_piece_at(clicked_square_name)
                 if piece and (piece.color == self.game_logic.board.turn):
-                    self.selected_square = clicked_square_name
-                    self.highlighted_legal_moves = self.game_logic.get_legal_moves(self.selected_square)
+                    self.set_selection(clicked_square_name, self.game_logic.get_legal_moves(clicked_square_name))
                 else:
-                    self.selected_square = None
-                    self.highlighted_legal_moves = []
-
-            self.update()  # Odśwież widok szachownicy
+                    self.set_selection(None, [])
 
     def get_square_name(self, col_idx, row_gui_idx):
         """Konwertuje indeksy kolumny i rzędu GUI na nazwę pola (np. 'a1', 'h8')."""
@@ -162,8 +276,18 @@ class ChessApp(QMainWindow):
 
         self.skill_level_input = QLineEdit("2")  # Domyślna głębokość dla Minimax
         self.skill_level_input.setPlaceholderText("Głębokość Minimax dla AI (np. 1-3)")
+        self.skill_level_input.setValidator(QIntValidator(1, MAX_SEARCH_DEPTH, self))
         self.player_selection_layout.addRow("Głębokość AI:", self.skill_level_input)
 
+        self.time_limit_input = QLineEdit("")  # Puste = bez limitu czasu
+        self.time_limit_input.setPlaceholderText("Czas na ruch w sekundach (puste = tylko głębokość)")
+        time_validator = QDoubleValidator(0.01, MAX_TIME_LIMIT, 2, self)
+        time_validator.setNotation(QDoubleValidator.StandardNotation)
+        time_validator.setLocale(QLocale.c())  # Kropka dziesiętna, tak jak w float()
+        self.time_limit_input.setValidator(time_validator)
+        self.skill_level_input.setToolTip("Puste pole z ustawionym czasem = pogłębianie do końca czasu")
+        self.player_selection_layout.addRow("Czas AI (s):", self.time_limit_input)
+
         # Nowy przycisk do trybu AI vs AI
         self.ai_vs_ai_button = QPushButton("AI (TF) vs AI (TF)")
         self.ai_vs_ai_button.clicked.connect(self.start_ai_vs_ai_game)
@@ -181,6 +305,12 @@ class ChessApp(QMainWindow):
         self.status_label.setStyleSheet("font-size: 18px; margin-top: 10px;")
         self.layout.addWidget(self.status_label)
 
+        # Statystyki ostatniego przeszukiwania AI (pełne dane w konsoli)
+        self.search_stats_label = QLabel("")
+        self.search_stats_label.setAlignment(Qt.AlignCenter)
+        self.search_stats_label.setStyleSheet("font-size: 11px; color: gray;")
+        self.layout.addWidget(self.search_stats_label)
+
         self.new_game_button = QPushButton("Nowa Gra")
         self.new_game_button.clicked.connect(self.start_new_game)
         self.layout.addWidget(self.new_game_button)
@@ -190,6 +320,11 @@ class ChessApp(QMainWindow):
         self.ai_timer.setSingleShot(True)  # Timer uruchamia się tylko raz
         self.ai_timer.timeout.connect(self.make_ai_move)
 
+        # Przeszukiwanie AI działa w osobnym wątku, żeby okno nie zamarzało
+        self.game_id = 0
+        self.ai_worker = None
+        self._cancelled_workers = []  # Anulowane wątki trzymamy do ich zakończenia
+
         self.update_game_status()  # Ustaw początkowy status
 
     def _get_player_type_from_combo(self, combo_box):
@@ -203,43 +338,105 @@ class ChessApp(QMainWindow):
             return 'AI_TF'
         return 'HUMAN'  # Domyślne w razie błędu
 
+    def _cancel_ai_worker(self):
+        """
+        Anuluje trwające przeszukiwanie AI (np. przy starcie nowej gry). Silnik, którego używa
+        anulowany wątek, odłączamy od logiki gry (initialize_ai nie zamknie go w trakcie
+        przeszukiwania) i zamykamy dopiero, gdy wątek się zakończy.
+        """
+        self.ai_timer.stop()  # Zatrzymanie timera AI, jeśli był aktywny
+        self.game_id += 1
+        if self.ai_worker is not None:
+            worker = self.ai_worker
+            self.ai_worker = None
+            worker.cancel()
+            if worker.isRunning():
+                if self.game_logic.ai_engine is worker.engine:
+                    self.game_logic.ai_engine = None
+                worker.release_engine = True
+                self._cancelled_workers.append(worker)
+                worker.finished.connect(lambda: self._release_cancelled_worker(worker))
+                if worker.isFinished():  # Wątek mógł skończyć przed podłączeniem sygnału
+                    self._release_cancelled_worker(worker)
+
+    def _release_cancelled_worker(self, worker):
+        """Zamyka silnik anulowanego wątku po jego zakończeniu."""
+        if worker not in self._cancelled_workers:
+            return
+        self._cancelled_workers.remove(worker)
+        if worker.release_engine and worker.engine:
+            worker.engine.quit_engine()
+
     def start_new_game(self):
         """Rozpoczyna nową grę na podstawie wyborów użytkownika."""
-        self.ai_timer.stop()  # Zatrzymanie timera AI, jeśli był aktywny
+        limits = self._read_ai_limits()
+        if limits is None:
+            return  # Błędne ustawienia - bieżąca gra toczy się dalej
+        self._cancel_ai_worker()
 
         white_player_type = self._get_player_type_from_combo(self.white_player_combo)
         black_player_type = self._get_player_type_from_combo(self.black_player_combo)
 
-        self._configure_and_start_game(white_player_type, black_player_type)
+        self._configure_and_start_game(white_player_type, black_player_type, *limits)
 
     def start_ai_vs_ai_game(self):
         """Rozpoczyna grę AI (TF) vs AI (TF)."""
-        self.ai_timer.stop()  # Zatrzymanie timera AI, jeśli był aktywny
+        limits = self._read_ai_limits()
+        if limits is None:
+            return
+        self._cancel_ai_worker()
         # Ustawienie ComboBoxów na AI (TensorFlow)
         self.white_player_combo.setCurrentIndex(2)
         self.black_player_combo.setCurrentIndex(2)
-        self._configure_and_start_game('AI_TF', 'AI_TF')
-
-    def _configure_and_start_game(self, white_player_type, black_player_type):
+        self._configure_and_start_game('AI_TF', 'AI_TF', *limits)
+
+    def _read_ai_limits(self):
+        """
+        Odczytuje (głębokość, czas na ruch) z pól ustawień; puste pole to None.
+        Walidatory nie blokują niedokończonych wpisów (np. "0" albo "1."), więc przy błędzie
+        pokazujemy komunikat i zwracamy None.
+        """
+        # Puste pole głębokości: z limitem czasu pogłębiamy bez limitu głębokości, bez niego - głębokość 2
+        skill_level = time_limit = None
+        depth_text = self.skill_level_input.text().strip()
+        time_text = self.time_limit_input.text().strip()
+        try:
+            if depth_text:
+                skill_level = int(depth_text)
+                if not 1 <= skill_level <= MAX_SEARCH_DEPTH:
+                    raise ValueError
+        except ValueError:
+            QMessageBox.warning(self, "Błędne ustawienia",
+                                f"Głębokość AI musi być liczbą całkowitą od 1 do {MAX_SEARCH_DEPTH}.")
+            return None
+        try:
+            if time_text:
+                time_limit = float(time_text)
+                if not 0 < time_limit <= MAX_TIME_LIMIT:
+                    raise ValueError
+        except ValueError:
+            QMessageBox.warning(self, "Błędne ustawienia",
+                                f"Czas AI musi być liczbą sekund z przedziału (0, {MAX_TIME_LIMIT:g}].")
+            return None
+        return skill_level, time_limit
+
+    def _configure_and_start_game(self, white_player_type, black_player_type, skill_level=None, time_limit=None):
         """Wspólna logika uruchamiania nowej gry."""
         self.game_logic.set_player_type(chess.WHITE, white_player_type)
         self.game_logic.set_player_type(chess.BLACK, black_player_type)
 
-        skill_level = int(self.skill_level_input.text() or '2')  # Domyślnie 2 jeśli puste
-
         # Inicjalizacja AI, jeśli któryś z graczy to AI
         if white_player_type != 'HUMAN' or black_player_type != 'HUMAN':
             if white_player_type == 'AI_TF' or black_player_type == 'AI_TF':
-                self.game_logic.initialize_ai('AI_TF', skill_level)
+                self.game_logic.initialize_ai('AI_TF', skill_level, time_limit=time_limit)
             else:  # Oznacza, że ktoś wybrał "Losowe"
                 self.game_logic.initialize_ai('AI_RANDOM', skill_level)
         else:
             self.game_logic.initialize_ai(None)  # Brak AI
 
         self.game_logic.reset_game()
-        self.chessboard_widget.selected_square = None
-        self.chessboard_widget.highlighted_legal_moves = []
-        self.chessboard_widget.update()
+        self.chessboard_widget.reset_view()
+        self.search_stats_label.setText("")
         self.update_game_status()
         QMessageBox.information(self, "Nowa Gra", "Rozpoczęto nową grę!")
 
@@ -275,7 +472,7 @@ class ChessApp(QMainWindow):
             status_text += " (Szach!)"
 
         self.status_label.setText(status_text)
-        self.chessboard_widget.update()  # **Odśwież szachownicę!**
+        self.chessboard_widget.refresh_position()  # **Odśwież zmienione pola szachownicy!**
 
     def make_ai_move_delayed(self):
         """Opóźnia ruch AI, żeby było widać co się dzieje."""
@@ -283,7 +480,7 @@ class ChessApp(QMainWindow):
         self.ai_timer.start(500)  # Opóźnienie 0.5 sekundy
 
     def make_ai_move(self):
-        """Wykonuje ruch AI i aktualizuje GUI."""
+        """Uruchamia przeszukiwanie AI w wątku roboczym; ruch wraca przez on_ai_move_ready."""
         if self.game_logic.is_game_over():
             return
 
@@ -291,13 +488,33 @@ class ChessApp(QMainWindow):
         if self.game_logic.get_current_player_type() == 'HUMAN':
             return  # Nie wykonuj ruchu AI, jeśli to tura człowieka
 
-        ai_move = self.game_logic.get_ai_move()  # Pobierz ruch od AI
+        if self.ai_worker is not None and self.ai_worker.isRunning():
+            return  # AI już myśli nad tym ruchem
+
+        self.ai_worker = AIMoveWorker(self.game_logic, self.game_logic.board.copy(), self.game_id, self)
+        self.ai_worker.move_ready.connect(self.on_ai_move_ready)
+        self.ai_worker.start()
+
+    def on_ai_move_ready(self, ai_move, search_stats, game_id):
+        """Wykonuje ruch AI (w wątku GUI) i aktualizuje GUI."""
+        if game_id != self.game_id:
+            return  # Wynik z poprzedniej, anulowanej gry
+        self.ai_worker = None
+
+        if self.game_logic.is_game_over():
+            return
 
         if ai_move:
             print(f"AI ({self.game_logic.get_turn_color()}) wykonuje ruch: {ai_move.uci()}")  # Wypisz w konsoli
+            if search_stats:
+                print(f"  Przeszukiwanie: {search_stats.summary()}")
+                self.search_stats_label.setText(
+                    f"AI: głębokość {search_stats.depth}, {search_stats.nodes} węzłów, {search_stats.time:.2f} s "
+                    f"(sieć {search_stats.inference_time:.2f} s, kodowanie {search_stats.encode_time:.2f} s, "
+                    f"ruchy {search_stats.movegen_time:.2f} s)")
             self.game_logic.make_move_object(ai_move)  # Wykonaj ruch AI
             self.update_game_status()  # Zaktualizuj status i odśwież szachownicę
-            # self.chessboard_widget.update() # Już wywoływane przez update_game_status()
+            # self.chessboard_widget.refresh_position() # Już wywoływane przez update_game_status()
 
             # Jeśli gra się nie skończyła i teraz jest tura kolejnego AI, poproś o kolejny ruch
             if not self.game_logic.is_game_over() and self.game_logic.get_current_player_type() != 'HUMAN':
@@ -306,19 +523,33 @@ class ChessApp(QMainWindow):
             QMessageBox.warning(self, "Błąd AI",
                                 "AI nie mogło znaleźć legalnego ruchu! (Wykonywanie losowego ruchu awaryjnie)")
             # Awaryjnie wykonaj losowy legalny ruch, żeby gra się nie zawiesiła
-            if not self.game_logic.is_game_over() and self.game_logic.board.legal_moves:
+            if not self.game_logic.is_game_over():
                 self.game_logic.make_move_object(
-                    list(self.game_logic.board.legal_moves)[0])  # Wybierz pierwszy legalny ruch
+                    self.game_logic.snapshot().legal_moves[0])  # Wybierz pierwszy legalny ruch
                 self.update_game_status()
-                # self.chessboard_widget.update() # Już wywoływane przez update_game_status()
+                # self.chessboard_widget.refresh_position() # Już wywoływane przez update_game_status()
                 if self.game_logic.get_current_player_type() != 'HUMAN':
                     self.make_ai_move_delayed()
 
+    def closeEvent(self, event):
+        """Przy zamykaniu okna anuluje przeszukiwanie i czeka na zakończenie wątków AI."""
+        workers = [self.ai_worker] if self.ai_worker is not None else []
+        workers += self._cancelled_workers
+        self._cancel_ai_worker()
+        for worker in workers:
+            worker.wait()
+        for worker in list(self._cancelled_workers):
+            self._release_cancelled_worker(worker)
+        super().closeEvent(event)
+
     def __del__(self):
         """Zamyka silnik AI przy zamykaniu aplikacji."""
         print("Zamykanie aplikacji, zamykam silnik AI...")
-        if self.game_logic.ai_engine:
-            self.game_logic.ai_engine.quit_engine()
+        engine = self.game_logic.ai_engine
+        if engine:
+            engine.quit_engine()
+            if engine.eval_cache is not None:
+                print(engine.eval_cache.summary())
 
 
 if __name__ == '__main__':
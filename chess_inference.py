@@ -0,0 +1,244 @@
+"""
+Backendy inferencji sieci oceniającej dla ChessAIPlayer.
+
+model.predict jest zaprojektowane dla dużych zbiorów - przy małych batchach z przeszukiwania
+większość czasu idzie na callbacki, iteratory i budowanie grafu. Dlatego każdy backend
+to obiekt wywoływalny: evaluator(batch (N, 832) float32) -> oceny (N,) float32.
+
+    keras     - model.predict (dotychczasowe zachowanie, punkt odniesienia)
+    function  - tf.function ze stałą sygnaturą wejścia (N, 832), śledzony raz
+    tflite    - interpreter TFLite skonwertowany z modelu .h5 (albo gotowy plik .tflite)
+    numpy     - czysty NumPy: stos Dense 832->256->128->64->1 z build_model; nie wymaga TensorFlow
+    nnue      - jak numpy, plus inkrementalny akumulator pierwszej warstwy dla przeszukiwania (chess_nnue)
+
+Uruchomienie modułu wypisuje opóźnienie jednego wywołania dla każdego backendu:
+    python chess_inference.py --batch-sizes 1 32 256
+"""
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from chess_board_encoder import INPUT_SIZE
+from chess_model_registry import get_tensorflow, load_model, model_key
+
+BACKENDS = ('keras', 'function', 'tflite', 'numpy', 'nnue')
+DEFAULT_BACKEND = 'function'
+
+_evaluators = {}
+
+
+class KerasEvaluator:
+    """Ocena przez model.predict - wolna dla małych batchy, zostawiona jako punkt odniesienia."""
+
+    def __init__(self, model):
+        self.model = model
+
+    def __call__(self, batch):
+        return self.model.predict(batch, batch_size=len(batch), verbose=0)[:, 0]
+
+
+class FunctionEvaluator:
+    """Bezpośrednie wywołanie modelu skompilowane przez tf.function ze stałą sygnaturą wejścia."""
+
+    def __init__(self, model):
+        tf = get_tensorflow()
+        self.model = model
+        self._call = tf.function(lambda x: model(x, training=False),
+                                 input_signature=[tf.TensorSpec(shape=(None, INPUT_SIZE), dtype=tf.float32)])
+
+    def __call__(self, batch):
+        return self._call(batch).numpy()[:, 0]
+
+
+class TFLiteEvaluator:
+    """
+    Interpreter TFLite. Rozmiar wejścia zmieniamy tylko wtedy, gdy zmienia się rozmiar batcha,
+    bo allocate_tensors() jest kosztowne.
+    """
+
+    def __init__(self, model_content):
+        tf = get_tensorflow()
+        self.interpreter = tf.lite.Interpreter(model_content=model_content)
+        self.interpreter.allocate_tensors()
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+        self._batch_size = int(self._input['shape'][0])
+
+    @classmethod
+    def from_keras(cls, model):
+        tf = get_tensorflow()
+        converter = tf.lite.TFLiteConverter.from_keras_model(model)
+        return cls(converter.convert())
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, 'rb') as f:
+            return cls(f.read())
+
+    def __call__(self, batch):
+        if len(batch) != self._batch_size:
+            self.interpreter.resize_tensor_input(self._input['index'], [len(batch), INPUT_SIZE])
+            self.interpreter.allocate_tensors()
+            self._input = self.interpreter.get_input_details()[0]
+            self._output = self.interpreter.get_output_details()[0]
+            self._batch_size = len(batch)
+        self.interpreter.set_tensor(self._input['index'], self._quantize_input(batch))
+        self.interpreter.invoke()
+        return self._dequantize_output(self.interpreter.get_tensor(self._output['index']))[:, 0]
+
+    def _quantize_input(self, batch):
+        scale, zero_point = self._input['quantization']
+        if self._input['dtype'] == np.float32 or not scale:
+            return np.asarray(batch, dtype=np.float32)
+        return np.round(batch / scale + zero_point).astype(self._input['dtype'])
+
+    def _dequantize_output(self, output):
+        scale, zero_point = self._output['quantization']
+        if output.dtype == np.float32 or not scale:
+            return output
+        return (output.astype(np.float32) - zero_point) * scale
+
+
+class NumpyEvaluator:
+    """
+    Przejście w przód stosu warstw Dense w czystym NumPy (Dropout w inferencji nic nie robi).
+    Wagi czytamy wprost z pliku .h5 przez h5py, więc ten backend nie potrzebuje TensorFlow.
+    """
+
+    def __init__(self, layers):
+        # layers: lista (kernel (wejście, wyjście), bias (wyjście,), aktywacja 'relu'/'linear')
+        self.layers = [(np.ascontiguousarray(kernel, dtype=np.float32), np.asarray(bias, dtype=np.float32),
+                        activation) for kernel, bias, activation in layers]
+
+    @classmethod
+    def from_keras(cls, model):
+        layers = []
+        for layer in model.layers:
+            weights = layer.get_weights()
+            if len(weights) == 2:
+                layers.append((weights[0], weights[1], layer.get_config().get('activation', 'linear')))
+        return cls(layers)
+
+    @classmethod
+    def from_h5(cls, path):
+        import h5py
+
+        with h5py.File(path, 'r') as f:
+            config = json.loads(f.attrs['model_config'])
+            activations = {layer['config'].get('name'): layer['config'].get('activation', 'linear')
+                           for layer in config['config']['layers']}
+            weights_group = f['model_weights'] if 'model_weights' in f else f
+            layers = []
+            for name in weights_group.attrs['layer_names']:
+                name = name.decode() if isinstance(name, bytes) else name
+                weight_names = [wn.decode() if isinstance(wn, bytes) else wn
+                                for wn in weights_group[name].attrs['weight_names']]
+                if len(weight_names) == 2:
+                    kernel, bias = (weights_group[name][wn][()] for wn in weight_names)
+                    layers.append((kernel, bias, activations.get(name, 'linear')))
+        return cls(layers)
+
+    @classmethod
+    def random(cls, seed=0, sizes=(INPUT_SIZE, 256, 128, 64, 1)):
+        """Sieć o architekturze build_model z losowymi wagami - do benchmarków bez wytrenowanego modelu."""
+        rng = np.random.default_rng(seed)
+        layers = []
+        for index, (fan_in, fan_out) in enumerate(zip(sizes[:-1], sizes[1:])):
+            kernel = rng.normal(0.0, np.sqrt(2.0 / fan_in), size=(fan_in, fan_out))
+            activation = 'linear' if index == len(sizes) - 2 else 'relu'
+            layers.append((kernel, np.zeros(fan_out), activation))
+        return cls(layers)
+
+    def __call__(self, batch):
+        x = np.asarray(batch, dtype=np.float32)
+        for kernel, bias, activation in self.layers:
+            x = x @ kernel
+            x += bias
+            if activation == 'relu':
+                np.maximum(x, 0.0, out=x)
+        return x[:, 0]
+
+
+def create_evaluator(model_path, backend=DEFAULT_BACKEND):
+    """Buduje nowy evaluator danego backendu dla pliku modelu (.h5 albo .tflite)."""
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend inferencji musi być jednym z: {', '.join(BACKENDS)}")
+    if model_path.endswith('.tflite'):
+        if backend != 'tflite':
+            raise ValueError("Plik .tflite można wczytać tylko backendem 'tflite'")
+        return TFLiteEvaluator.from_file(model_path)
+
+    if backend in ('numpy', 'nnue'):
+        if backend == 'nnue':
+            from chess_nnue import NnueEvaluator as evaluator_class  # chess_nnue importuje ten moduł
+        else:
+            evaluator_class = NumpyEvaluator
+        try:
+            return evaluator_class.from_h5(model_path)
+        except ImportError:
+            # Bez h5py czytamy wagi przez Keras
+            return evaluator_class.from_keras(load_model(model_path))
+    model = load_model(model_path)
+    if backend == 'keras':
+        return KerasEvaluator(model)
+    if backend == 'function':
+        return FunctionEvaluator(model)
+    return TFLiteEvaluator.from_keras(model)
+
+
+def load_evaluator(model_path, backend=DEFAULT_BACKEND):
+    """Evaluator współdzielony w procesie - klucz (ścieżka, mtime, backend), jak w rejestrze modeli."""
+    key = model_key(model_path) + (backend,)
+    evaluator = _evaluators.get(key)
+    if evaluator is None:
+        for stale_key in [k for k in _evaluators if k[0] == key[0] and k[2] == backend]:
+            del _evaluators[stale_key]
+        evaluator = create_evaluator(model_path, backend)
+        _evaluators[key] = evaluator
+    return evaluator
+
+
+def measure_latency(evaluator, batch_size, repeats=200, warmup=10, seed=0):
+    """Średni czas jednego wywołania evaluatora (w sekundach) dla losowego batcha pozycji 0/1."""
+    rng = np.random.default_rng(seed)
+    batch = (rng.random((batch_size, INPUT_SIZE)) < 0.05).astype(np.float32)
+    for _ in range(warmup):
+        evaluator(batch)
+    start_time = time.perf_counter()
+    for _ in range(repeats):
+        evaluator(batch)
+    return (time.perf_counter() - start_time) / repeats
+
+
+def benchmark_backends(model_path, backends=BACKENDS, batch_sizes=(1, 32, 256), repeats=200):
+    """Zwraca {backend: {batch_size: opóźnienie w ms}}; backendy, których nie da się zbudować, są pomijane."""
+    results = {}
+    for backend in backends:
+        try:
+            evaluator = create_evaluator(model_path, backend)
+        except Exception as e:
+            print(f"Backend '{backend}' niedostępny: {e}")
+            continue
+        results[backend] = {batch_size: measure_latency(evaluator, batch_size, repeats) * 1000.0
+                            for batch_size in batch_sizes}
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Porównanie opóźnienia backendów inferencji.")
+    parser.add_argument('--model', default='trained_chess_model.h5')
+    parser.add_argument('--backends', nargs='+', default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument('--batch-sizes', nargs='+', type=int, default=[1, 32, 256])
+    parser.add_argument('--repeats', type=int, default=200)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.model):
+        raise SystemExit(f"Model '{args.model}' nie znaleziony.")
+    latency = benchmark_backends(args.model, args.backends, args.batch_sizes, args.repeats)
+    for backend_name, per_batch in latency.items():
+        timings = ', '.join(f"batch {batch_size}: {ms:.3f} ms" for batch_size, ms in per_batch.items())
+        print(f"{backend_name:>8}: {timings}")
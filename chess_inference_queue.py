@@ -0,0 +1,174 @@
+"""
+Wspólna kolejka inferencji dla wielu przeszukiwań naraz (np. wielu partii na serwerze).
+
+InferenceQueue zachowuje się jak evaluator (batch (N, 832) -> oceny (N,)), więc wstrzykuje się ją
+do ChessAIPlayer(evaluator=...). Wątki przeszukiwania wrzucają swoje batche liści do kolejki
+i czekają; jeden wątek inferencji skleja żądania z wielu partii i wykonuje jeden przebieg sieci, gdy:
+- zebrało się max_batch pozycji,
+- wszystkie aktywne przeszukiwania (zob. searching()) czekają na wynik - nic więcej nie przyjdzie,
+- najstarsze żądanie czeka max_delay albo zbliża się jego termin z latency_slo (minus czas przebiegu).
+Koszt wywołania sieci rozkłada się na wiele partii, więc przepustowość rośnie z liczbą partii.
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+
+DEFAULT_MAX_BATCH = 4096
+DEFAULT_MAX_DELAY_MS = 5.0
+LATENCY_WINDOW = 10000  # Z ilu ostatnich żądań liczymy percentyle opóźnienia
+
+
+class _Request:
+    __slots__ = ('batch', 'enqueued', 'done', 'scores', 'error')
+
+    def __init__(self, batch):
+        self.batch = batch
+        self.enqueued = time.perf_counter()
+        self.done = threading.Event()
+        self.scores = None
+        self.error = None
+
+
+class InferenceQueue:
+    """Evaluator sklejający żądania z wielu wątków w jeden batch; wątek inferencji startuje od razu."""
+
+    def __init__(self, evaluator, max_batch=DEFAULT_MAX_BATCH, max_delay_ms=DEFAULT_MAX_DELAY_MS,
+                 latency_slo_ms=None):
+        self.evaluator = evaluator
+        self.max_batch = max(1, int(max_batch))
+        self.max_delay = max_delay_ms / 1000.0
+        # Docelowe opóźnienie jednego żądania (kolejka + przebieg sieci); None = tylko max_delay
+        self.latency_slo = latency_slo_ms / 1000.0 if latency_slo_ms else None
+        self._pending = deque()
+        self._pending_rows = 0
+        self._condition = threading.Condition()
+        self._active_searches = 0
+        self._closed = False
+        self._forward_time = 0.0  # Średnia krocząca czasu przebiegu sieci
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self.requests = 0
+        self.batches = 0
+        self.rows = 0
+        self.slo_violations = 0
+        self._thread = threading.Thread(target=self._run, name='inference-queue', daemon=True)
+        self._thread.start()
+
+    def __call__(self, batch):
+        request = _Request(np.asarray(batch, dtype=np.float32))
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Kolejka inferencji jest zamknięta")
+            self._pending.append(request)
+            self._pending_rows += len(request.batch)
+            self._condition.notify()
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.scores
+
+    @contextmanager
+    def searching(self):
+        """
+        Oznacza trwające przeszukiwanie. Gdy wszystkie oznaczone przeszukiwania czekają w kolejce,
+        batch idzie do sieci od razu, bez czekania na max_delay.
+        """
+        with self._condition:
+            self._active_searches += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._active_searches -= 1
+                self._condition.notify()
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()
+
+    def _flush_deadline(self):
+        """Moment, w którym najstarsze żądanie musi trafić do sieci."""
+        oldest = self._pending[0].enqueued
+        deadline = oldest + self.max_delay
+        if self.latency_slo is not None:
+            deadline = min(deadline, oldest + max(0.0, self.latency_slo - self._forward_time))
+        return deadline
+
+    def _take_batch(self):
+        """Czeka na warunek wysyłki i zdejmuje żądania z kolejki (None po zamknięciu)."""
+        with self._condition:
+            while True:
+                if self._pending:
+                    everyone_waiting = self._active_searches and len(self._pending) >= self._active_searches
+                    if self._pending_rows >= self.max_batch or everyone_waiting or self._closed:
+                        break
+                    timeout = self._flush_deadline() - time.perf_counter()
+                    if timeout <= 0:
+                        break
+                    self._condition.wait(timeout)
+                elif self._closed:
+                    return None
+                else:
+                    self._condition.wait()
+            requests = []
+            rows = 0
+            # Zawsze bierzemy co najmniej jedno żądanie, nawet większe niż max_batch
+            while self._pending and (not requests or rows + len(self._pending[0].batch) <= self.max_batch):
+                request = self._pending.popleft()
+                requests.append(request)
+                rows += len(request.batch)
+            self._pending_rows -= rows
+            return requests
+
+    def _run(self):
+        while True:
+            requests = self._take_batch()
+            if requests is None:
+                return
+            start_time = time.perf_counter()
+            try:
+                batch = requests[0].batch if len(requests) == 1 else np.concatenate([r.batch for r in requests])
+                scores = np.asarray(self.evaluator(batch))
+            except Exception as e:  # Błąd sieci zgłaszamy w wątkach, które czekają na wynik
+                for request in requests:
+                    request.error = e
+                    request.done.set()
+                continue
+            finished = time.perf_counter()
+            forward_time = finished - start_time
+            self._forward_time = forward_time if not self.batches else 0.9 * self._forward_time + 0.1 * forward_time
+
+            offset = 0
+            for request in requests:
+                count = len(request.batch)
+                request.scores = scores[offset:offset + count]
+                offset += count
+                latency = finished - request.enqueued
+                self._latencies.append(latency)
+                if self.latency_slo is not None and latency > self.latency_slo:
+                    self.slo_violations += 1
+                request.done.set()
+            self.requests += len(requests)
+            self.batches += 1
+            self.rows += len(batch)
+
+    def stats(self):
+        latencies = np.array(self._latencies) * 1000.0 if self._latencies else np.zeros(1)
+        return {
+            'requests': self.requests,
+            'batches': self.batches,
+            'positions': self.rows,
+            'requests_per_batch': self.requests / self.batches if self.batches else 0.0,
+            'positions_per_batch': self.rows / self.batches if self.batches else 0.0,
+            'forward_ms': self._forward_time * 1000.0,
+            'latency_p50_ms': float(np.percentile(latencies, 50)),
+            'latency_p99_ms': float(np.percentile(latencies, 99)),
+            'latency_slo_ms': self.latency_slo * 1000.0 if self.latency_slo is not None else None,
+            'slo_violations': self.slo_violations,
+            'active_searches': self._active_searches,
+        }
@@ -1,41 +1,118 @@
+import cProfile
 import chess
+import chess.polyglot
+import io
+import math
+import pstats
 import random
 import os  # Dodano import os
+import threading
+import time
 
-# Importowanie TensorFlow i NumPy
-try:
-    import tensorflow as tf
-    import numpy as np
+import numpy as np
 
-    print("TensorFlow załadowany.")
-    _TENSORFLOW_AVAILABLE = True
-    MODEL_PATH = 'trained_chess_model.h5'  # Ścieżka do wytrenowanego modelu
-except ImportError:
-    print("TensorFlow nie jest zainstalowany. AI będzie używać losowych ruchów.")
-    _TENSORFLOW_AVAILABLE = False
-except Exception as e:
-    print(f"Błąd podczas ładowania TensorFlow: {e}")
-    print("AI będzie używać losowych ruchów.")
-    _TENSORFLOW_AVAILABLE = False
+from chess_board_encoder import encode_board, INPUT_SIZE
+from chess_eval_cache import DEFAULT_EVAL_CACHE_SIZE, EvaluationCache, get_cache
+from chess_inference import DEFAULT_BACKEND, load_evaluator
+from chess_model_registry import get_tensorflow
+from chess_search_stats import SearchStats
+from chess_transposition import (TranspositionTable, DEFAULT_TT_SIZE_MB, EXACT, LOWER_BOUND, UPPER_BOUND,
+                                 position_key)
+
+# TensorFlow nie jest importowany tutaj - chess_model_registry ładuje go dopiero dla gracza AI_TF
+MODEL_PATH = 'trained_chess_model.h5'  # Ścieżka do wytrenowanego modelu
+
+DEFAULT_BATCH_SIZE = 1024
+MAX_SEARCH_DEPTH = 64
+DEFAULT_SEARCH_DEPTH = 2  # Głębokość, gdy nie podano ani głębokości, ani limitu czasu / węzłów
+SEARCH_ALGORITHMS = ('alphabeta', 'minimax')
+MATE_SCORE = 1000000
+DEFAULT_BOOK_MAX_PLY = 20  # Do którego półruchu partii korzystamy z książki otwarć
+
+# Wartości figur dla porządkowania bić (MVV-LVA)
+PIECE_VALUES = {
+    chess.PAWN: 1, chess.KNIGHT: 3, chess.BISHOP: 3,
+    chess.ROOK: 5, chess.QUEEN: 9, chess.KING: 100
+}
+
+
+class _SearchAborted(Exception):
+    """Przerwanie przeszukiwania po przekroczeniu limitu czasu lub węzłów."""
+
+
+def search_depth_limit(depth, time_limit=None, node_limit=None):
+    """
+    Ostatnia głębokość pogłębiania iteracyjnego. Bez głębokości (None lub 0) pogłębiamy do
+    MAX_SEARCH_DEPTH tylko wtedy, gdy przeszukiwanie zatrzyma limit czasu lub węzłów; bez
+    żadnego limitu liczymy do DEFAULT_SEARCH_DEPTH. Przeszukiwanie aż do stop_event
+    (UCI go infinite / ponder) musi podać depth=MAX_SEARCH_DEPTH wprost.
+    """
+    if depth:
+        return max(1, depth)
+    return MAX_SEARCH_DEPTH if time_limit or node_limit else DEFAULT_SEARCH_DEPTH
 
 
 # Klasa dla AI gracza
 class ChessAIPlayer:
-    def __init__(self, use_tensorflow=False):
-        self.use_tensorflow = use_tensorflow and _TENSORFLOW_AVAILABLE
-        self.tf_model = None
-        if self.use_tensorflow:
-            if os.path.exists(MODEL_PATH):
-                print(f"Ładowanie wytrenowanego modelu TensorFlow z: {MODEL_PATH}")
+    def __init__(self, use_tensorflow=False, batch_size=DEFAULT_BATCH_SIZE, search_algorithm='alphabeta',
+                 tt_size_mb=DEFAULT_TT_SIZE_MB, model_path=MODEL_PATH, inference_backend=DEFAULT_BACKEND,
+                 evaluator=None, stats_callback=None, profile=False, workers=1,
+                 eval_cache_size=DEFAULT_EVAL_CACHE_SIZE, eval_cache_path=None, book_path=None,
+                 book_max_ply=DEFAULT_BOOK_MAX_PLY):
+        if search_algorithm not in SEARCH_ALGORITHMS:
+            raise ValueError(f"Algorytm przeszukiwania musi być jednym z: {', '.join(SEARCH_ALGORITHMS)}")
+        self.use_tensorflow = use_tensorflow
+        # Funkcja oceny: batch (N, 832) -> oceny (N,); zob. backendy w chess_inference
+        self.evaluator = evaluator
+        # Ile liści oceniamy w jednym przebiegu sieci (większy batch = mniej wywołań, więcej pamięci)
+        self.batch_size = max(1, int(batch_size))
+        self.search_algorithm = search_algorithm
+        # Liczba procesów dla alpha-beta (>1 = równoległe przeszukiwanie korzenia, chess_parallel_search)
+        self.workers = max(1, int(workers))
+        self._parallel = None
+        self._player_options = {'batch_size': self.batch_size, 'tt_size_mb': tt_size_mb, 'model_path': model_path,
+                                'inference_backend': inference_backend, 'evaluator': evaluator,
+                                'eval_cache_size': eval_cache_size}
+        # SearchStats ostatniego ruchu; stats_callback(stats) dostaje też wyniki kolejnych iteracji pogłębiania
+        self.last_search_stats = None
+        self.stats_callback = stats_callback
+        # Opcjonalny cProfile: True = zbieraj w pamięci (profile_report), ścieżka = zapisuj też plik .prof
+        self.profile = profile
+        self.profiler = cProfile.Profile() if profile else None
+        self._reset_search_counters()
+        self._can_abort = False
+        self._deadline = None
+        # set_deadline przed startem przeszukiwania (np. ponderhit tuż po go ponder) czeka tu na jego start
+        self._deadline_lock = threading.Lock()
+        self._searching = False
+        self._deadline_pending = False
+        self._pending_deadline = None
+        self._node_limit = None
+        self._stop_event = None
+        self._pv = []
+        self._root_ply = 0
+        if model_path.endswith('.tflite') and inference_backend != 'tflite':
+            # Model int8 z chess_model_trainer --export-int8 ma tylko postać TFLite
+            inference_backend = 'tflite'
+            self._player_options['inference_backend'] = inference_backend
+        if self.use_tensorflow and self.evaluator is None:
+            if os.path.exists(model_path):
+                print(f"Ładowanie wytrenowanego modelu TensorFlow z: {model_path} (backend: {inference_backend})")
                 try:
-                    self.tf_model = tf.keras.models.load_model(MODEL_PATH)
+                    if inference_backend not in ('numpy', 'nnue') and not model_path.endswith('.tflite') \
+                            and get_tensorflow() is None:
+                        print("Brak TensorFlow - ocena sieci przez backend NumPy (nnue).")
+                        inference_backend = 'nnue'
+                        self._player_options['inference_backend'] = inference_backend
+                    # Model jest współdzielony przez wszystkich graczy w procesie (ładowany raz)
+                    self.evaluator = load_evaluator(model_path, inference_backend)
                     print("Model TensorFlow załadowany pomyślnie.")
                 except Exception as e:
                     print(f"Błąd podczas ładowania modelu TensorFlow: {e}")
                     print("AI przełączy się na losowe ruchy z powodu błędu modelu.")
                     self.use_tensorflow = False
             else:
-                print(f"Ostrzeżenie: Model '{MODEL_PATH}' nie znaleziony. AI użyje losowych ruchów.")
+                print(f"Ostrzeżenie: Model '{model_path}' nie znaleziony. AI użyje losowych ruchów.")
                 print(
                     "Uruchom 'chess_dataset_generator.py', a następnie 'chess_model_trainer.py' aby wytrenować model.")
                 self.use_tensorflow = False
@@ -43,91 +120,644 @@ class ChessAIPlayer:
         if not self.use_tensorflow:
             print("AI użyje prostego losowego algorytmu.")
 
-    def _board_to_input_representation(self, board):
+        # Książka otwarć Polyglot (.bin) - sprawdzana przed przeszukiwaniem, do półruchu book_max_ply
+        self.book_path = book_path
+        self.book_max_ply = book_max_ply
+        self._book = None
+        if book_path:
+            try:
+                self._book = chess.polyglot.open_reader(book_path)
+            except OSError as e:
+                print(f"Nie udało się otworzyć książki otwarć '{book_path}': {e}")
+
+        # Cache ocen (klucz pozycji -> ocena) współdzielony przez graczy z tym samym modelem, także między
+        # partiami; dla wstrzykniętego evaluatora nie wiemy, kiedy zmienią się wagi, więc cache jest prywatny
+        self.eval_cache = None
+        self.eval_cache_path = eval_cache_path
+        if self.use_tensorflow and eval_cache_size:
+            if evaluator is not None:
+                self.eval_cache = EvaluationCache(eval_cache_size)
+            else:
+                self.eval_cache = get_cache(model_path, inference_backend, eval_cache_size, eval_cache_path)
+
+        # Evaluator z akumulatorem (backend 'nnue') ocenia dzieci węzła bez kodowania pozycji;
+        # stos akumulatorów jest stanem przeszukiwania, więc każdy gracz ma własny
+        self._accumulator = self.evaluator.new_accumulator() \
+            if self.use_tensorflow and hasattr(self.evaluator, 'new_accumulator') else None
+
+        # Tablica transpozycji żyje między kolejnymi wywołaniami get_best_move w jednej partii
+        self.transposition_table = TranspositionTable(tt_size_mb) if tt_size_mb and self.use_tensorflow else None
+
+    def _board_to_input_representation(self, board, out=None):
         """
         Tworzy wektorową reprezentację szachownicy dla sieci neuronowej.
-        Musimy użyć tej samej funkcji, której użyliśmy do generowania danych treningowych.
+        Korzysta z tego samego kodera (chess_board_encoder), którego używa generator danych treningowych.
         """
-        representation = np.zeros((13, 8, 8), dtype=np.float32)
-
-        piece_to_index = {
-            chess.PAWN: 0, chess.KNIGHT: 1, chess.BISHOP: 2,
-            chess.ROOK: 3, chess.QUEEN: 4, chess.KING: 5
-        }
+        start_time = time.perf_counter()
+        out = encode_board(board, out)
+        self.encode_time += time.perf_counter() - start_time
+        return out
 
-        for square in chess.SQUARES:
-            piece = board.piece_at(square)
-            if piece:
-                row, col = chess.square_rank(square), chess.square_file(square)
-                piece_idx = piece_to_index[piece.piece_type]
-
-                if piece.color == chess.WHITE:
-                    representation[piece_idx, row, col] = 1.0
+    def get_best_move(self, board, depth=DEFAULT_SEARCH_DEPTH, time_limit=None, node_limit=None, stop_event=None):
+        """
+        Zwraca najlepszy ruch dla pozycji `board`.
+        Alpha-beta działa iteracyjnie (głębokość 1, 2, 3, ... aż do `depth`) i może zostać przerwana
+        po `time_limit` sekundach lub `node_limit` węzłach - wtedy zwracamy ruch z ostatniej
+        ukończonej iteracji. Przy limicie czasu lub węzłów `depth=None` oznacza brak limitu
+        głębokości, bez limitów - DEFAULT_SEARCH_DEPTH (search_depth_limit).
+        Ustawienie `stop_event` (threading.Event) z innego wątku anuluje przeszukiwanie, ale
+        dopiero po pierwszej iteracji - zwracamy wtedy jak zwykle ruch z ostatniej ukończonej.
+        Minimax (wersja referencyjna) zawsze liczy do stałej głębokości; anulowany nie ma wyniku
+        częściowego, więc zwraca wtedy losowy legalny ruch.
+        Jeśli pozycja jest w książce otwarć, ruch wybieramy z niej (losowo, proporcjonalnie do wag).
+        """
+        book_move = self._book_move(board)
+        if book_move:
+            self.last_search_stats = SearchStats('book', pv=[book_move.uci()])
+            if self.stats_callback:
+                self.stats_callback(self.last_search_stats)
+            return book_move
+
+        if self.use_tensorflow and self.evaluator:
+            if self.profiler:
+                self.profiler.enable()
+            self._reset_search_counters()
+            if self.transposition_table:
+                self.transposition_table.new_search()
+            try:
+                if self.search_algorithm == 'minimax':
+                    self._stop_event = stop_event
+                    try:
+                        best_move, best_score = self._search_minimax(board, depth or DEFAULT_SEARCH_DEPTH)
+                        depth_reached, pv = depth or DEFAULT_SEARCH_DEPTH, [best_move] if best_move else []
+                    except _SearchAborted:
+                        # Minimax nie ma wyniku częściowego - anulowane przeszukiwanie nie ma ruchu
+                        best_move, best_score, depth_reached, pv = None, None, 0, []
+                    finally:
+                        self._stop_event = None
+                elif self.workers > 1:
+                    best_move, best_score, depth_reached, pv = self._parallel_search().iterative_deepening(
+                        self, board, depth, self._start_time, time_limit, node_limit, stop_event)
                 else:
-                    representation[piece_idx + 6, row, col] = 1.0
+                    self._stop_event = stop_event
+                    try:
+                        best_move, best_score, depth_reached, pv = self._iterative_deepening(
+                            board, depth, self._start_time, time_limit, node_limit)
+                    finally:
+                        self._stop_event = None
+            finally:
+                self._end_deadline()
+                if self.profiler:
+                    self.profiler.disable()
+                    if isinstance(self.profile, str):
+                        self.profiler.dump_stats(self.profile)
+            self.last_search_stats = self._snapshot_stats(depth_reached, pv, best_score)
+            if self.stats_callback:
+                self.stats_callback(self.last_search_stats)
+            return best_move if best_move else self._get_random_move(board)
 
-        if board.turn == chess.WHITE:
-            representation[12, :, :] = 1.0
         else:
-            representation[12, :, :] = 0.0
-
-        return representation.flatten()  # Spłaszczamy do jednowymiarowego wektora
+            return self._get_random_move(board)
 
-    def get_best_move(self, board, depth=2):
-        if self.use_tensorflow and self.tf_model:
-            best_move = None
-            best_score = -float('inf') if board.turn == chess.WHITE else float('inf')
+    def set_deadline(self, time_limit):
+        """
+        Zmienia limit czasu trwającego przeszukiwania (można wołać z innego wątku, np. po ponderhit
+        w UCI): `time_limit` sekund od teraz, None = bez limitu czasu. Jeśli przeszukiwanie jeszcze
+        nie ruszyło, termin zostaje zapamiętany i zastąpi ten z `time_limit` przekazanego do get_best_move.
+        """
+        deadline = time.perf_counter() + time_limit if time_limit is not None else None
+        with self._deadline_lock:
+            if self._searching:
+                self._deadline = deadline
+            else:
+                self._deadline_pending = True
+                self._pending_deadline = deadline
+
+    def clear_pending_deadline(self):
+        """Zapomina termin z set_deadline, który nie trafił do żadnego przeszukiwania (przed nowym go)."""
+        with self._deadline_lock:
+            self._deadline_pending = False
+            self._pending_deadline = None
+
+    def _begin_deadline(self, start_time, time_limit):
+        """Ustawia termin na start przeszukiwania; termin z set_deadline ma pierwszeństwo przed `time_limit`."""
+        with self._deadline_lock:
+            self._searching = True
+            if self._deadline_pending:
+                self._deadline = self._pending_deadline
+                self._deadline_pending = False
+                self._pending_deadline = None
+            else:
+                self._deadline = start_time + time_limit if time_limit else None
 
-            for move in board.legal_moves:
-                board.push(move)
-                # Zmieniamy argument 'maximizing_player' w _minimax
-                # Ocenę na końcu rekurencji uzyskujemy z modelu TensorFlow
-                score = self._minimax(board, depth - 1, not board.turn)
-                board.pop()
+    def _end_deadline(self):
+        with self._deadline_lock:
+            self._searching = False
 
-                if board.turn == chess.WHITE:
-                    if score > best_score:
-                        best_score = score
-                        best_move = move
-                else:
-                    if score < best_score:
-                        best_score = score
-                        best_move = move
+    def _book_move(self, board):
+        if self._book is None or board.ply() >= self.book_max_ply:
+            return None
+        try:
+            return self._book.weighted_choice(board).move  # Moduł random (runner ustawia ziarno)
+        except IndexError:
+            return None  # Pozycji nie ma w książce
+
+    def _parallel_search(self):
+        """Pula procesów tworzona przy pierwszym ruchu i używana do końca gry (quit_engine ją zamyka)."""
+        if self._parallel is None:
+            from chess_parallel_search import RootParallelSearch  # chess_parallel_search importuje ten moduł
+            self._parallel = RootParallelSearch(self.workers, self._player_options)
+        return self._parallel
+
+    def _reset_search_counters(self):
+        self.nodes_searched = 0
+        self.leaf_evaluations = 0
+        self.nn_batches = 0
+        self.tt_hits = 0
+        self.eval_cache_hits = 0
+        self.movegen_time = 0.0
+        self.encode_time = 0.0
+        self.inference_time = 0.0
+        self._start_time = time.perf_counter()
+
+    def _snapshot_stats(self, depth, pv, score, final=True):
+        return SearchStats(self.search_algorithm, depth=depth, pv=[move.uci() for move in pv], score=score,
+                           nodes=self.nodes_searched, leaf_evals=self.leaf_evaluations, nn_batches=self.nn_batches,
+                           tt_hits=self.tt_hits, eval_cache_hits=self.eval_cache_hits,
+                           time=time.perf_counter() - self._start_time, movegen_time=self.movegen_time,
+                           encode_time=self.encode_time, inference_time=self.inference_time, final=final)
+
+    def profile_report(self, limit=25, sort='cumulative'):
+        """Tekstowy raport cProfile ze wszystkich dotychczasowych ruchów (wymaga profile=True lub ścieżki)."""
+        if not self.profiler:
+            return ''
+        output = io.StringIO()
+        pstats.Stats(self.profiler, stream=output).sort_stats(sort).print_stats(limit)
+        return output.getvalue()
+
+    def _legal_moves(self, board):
+        start_time = time.perf_counter()
+        moves = list(board.legal_moves)
+        self.movegen_time += time.perf_counter() - start_time
+        return moves
+
+    def _has_legal_moves(self, board):
+        start_time = time.perf_counter()
+        has_moves = any(board.generate_legal_moves())
+        self.movegen_time += time.perf_counter() - start_time
+        return has_moves
+
+    def _terminal_score(self, board):
+        """Zwraca ocenę pozycji końcowej (mat/pat) albo None, jeśli potrzebna jest ocena sieci."""
+        if board.is_checkmate():
+            return -MATE_SCORE if board.turn == chess.WHITE else MATE_SCORE
+        elif board.is_stalemate():
+            return 0
+        return None
 
-            return best_move if best_move else self._get_random_move(board)
+    def _evaluate_batch(self, batch):
+        """Ocenia batch reprezentacji (N, 832) jednym przebiegiem sieci i zwraca listę ocen."""
+        self.nn_batches += 1
+        self.leaf_evaluations += len(batch)
+        start_time = time.perf_counter()
+        scores = self.evaluator(batch).tolist()
+        self.inference_time += time.perf_counter() - start_time
+        return scores
+
+    def _evaluate_moves(self, board, moves):
+        """Jak _evaluate_batch, ale dla pozycji po ruchach `moves`, liczonych z akumulatora rodzica."""
+        self.nn_batches += 1
+        self.leaf_evaluations += len(moves)
+        start_time = time.perf_counter()
+        scores = self._accumulator.evaluate_moves(board, moves).tolist()
+        self.inference_time += time.perf_counter() - start_time
+        return scores
+
+    def _push(self, board, move):
+        if self._accumulator:
+            self._accumulator.push(board, move)
+        else:
+            board.push(move)
 
+    def _pop(self, board):
+        if self._accumulator:
+            self._accumulator.pop(board)
         else:
-            return self._get_random_move(board)
+            board.pop()
+
+    # --- Iteracyjne pogłębianie z limitem czasu / węzłów ---
+
+    def _iterative_deepening(self, board, depth, start_time, time_limit, node_limit):
+        max_depth = search_depth_limit(depth, time_limit, node_limit)
+        self._begin_deadline(start_time, time_limit)
+        self._node_limit = node_limit
+        self._root_ply = len(board.move_stack)
+        self._pv = []
+        self.history_scores = {}
+
+        best_move, best_score, depth_reached = None, None, 0
+        for current_depth in range(1, max_depth + 1):
+            # Pierwsza iteracja zawsze musi się skończyć, żeby był jakiś ruch
+            self._can_abort = current_depth > 1
+            try:
+                move, score = self._search_alphabeta(board, current_depth)
+            except _SearchAborted:
+                while len(board.move_stack) > self._root_ply:
+                    board.pop()
+                break
+
+            best_move, best_score, depth_reached = move, score, current_depth
+            self._pv = self._extract_pv(board, current_depth)
+            if move is None:
+                break
+            if self._pv[:1] != [move]:
+                self._pv = [move]
+            if self.stats_callback:
+                self.stats_callback(self._snapshot_stats(current_depth, self._pv, score, final=False))
+            if self._deadline and time.perf_counter() >= self._deadline:
+                break
+
+        self._can_abort = False
+        return best_move, best_score, depth_reached, self._pv
+
+    def _check_limits(self):
+        # Pierwszej iteracji nie przerywa nawet stop_event - jej ruch jest wynikiem przeszukiwania
+        if not self._can_abort:
+            return
+        if self._stop_event is not None and self._stop_event.is_set():
+            raise _SearchAborted()
+        if self._node_limit and self.nodes_searched >= self._node_limit:
+            raise _SearchAborted()
+        if self._deadline and time.perf_counter() >= self._deadline:
+            raise _SearchAborted()
+
+    def _extract_pv(self, board, depth):
+        """Odtwarza główny wariant z najlepszych ruchów zapisanych w tablicy transpozycji."""
+        pv = []
+        if not self.transposition_table:
+            return pv
+        for _ in range(depth):
+            entry = self.transposition_table.probe(position_key(board))
+            if not entry or entry[3] is None or not board.is_legal(entry[3]):
+                break
+            pv.append(entry[3])
+            board.push(entry[3])
+        for _ in pv:
+            board.pop()
+        return pv
+
+    def _pv_move(self, board, ply):
+        """Ruch z wariantu głównego poprzedniej iteracji, jeśli jesteśmy na jego ścieżce."""
+        if ply < len(self._pv) and board.move_stack[self._root_ply:] == self._pv[:ply]:
+            return self._pv[ply]
+        return None
 
-    def _minimax(self, board, current_depth, maximizing_player):
-        if current_depth == 0 or board.is_game_over():
-            if board.is_checkmate():
-                return -1000000 if board.turn == chess.WHITE else 1000000
-            elif board.is_stalemate():
-                return 0
+    # --- Alpha-beta z porządkowaniem ruchów ---
 
-            # Użyj wytrenowanego modelu TensorFlow do oceny
-            board_rep = self._board_to_input_representation(board)
-            # Model przewiduje na batchu, więc trzeba mu podać (1, input_shape)
-            evaluation = self.tf_model.predict(np.expand_dims(board_rep, axis=0), verbose=0)[0][0]
-            return evaluation
+    def _search_alphabeta(self, board, depth):
+        """
+        Alpha-beta (fail-soft) z porządkowaniem ruchów: bicia (MVV-LVA) i szachy najpierw,
+        potem ruchy-zabójcy (killer moves) i heurystyka historii.
+        Przy remisie ocen wybieramy ruch wcześniejszy w kolejności board.legal_moves,
+        tak jak pełny minimax, więc przy tej samej głębokości wynik jest ten sam.
+        """
+        self.killer_moves = [[None, None] for _ in range(depth + 1)]
+        if self._accumulator:
+            # Po przerwanym przeszukiwaniu stos może nie odpowiadać planszy - liczymy korzeń od nowa
+            self._accumulator.refresh(board)
+
+        legal_moves = self._legal_moves(board)
+        if not legal_moves:
+            return None, self._terminal_score(board)
+        legal_order = {move: index for index, move in enumerate(legal_moves)}
+        maximizing_player = board.turn == chess.WHITE
+
+        key = position_key(board)
+        if depth <= 1:
+            scores = self._evaluate_children(board, legal_moves)
+            best_move, best_score = None, None
+            for move, score in zip(legal_moves, scores):
+                if best_move is None or (score > best_score if maximizing_player else score < best_score):
+                    best_move, best_score = move, score
+            if self.transposition_table:
+                self.transposition_table.store(key, 1, best_score, EXACT, best_move)
+            return best_move, best_score
+
+        tt_entry = self._probe_tt(key)
+        tt_move = tt_entry[3] if tt_entry else self._pv_move(board, 0)
+
+        best_move = None
+        best_score = -float('inf') if maximizing_player else float('inf')
+        for move in self._order_moves(board, legal_moves, 0, tt_move):
+            # Ruch wcześniejszy w legal_moves wygrywa remis, więc dla niego okno obejmuje też równość
+            earlier = best_move is not None and legal_order[move] < legal_order[best_move]
+            self._push(board, move)
+            if maximizing_player:
+                alpha = math.nextafter(best_score, -float('inf')) if earlier else best_score
+                score = self._alphabeta(board, depth - 1, alpha, float('inf'), 1)
+            else:
+                beta = math.nextafter(best_score, float('inf')) if earlier else best_score
+                score = self._alphabeta(board, depth - 1, -float('inf'), beta, 1)
+            self._pop(board)
+
+            if best_move is None:
+                best_move, best_score = move, score
+            elif maximizing_player and (score > best_score or (earlier and score == best_score)):
+                best_move, best_score = move, score
+            elif not maximizing_player and (score < best_score or (earlier and score == best_score)):
+                best_move, best_score = move, score
+
+        if self.transposition_table:
+            self.transposition_table.store(key, depth, best_score, EXACT, best_move)
+        return best_move, best_score
+
+    def _probe_tt(self, key):
+        if not self.transposition_table:
+            return None
+        entry = self.transposition_table.probe(key)
+        if entry:
+            self.tt_hits += 1
+        return entry
+
+    def _alphabeta(self, board, current_depth, alpha, beta, ply):
+        self._check_limits()
+        self.nodes_searched += 1
+
+        legal_moves = self._legal_moves(board)
+        if not legal_moves:
+            if board.is_check():
+                return -MATE_SCORE if board.turn == chess.WHITE else MATE_SCORE
+            return 0
+        if current_depth == 0 or self._is_drawn_without_moves(board):
+            return self._evaluate_batch(np.expand_dims(self._board_to_input_representation(board), axis=0))[0]
+
+        maximizing_player = board.turn == chess.WHITE
+        key = position_key(board)
+        tt_entry = self._probe_tt(key)
+        tt_move = None
+        if tt_entry:
+            entry_depth, entry_score, entry_flag, tt_move = tt_entry
+            # Tylko wpisy o tej samej głębokości: wynik pozostaje taki sam jak pełnego minimaxu
+            if entry_depth == current_depth:
+                if entry_flag == EXACT:
+                    return entry_score
+                if entry_flag == LOWER_BOUND and entry_score >= beta:
+                    return entry_score
+                if entry_flag == UPPER_BOUND and entry_score <= alpha:
+                    return entry_score
+
+        # Ostatni poziom: wszystkie dzieci oceniamy jednym przebiegiem sieci
+        if current_depth == 1:
+            scores = self._evaluate_children(board, legal_moves)
+            best_index = max(range(len(scores)), key=scores.__getitem__) if maximizing_player \
+                else min(range(len(scores)), key=scores.__getitem__)
+            if self.transposition_table:
+                self.transposition_table.store(key, 1, scores[best_index], EXACT, legal_moves[best_index])
+            return scores[best_index]
+
+        if tt_move is None:
+            tt_move = self._pv_move(board, ply)
+
+        alpha_orig, beta_orig = alpha, beta
+        best_move = None
+        best_score = -float('inf') if maximizing_player else float('inf')
+        for move in self._order_moves(board, legal_moves, ply, tt_move):
+            self._push(board, move)
+            score = self._alphabeta(board, current_depth - 1, alpha, beta, ply + 1)
+            self._pop(board)
+
+            if maximizing_player:
+                if score > best_score or best_move is None:
+                    best_score, best_move = score, move
+                alpha = max(alpha, best_score)
+            else:
+                if score < best_score or best_move is None:
+                    best_score, best_move = score, move
+                beta = min(beta, best_score)
+
+            if alpha >= beta:
+                self._record_cutoff(board, move, current_depth, ply)
+                break
+
+        if self.transposition_table:
+            if best_score <= alpha_orig:
+                flag = UPPER_BOUND
+            elif best_score >= beta_orig:
+                flag = LOWER_BOUND
+            else:
+                flag = EXACT
+            self.transposition_table.store(key, current_depth, best_score, flag, best_move)
+        return best_score
 
-        if maximizing_player:
-            max_eval = -float('inf')
-            for move in board.legal_moves:
-                board.push(move)
-                eval = self._minimax(board, current_depth - 1, False)
-                board.pop()
-                max_eval = max(max_eval, eval)
-            return max_eval
+    def _evaluate_children(self, board, moves):
+        """
+        Ocenia wszystkie pozycje po ruchach `moves`; pozycje niekońcowe trafiają do jednego batcha.
+        Oceny sieci zapisujemy w tablicy transpozycji z głębokością 0, więc pozycja oceniona
+        raz (także przy poprzednim ruchu) nie jest ponownie kodowana ani oceniana.
+        """
+        scores = [0.0] * len(moves)
+        pending = []
+        pending_keys = []
+        incremental = self._accumulator is not None
+        batch = None if incremental else np.empty((min(len(moves), self.batch_size), INPUT_SIZE), dtype=np.float32)
+        for index, move in enumerate(moves):
+            self._check_limits()
+            board.push(move)
+            self.nodes_searched += 1
+            if not self._has_legal_moves(board):
+                if board.is_check():
+                    scores[index] = -MATE_SCORE if board.turn == chess.WHITE else MATE_SCORE
+            else:
+                key = position_key(board) if self.transposition_table or self.eval_cache is not None else None
+                tt_entry = self._probe_tt(key) if key is not None else None
+                cached = None
+                if tt_entry and tt_entry[0] == 0 and tt_entry[2] == EXACT:
+                    cached = tt_entry[1]
+                elif self.eval_cache is not None:
+                    cached = self.eval_cache.get(key)
+                if cached is not None:
+                    scores[index] = cached
+                    self.eval_cache_hits += 1
+                else:
+                    if not incremental:
+                        if len(pending) == len(batch):
+                            self._score_pending(batch, pending, pending_keys, scores)
+                        self._board_to_input_representation(board, batch[len(pending)])
+                    pending.append(index)
+                    pending_keys.append(key)
+            board.pop()
+        if incremental:
+            if pending:
+                values = self._evaluate_moves(board, [moves[index] for index in pending])
+                self._assign_scores(values, pending, pending_keys, scores)
         else:
-            min_eval = float('inf')
-            for move in board.legal_moves:
+            self._score_pending(batch, pending, pending_keys, scores)
+        return scores
+
+    def _score_pending(self, batch, pending, pending_keys, scores):
+        if not pending:
+            return
+        self._assign_scores(self._evaluate_batch(batch[:len(pending)]), pending, pending_keys, scores)
+
+    def _assign_scores(self, values, pending, pending_keys, scores):
+        for index, key, score in zip(pending, pending_keys, values):
+            scores[index] = score
+            if key is not None:
+                if self.transposition_table:
+                    self.transposition_table.store(key, 0, score, EXACT)
+                if self.eval_cache is not None:
+                    self.eval_cache.put(key, score)
+        pending.clear()
+        pending_keys.clear()
+
+    def _is_drawn_without_moves(self, board):
+        """Zakończenie gry, które nie wynika z braku ruchów (materiał, 75 ruchów, pięciokrotne powtórzenie)."""
+        return board.is_insufficient_material() or board.is_seventyfive_moves() or board.is_fivefold_repetition()
+
+    def _order_moves(self, board, moves, ply, tt_move=None):
+        killers = self.killer_moves[ply] if ply < len(self.killer_moves) else ()
+
+        def move_priority(move):
+            if move == tt_move:
+                return 10000000
+            if board.is_capture(move):
+                if board.is_en_passant(move):
+                    victim = chess.PAWN
+                else:
+                    victim = board.piece_type_at(move.to_square)
+                attacker = board.piece_type_at(move.from_square)
+                return 3000000 + 10 * PIECE_VALUES[victim] - PIECE_VALUES[attacker]
+            if move.promotion:
+                return 2500000 + PIECE_VALUES[move.promotion]
+            if board.gives_check(move):
+                return 2000000
+            if move in killers:
+                return 1000000 + (1 if move == killers[0] else 0)
+            return self.history_scores.get((board.turn, move.from_square, move.to_square), 0)
+
+        # sorted() jest stabilne, więc przy równych priorytetach zostaje kolejność legal_moves
+        return sorted(moves, key=move_priority, reverse=True)
+
+    def _record_cutoff(self, board, move, current_depth, ply):
+        """Zapamiętuje ruch cichy, który spowodował odcięcie (killer + historia)."""
+        if board.is_capture(move) or move.promotion:
+            return
+        killers = self.killer_moves[ply]
+        if move != killers[0]:
+            killers[1] = killers[0]
+            killers[0] = move
+        key = (board.turn, move.from_square, move.to_square)
+        self.history_scores[key] = self.history_scores.get(key, 0) + current_depth * current_depth
+
+    # --- Minimax z wsadową oceną liści (wersja referencyjna) ---
+
+    def _search_minimax(self, board, depth):
+        """
+        Minimax z wsadową oceną liści.
+        Najpierw zbieramy cały horyzont (liście drzewa) do bufora (batch_size, 832),
+        oceniamy go jednym wywołaniem modelu na każde zapełnienie bufora,
+        a dopiero potem cofamy wartości w górę drzewa.
+        """
+        self._leaf_buffer = np.empty((self.batch_size, INPUT_SIZE), dtype=np.float32)
+        self._leaf_count = 0
+        self._leaf_scores = []
+        self._leaf_keys = []
+
+        root_children = []
+        root_ply = len(board.move_stack)
+        try:
+            for move in self._legal_moves(board):
                 board.push(move)
-                eval = self._minimax(board, current_depth - 1, True)
+                root_children.append((move, self._collect_leaves(board, depth - 1)))
+                board.pop()
+        except _SearchAborted:
+            while len(board.move_stack) > root_ply:
                 board.pop()
-                min_eval = min(min_eval, eval)
-            return min_eval
+            raise
+        self._flush_leaves()
+
+        best_move = None
+        best_score = -float('inf') if board.turn == chess.WHITE else float('inf')
+        for move, node in root_children:
+            score = self._backup(node)
+            if board.turn == chess.WHITE:
+                if score > best_score:
+                    best_score = score
+                    best_move = move
+            else:
+                if score < best_score:
+                    best_score = score
+                    best_move = move
+
+        self._leaf_buffer = None
+        self._leaf_scores = []
+        self._leaf_keys = []
+        return best_move, best_score
+
+    def _collect_leaves(self, board, current_depth):
+        """
+        Buduje drzewo do zadanej głębokości. Liść to indeks (int) w tablicy ocen sieci
+        albo gotowa ocena (float) dla pozycji końcowej; węzeł wewnętrzny to krotka
+        (maximizing_player, dzieci). Ustawiony stop_event przerywa budowę drzewa (_SearchAborted).
+        """
+        if self._stop_event is not None and self._stop_event.is_set():
+            raise _SearchAborted()
+        self.nodes_searched += 1
+        if current_depth == 0 or board.is_game_over():
+            terminal = self._terminal_score(board)
+            if terminal is not None:
+                return float(terminal)
+            if self.eval_cache is not None:
+                key = position_key(board)
+                cached = self.eval_cache.get(key)
+                if cached is not None:
+                    self.eval_cache_hits += 1
+                    return float(cached)
+
+            if self._leaf_count == self.batch_size:
+                self._flush_leaves()
+            self._board_to_input_representation(board, self._leaf_buffer[self._leaf_count])
+            if self.eval_cache is not None:
+                self._leaf_keys.append(key)
+            self._leaf_count += 1
+            return len(self._leaf_scores) + self._leaf_count - 1
+
+        children = []
+        for move in self._legal_moves(board):
+            board.push(move)
+            children.append(self._collect_leaves(board, current_depth - 1))
+            board.pop()
+        return board.turn == chess.WHITE, children
+
+    def _flush_leaves(self):
+        """Ocenia zebrane liście jednym przebiegiem sieci."""
+        if self._leaf_count == 0:
+            return
+        scores = self._evaluate_batch(self._leaf_buffer[:self._leaf_count])
+        self._leaf_scores.extend(scores)
+        if self.eval_cache is not None:
+            for key, score in zip(self._leaf_keys, scores):
+                self.eval_cache.put(key, score)
+            self._leaf_keys.clear()
+        self._leaf_count = 0
+
+    def _backup(self, node):
+        if isinstance(node, float):
+            return node
+        if isinstance(node, int):
+            return self._leaf_scores[node]
+
+        maximizing_player, children = node
+        if maximizing_player:
+            return max(self._backup(child) for child in children)
+        return min(self._backup(child) for child in children)
+
+    def new_game(self):
+        """Czyści stan przeszukiwania zależny od partii (tablica transpozycji)."""
+        if self.transposition_table:
+            self.transposition_table.clear()
+        if self._parallel:
+            self._parallel.new_game()
 
     def _get_random_move(self, board):
         legal_moves = list(board.legal_moves)
@@ -136,43 +766,136 @@ class ChessAIPlayer:
         return None
 
     def quit_engine(self):
+        """
+        Zwalnia zasoby silnika i zwraca statystyki cache ocen (EvaluationCache.stats()) albo None.
+        Nic o cache nie wypisujemy - serwer zamyka setki sesji; kto chce, pokazuje statystyki sam.
+        """
         print("TensorFlow AI: Zwalnianie zasobów (jeśli to konieczne).")
+        cache_stats = None
+        if self.eval_cache is not None:
+            cache_stats = self.eval_cache.stats()
+            if self.eval_cache_path:
+                self.eval_cache.save(self.eval_cache_path)
+        if self._parallel:
+            self._parallel.close()
+            self._parallel = None
+        if self._book is not None:
+            self._book.close()
+            self._book = None
+        return cache_stats
+
+
+class PositionSnapshot:
+    """
+    Stan jednej pozycji policzony raz (jedno generowanie legalnych ruchów): flagi szach/mat/pat,
+    koniec gry i wynik, indeks pole startowe -> pola docelowe i mapa figur.
+    `token` pozwala wykryć zmianę planszy z pominięciem metod ChessGameLogic.
+    """
+
+    def __init__(self, board):
+        self.token = _snapshot_token(board)
+        self.turn = board.turn
+        self.legal_moves = list(board.legal_moves)
+        self.legal_move_set = set(self.legal_moves)
+        self.is_check = board.is_check()
+        self.is_checkmate = self.is_check and not self.legal_moves
+        self.is_stalemate = not self.is_check and not self.legal_moves
+        # Te same warunki co board.is_game_over() (bez remisów na żądanie), ale bez ponownego generowania ruchów
+        self.is_game_over = (not self.legal_moves or board.is_insufficient_material()
+                             or board.is_seventyfive_moves() or board.is_fivefold_repetition())
+        if self.is_checkmate:
+            self.result = '0-1' if board.turn == chess.WHITE else '1-0'
+        else:
+            self.result = '1/2-1/2' if self.is_game_over else '*'
+        self.destinations = {}
+        for move in self.legal_moves:
+            self.destinations.setdefault(move.from_square, []).append(chess.square_name(move.to_square))
+        self.piece_map = board.piece_map()
+        self._board_state = None
+
+    @property
+    def board_state(self):
+        """{nazwa pola: symbol figury albo None} dla wszystkich 64 pól (budowane przy pierwszym użyciu)."""
+        if self._board_state is None:
+            self._board_state = {chess.square_name(square): (piece.symbol() if piece else None)
+                                 for square, piece in ((square, self.piece_map.get(square)) for square in chess.SQUARES)}
+        return self._board_state
+
+
+def _snapshot_token(board):
+    return position_key(board), len(board.move_stack)
 
 
-# ... (reszta kodu ChessGameLogic bez zmian) ...
 class ChessGameLogic:
     def __init__(self):
         self.board = chess.Board()
+        self._snapshot = None  # PositionSnapshot bieżącej pozycji, liczony przy pierwszym zapytaniu
         self.players = {
             chess.WHITE: 'HUMAN',
             chess.BLACK: 'HUMAN'
         }
         self.ai_engine = None
         self.ai_depth = 2
+        self.ai_batch_size = DEFAULT_BATCH_SIZE
+        self.ai_search_algorithm = 'alphabeta'
+        self.ai_tt_size_mb = DEFAULT_TT_SIZE_MB
+        self.ai_time_limit = None  # Sekundy na ruch (None = tylko limit głębokości)
+        self.ai_node_limit = None
+        self.ai_inference_backend = DEFAULT_BACKEND
+        self.ai_search_workers = 1  # Procesy przeszukiwania równoległego (1 = sekwencyjnie)
+        self.ai_eval_cache_size = DEFAULT_EVAL_CACHE_SIZE
+        self.ai_eval_cache_path = None  # Plik .npz z ocenami, żeby nowy proces startował z ciepłym cache
+        self.ai_book_path = None  # Książka otwarć Polyglot (np. zbudowana przez chess_book_builder.py)
+        self.ai_book_max_ply = DEFAULT_BOOK_MAX_PLY
+        self.ai_evaluator = None  # Wstrzyknięty evaluator (np. wspólna kolejka inferencji serwera)
+        self.ai_model_path = MODEL_PATH  # .h5 albo model int8 .tflite (chess_model_trainer --export-int8)
 
     def set_player_type(self, color, player_type):
         if player_type not in ['HUMAN', 'AI_RANDOM', 'AI_TF']:
             raise ValueError("Typ gracza musi być 'HUMAN', 'AI_RANDOM' lub 'AI_TF'")
         self.players[color] = player_type
 
-    def initialize_ai(self, ai_type, skill_level=None):
+    def initialize_ai(self, ai_type, skill_level=None, time_limit=None, node_limit=None):
         if self.ai_engine:
             self.ai_engine.quit_engine()
             self.ai_engine = None
 
         if ai_type == 'AI_TF':
             # Teraz ChessAIPlayer będzie próbował załadować wytrenowany model
-            self.ai_engine = ChessAIPlayer(use_tensorflow=True)
-            self.ai_depth = skill_level if skill_level is not None else 2
+            self.ai_engine = ChessAIPlayer(use_tensorflow=True, batch_size=self.ai_batch_size,
+                                           search_algorithm=self.ai_search_algorithm,
+                                           tt_size_mb=self.ai_tt_size_mb, model_path=self.ai_model_path,
+                                           inference_backend=self.ai_inference_backend,
+                                           workers=self.ai_search_workers,
+                                           eval_cache_size=self.ai_eval_cache_size,
+                                           eval_cache_path=self.ai_eval_cache_path,
+                                           book_path=self.ai_book_path, book_max_ply=self.ai_book_max_ply,
+                                           evaluator=self.ai_evaluator)
+            if skill_level is not None:
+                self.ai_depth = skill_level
+            elif (time_limit or node_limit) and self.ai_search_algorithm != 'minimax':
+                self.ai_depth = None  # Pogłębianie aż do limitu czasu / węzłów
+            else:
+                self.ai_depth = 2
+            self.ai_time_limit = time_limit
+            self.ai_node_limit = node_limit
         elif ai_type == 'AI_RANDOM':
             self.ai_engine = ChessAIPlayer(use_tensorflow=False)
             self.ai_depth = 1
         # Jeśli ai_type to None, ai_engine pozostaje None, co oznacza brak AI.
 
-    def get_ai_move(self):
-        current_player_type = self.players[self.board.turn]
-        if self.ai_engine and (current_player_type == 'AI_TF' or current_player_type == 'AI_RANDOM'):
-            return self.ai_engine.get_best_move(self.board, depth=self.ai_depth)
+    def get_ai_move(self, board=None, stop_event=None, engine=None):
+        """
+        Ruch AI dla bieżącej pozycji. Wątek roboczy GUI podaje kopię szachownicy (`board`),
+        żeby przeszukiwanie nie dotykało planszy, którą w tym czasie rysuje interfejs,
+        i silnik (`engine`) pobrany przy starcie wątku - initialize_ai może go w tym czasie podmienić.
+        """
+        board = board if board is not None else self.board
+        engine = engine if engine is not None else self.ai_engine
+        current_player_type = self.players[board.turn]
+        if engine and (current_player_type == 'AI_TF' or current_player_type == 'AI_RANDOM'):
+            return engine.get_best_move(board, depth=self.ai_depth, time_limit=self.ai_time_limit,
+                                        node_limit=self.ai_node_limit, stop_event=stop_event)
         return None
 
     def get_current_player_type(self):
@@ -184,66 +907,85 @@ class ChessGameLogic:
     def get_turn_color(self):
         return 'white' if self.board.turn == chess.WHITE else 'black'
 
+    def snapshot(self):
+        """
+        PositionSnapshot bieżącej pozycji. Liczony raz na półruch - zapytania o status, ruchy
+        i figury (GUI pyta o nie kilka razy na każde kliknięcie i odświeżenie) nie generują
+        ruchów od nowa. Metody zmieniające planszę unieważniają go; zmianę planszy z zewnątrz
+        (np. board.push w innym kodzie) wykrywa porównanie tokenu.
+        """
+        snapshot = self._snapshot
+        if snapshot is None or snapshot.token != _snapshot_token(self.board):
+            snapshot = self._snapshot = PositionSnapshot(self.board)
+        return snapshot
+
+    def _invalidate_snapshot(self):
+        self._snapshot = None
+
     def make_move(self, start_square_name, end_square_name):
         try:
             start_square = chess.parse_square(start_square_name)
             end_square = chess.parse_square(end_square_name)
             move = chess.Move(start_square, end_square)
-            if move in self.board.legal_moves:
+            if move in self.snapshot().legal_move_set:
                 self.board.push(move)
+                self._invalidate_snapshot()
                 return True
             return False
         except ValueError:
             return False
 
     def make_move_object(self, move_obj):
-        if move_obj and move_obj in self.board.legal_moves:
+        if move_obj and move_obj in self.snapshot().legal_move_set:
             self.board.push(move_obj)
+            self._invalidate_snapshot()
             return True
         return False
 
+    def undo_move(self):
+        """Cofa ostatni półruch; zwraca cofnięty ruch albo None na początku partii."""
+        if not self.board.move_stack:
+            return None
+        move = self.board.pop()
+        self._invalidate_snapshot()
+        return move
+
     def is_game_over(self):
-        return self.board.is_game_over()
+        return self.snapshot().is_game_over
 
     def get_game_result(self):
-        return self.board.result()
+        return self.snapshot().result
 
     def is_check(self):
-        return self.board.is_check()
+        return self.snapshot().is_check
 
     def is_checkmate(self):
-        return self.board.is_checkmate()
+        return self.snapshot().is_checkmate
 
     def is_stalemate(self):
-        return self.board.is_stalemate()
+        return self.snapshot().is_stalemate
 
     def get_piece_at(self, square_name):
         square = chess.parse_square(square_name)
-        return self.board.piece_at(square)
+        return self.snapshot().piece_map.get(square)
 
     def reset_game(self):
         self.board.reset()
+        self._invalidate_snapshot()
 
     def get_board_state(self):
-        state = {}
-        for square in chess.SQUARES:
-            piece = self.board.piece_at(square)
-            if piece:
-                state[chess.square_name(square)] = piece.symbol()
-            else:
-                state[chess.square_name(square)] = None
-        return state
+        return dict(self.snapshot().board_state)
+
+    def get_piece_map(self):
+        """Figury na planszy jako {numer pola: chess.Piece} (tylko zajęte pola)."""
+        return dict(self.snapshot().piece_map)
 
     def get_legal_moves(self, square_name):
-        legal_destinations = []
         try:
             source_square = chess.parse_square(square_name)
-            for move in self.board.legal_moves:
-                if move.from_square == source_square:
-                    legal_destinations.append(chess.square_name(move.to_square))
         except ValueError:
-            pass
-        return legal_destinations
+            return []
+        return list(self.snapshot().destinations.get(source_square, []))
 
     def __del__(self):
         if self.ai_engine:
@@ -0,0 +1,244 @@
+"""
+Bezgłowy (bez GUI) turniej silników: N partii między dwoma konfiguracjami AI rozgrywanych
+równolegle w puli procesów. Wyniki trafiają do pliku PGN, a na koniec wypisujemy
+przepustowość (partie/s, ruchy/s), średni czas myślenia na ruch i bilans W/D/L.
+
+Specyfikacja silnika:
+    random          - losowe ruchy (AI_RANDOM)
+    tf              - sieć TensorFlow, głębokość 2
+    tf:3            - sieć TensorFlow, głębokość 3
+    tf:4:1.5        - sieć TensorFlow, maks. głębokość 4 i 1.5 s na ruch
+    tf:2@PLIK       - jak wyżej, ale z modelem z PLIK zamiast domyślnego (porównywanie wersji modelu)
+
+Przykład:
+    python chess_match_runner.py tf:2 random --games 20 --workers 4 --pgn mecz.pgn
+    python chess_match_runner.py tf:2@models/v2.h5 tf:2@models/v1.h5 --games 100
+"""
+
+import argparse
+import json
+import os
+import random
+import time
+from multiprocessing import Pool
+
+import chess
+import chess.pgn
+
+from chess_logic import MODEL_PATH, ChessGameLogic, ChessAIPlayer
+from chess_search_stats import sum_stats
+
+DEFAULT_MAX_PLIES = 200
+
+# Silniki w procesie roboczym - model ładujemy raz na proces, a nie raz na partię
+_worker_players = {}
+
+
+def parse_engine_spec(spec):
+    """Zamienia tekst specyfikacji (np. 'tf:3:1.5@models/v2.h5') na słownik konfiguracji silnika."""
+    settings, _, model_path = spec.partition('@')
+    parts = settings.split(':')
+    if parts[0] == 'random' and len(parts) == 1 and not model_path:
+        return {'name': spec, 'player_type': 'AI_RANDOM', 'depth': 1, 'time_limit': None, 'model_path': None}
+    if parts[0] == 'tf' and len(parts) <= 3:
+        depth = int(parts[1]) if len(parts) > 1 and parts[1] else 2
+        time_limit = float(parts[2]) if len(parts) > 2 else None
+        if model_path and not os.path.exists(model_path):
+            raise ValueError(f"Brak pliku modelu '{model_path}' w specyfikacji silnika '{spec}'")
+        return {'name': spec, 'player_type': 'AI_TF', 'depth': depth, 'time_limit': time_limit,
+                'model_path': model_path or MODEL_PATH}
+    raise ValueError(f"Nieznana specyfikacja silnika: '{spec}' "
+                     "(użyj 'random', 'tf', 'tf:GŁĘBOKOŚĆ[:SEKUNDY]', opcjonalnie z '@MODEL')")
+
+
+def _profile_path(profile_dir, engine):
+    """Plik .prof dla silnika w bieżącym procesie (każdy proces roboczy profiluje osobno)."""
+    safe_name = ''.join(c if c.isalnum() else '_' for c in engine['name'])
+    return os.path.join(profile_dir, f"{safe_name}_{os.getpid()}.prof")
+
+
+def _get_player(engine, profile_dir=None):
+    player = _worker_players.get(engine['name'])
+    if player is None:
+        profile = _profile_path(profile_dir, engine) if profile_dir else False
+        player = ChessAIPlayer(use_tensorflow=engine['player_type'] == 'AI_TF', profile=profile,
+                               model_path=engine.get('model_path') or MODEL_PATH, book_path=engine.get('book'))
+        _worker_players[engine['name']] = player
+    return player
+
+
+def play_game(task):
+    """Rozgrywa jedną partię (w procesie roboczym) i zwraca jej wynik, statystyki i PGN."""
+    game_index, white, black, max_plies, seed, profile_dir = task
+    random.seed(seed)
+    game_logic = ChessGameLogic()
+    game_logic.set_player_type(chess.WHITE, white['player_type'])
+    game_logic.set_player_type(chess.BLACK, black['player_type'])
+    engines = {chess.WHITE: white, chess.BLACK: black}
+    players = {color: _get_player(engine, profile_dir) for color, engine in engines.items()}
+    for player in players.values():
+        player.new_game()
+
+    think_time = {chess.WHITE: 0.0, chess.BLACK: 0.0}
+    moves = {chess.WHITE: 0, chess.BLACK: 0}
+    search_stats = {chess.WHITE: [], chess.BLACK: []}
+    start_time = time.perf_counter()
+    while not game_logic.is_game_over() and len(game_logic.board.move_stack) < max_plies:
+        turn = game_logic.board.turn
+        engine = engines[turn]
+        move_start = time.perf_counter()
+        move = players[turn].get_best_move(game_logic.board, depth=engine['depth'], time_limit=engine['time_limit'])
+        think_time[turn] += time.perf_counter() - move_start
+        moves[turn] += 1
+        if players[turn].last_search_stats is not None:
+            search_stats[turn].append(players[turn].last_search_stats)
+            players[turn].last_search_stats = None
+        if not game_logic.make_move_object(move):
+            break
+
+    game = chess.pgn.Game.from_board(game_logic.board)
+    game.headers['Event'] = 'chess-tf match'
+    game.headers['Round'] = str(game_index + 1)
+    game.headers['White'] = white['name']
+    game.headers['Black'] = black['name']
+    if game_logic.is_game_over():
+        result = game_logic.get_game_result()
+    else:
+        result = '1/2-1/2'  # Adjudykacja remisu po przekroczeniu limitu półruchów
+        game.headers['Termination'] = 'adjudication'
+    game.headers['Result'] = result
+
+    return {
+        'index': game_index,
+        'white': white['name'],
+        'black': black['name'],
+        'result': result,
+        'plies': len(game_logic.board.move_stack),
+        'time': time.perf_counter() - start_time,
+        'think_time': (think_time[chess.WHITE], think_time[chess.BLACK]),
+        'moves': (moves[chess.WHITE], moves[chess.BLACK]),
+        'search': (sum_stats(search_stats[chess.WHITE]), sum_stats(search_stats[chess.BLACK])),
+        'pgn': str(game),
+    }
+
+
+def run_match(engine_a, engine_b, games, workers=None, pgn_path=None, max_plies=DEFAULT_MAX_PLIES, seed=0,
+              profile_dir=None, book_path=None):
+    """
+    Rozgrywa `games` partii między silnikami A i B (kolory na zmianę) i zwraca statystyki.
+    Bilans W/D/L liczony jest z perspektywy silnika A.
+    Z `profile_dir` każdy proces roboczy zapisuje tam profil cProfile swoich silników (<silnik>_<pid>.prof).
+    `book_path` to książka otwarć Polyglot dla silników TensorFlow.
+    """
+    engine_a = parse_engine_spec(engine_a) if isinstance(engine_a, str) else engine_a
+    engine_b = parse_engine_spec(engine_b) if isinstance(engine_b, str) else engine_b
+    if book_path:
+        engine_a, engine_b = (dict(engine, book=book_path) if engine['player_type'] == 'AI_TF' else engine
+                              for engine in (engine_a, engine_b))
+    if engine_a['name'] == engine_b['name']:
+        engine_b = dict(engine_b, name=engine_b['name'] + '#2')
+
+    tasks = []
+    for game_index in range(games):
+        white, black = (engine_a, engine_b) if game_index % 2 == 0 else (engine_b, engine_a)
+        tasks.append((game_index, white, black, max_plies, seed + game_index, profile_dir))
+    if profile_dir:
+        os.makedirs(profile_dir, exist_ok=True)
+
+    wins = draws = losses = 0
+    total_plies = 0
+    think_time = {engine_a['name']: 0.0, engine_b['name']: 0.0}
+    think_moves = {engine_a['name']: 0, engine_b['name']: 0}
+    search_totals = {name: sum_stats([]) for name in think_time}
+    start_time = time.perf_counter()
+    pgn_file = open(pgn_path, 'w') if pgn_path else None
+    try:
+        with Pool(processes=workers) as pool:
+            for game in pool.imap_unordered(play_game, tasks):
+                total_plies += game['plies']
+                for name, seconds, count, totals in zip((game['white'], game['black']), game['think_time'],
+                                                        game['moves'], game['search']):
+                    think_time[name] += seconds
+                    think_moves[name] += count
+                    for field, value in totals.items():
+                        search_totals[name][field] += value
+
+                a_is_white = game['white'] == engine_a['name']
+                if game['result'] == '1/2-1/2':
+                    draws += 1
+                elif (game['result'] == '1-0') == a_is_white:
+                    wins += 1
+                else:
+                    losses += 1
+
+                if pgn_file:
+                    pgn_file.write(game['pgn'] + '\n\n')
+                    pgn_file.flush()
+                print(f"Partia {game['index'] + 1}/{games}: {game['white']} - {game['black']} {game['result']} "
+                      f"({game['plies']} półruchów, {game['time']:.1f} s)")
+    finally:
+        if pgn_file:
+            pgn_file.close()
+
+    elapsed = time.perf_counter() - start_time
+    return {
+        'engine_a': engine_a['name'],
+        'engine_b': engine_b['name'],
+        'games': games,
+        'wins': wins,
+        'draws': draws,
+        'losses': losses,
+        'elapsed': elapsed,
+        'games_per_sec': games / elapsed if elapsed else 0.0,
+        'moves_per_sec': total_plies / elapsed if elapsed else 0.0,
+        'avg_think_time': {name: think_time[name] / think_moves[name] if think_moves[name] else 0.0
+                           for name in think_time},
+        'search': search_totals,
+    }
+
+
+def print_stats(stats):
+    print(f"\n{stats['engine_a']} vs {stats['engine_b']}: "
+          f"+{stats['wins']} ={stats['draws']} -{stats['losses']} ({stats['games']} partii)")
+    print(f"Czas: {stats['elapsed']:.1f} s, {stats['games_per_sec']:.3f} partii/s, "
+          f"{stats['moves_per_sec']:.1f} ruchów/s")
+    for name, seconds in stats['avg_think_time'].items():
+        print(f"Średni czas myślenia {name}: {seconds * 1000:.1f} ms/ruch")
+    for name, totals in stats.get('search', {}).items():
+        if not totals['moves']:
+            continue  # Silnik losowy nie przeszukuje
+        moves = totals['moves']
+        search_time = totals['time'] or 1e-9
+        print(f"Przeszukiwanie {name}: {totals['nodes'] / moves:.0f} węzłów/ruch, "
+              f"{totals['nodes'] / search_time:.0f} węzłów/s, {totals['leaf_evals'] / moves:.0f} ocen sieci/ruch "
+              f"w {totals['nn_batches'] / moves:.1f} batchach, TT {totals['tt_hits'] / moves:.0f} trafień/ruch")
+        print(f"  czas: ruchy {totals['movegen_time'] / search_time:.0%}, "
+              f"kodowanie {totals['encode_time'] / search_time:.0%}, "
+              f"sieć {totals['inference_time'] / search_time:.0%}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Bezgłowe partie AI vs AI ze statystykami przepustowości.")
+    parser.add_argument('engine_a', help="Silnik A, np. 'tf:2' albo 'tf:2@models/v2.h5'")
+    parser.add_argument('engine_b', help="Silnik B, np. 'random'")
+    parser.add_argument('--games', type=int, default=10, help="Liczba partii (kolory na zmianę)")
+    parser.add_argument('--workers', type=int, default=None, help="Liczba procesów (domyślnie liczba rdzeni)")
+    parser.add_argument('--pgn', default=None, help="Plik wyjściowy PGN")
+    parser.add_argument('--max-plies', type=int, default=DEFAULT_MAX_PLIES, help="Limit półruchów (potem remis)")
+    parser.add_argument('--seed', type=int, default=0, help="Ziarno losowości (partia i używa ziarna + i)")
+    parser.add_argument('--json', default=None, help="Zapisz statystyki do pliku JSON")
+    parser.add_argument('--profile', metavar='KATALOG', default=None,
+                        help="Zapisz profile cProfile silników (jeden plik .prof na silnik i proces)")
+    parser.add_argument('--book', default=None, help="Książka otwarć Polyglot (.bin) dla silników tf")
+    args = parser.parse_args()
+
+    try:
+        engine_a, engine_b = parse_engine_spec(args.engine_a), parse_engine_spec(args.engine_b)
+    except ValueError as e:
+        parser.error(str(e))
+    match_stats = run_match(engine_a, engine_b, args.games, args.workers, args.pgn, args.max_plies,
+                            args.seed, args.profile, args.book)
+    print_stats(match_stats)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(match_stats, f, indent=2)
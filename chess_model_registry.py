@@ -0,0 +1,66 @@
+"""
+Leniwy import TensorFlow i wspólny (na proces) rejestr modeli.
+
+TensorFlow importujemy dopiero wtedy, gdy ktoś faktycznie potrzebuje modelu (gracz AI_TF),
+więc gra człowiek-człowiek i losowe AI nie płacą kilkusekundowego startu TF.
+Każdy plik modelu jest ładowany raz - kluczem jest (ścieżka bezwzględna, czas modyfikacji),
+więc nowa gra dostaje ten sam, już skompilowany model, a podmiana pliku wymusza ponowne wczytanie.
+"""
+
+import os
+import threading
+
+_tensorflow = None
+_tensorflow_checked = False
+_models = {}
+_lock = threading.Lock()
+
+
+def get_tensorflow():
+    """Zwraca moduł tensorflow (importowany przy pierwszym wywołaniu) albo None, jeśli jest niedostępny."""
+    global _tensorflow, _tensorflow_checked
+    with _lock:
+        if not _tensorflow_checked:
+            _tensorflow_checked = True
+            try:
+                import tensorflow as tf
+                print("TensorFlow załadowany.")
+                _tensorflow = tf
+            except ImportError:
+                print("TensorFlow nie jest zainstalowany.")
+            except Exception as e:
+                print(f"Błąd podczas ładowania TensorFlow: {e}")
+    return _tensorflow
+
+
+def model_key(path):
+    """Klucz rejestru: (ścieżka bezwzględna, mtime) - zmienia się, gdy plik modelu zostanie nadpisany."""
+    path = os.path.abspath(path)
+    return path, os.path.getmtime(path)
+
+
+def load_model(path):
+    """Zwraca model Keras dla pliku `path`, ładując go z dysku tylko przy pierwszym użyciu."""
+    key = model_key(path)
+    model = _models.get(key)
+    if model is not None:
+        return model
+
+    tf = get_tensorflow()
+    if tf is None:
+        raise RuntimeError("TensorFlow nie jest dostępny")
+    with _lock:
+        model = _models.get(key)
+        if model is None:
+            # Starsze wersje tego samego pliku nie będą już potrzebne
+            for stale_key in [k for k in _models if k[0] == key[0]]:
+                del _models[stale_key]
+            model = tf.keras.models.load_model(key[0])
+            _models[key] = model
+    return model
+
+
+def clear():
+    """Usuwa wszystkie modele z rejestru (np. w testach wydajności zimnego startu)."""
+    with _lock:
+        _models.clear()
@@ -1,12 +1,28 @@
+import argparse
 import tensorflow as tf
 from tensorflow import keras
 from tensorflow.keras import layers
 import numpy as np
 import pickle
 import os
+import time
+
+from chess_board_encoder import INPUT_SIZE, PACKED_SIZE, PIECE_PLANES, expand_packed
+from chess_dataset_format import DATASET_EXTENSION, DatasetReader
+from chess_dataset_generator import DATA_PATH, SHARD_DIR, list_shards
+from chess_inference import TFLiteEvaluator, measure_latency
 
 MODEL_PATH = 'trained_chess_model.h5'
-DATA_PATH = 'chess_data.pkl'
+EPOCHS = 50
+BATCH_SIZE = 32
+SHUFFLE_BUFFER = 50000  # Ile próbek mieszamy naraz (rozmiar bufora w pamięci)
+READ_CHUNK = 4096  # Ile rekordów czytamy z mmap jednym kawałkiem
+VALIDATION_FRACTION = 0.2
+INT8_MODEL_PATH = 'trained_chess_model_int8.tflite'
+CALIBRATION_SAMPLES = 1000  # Ile pozycji ze zbioru treningowego kalibruje zakresy aktywacji int8
+THROUGHPUT_BATCH_SIZES = (32, 1024)  # Typowy batch dzieci węzła alpha-beta i duży batch liści
+
+_BIT_SHIFTS = tf.constant(list(range(8)), dtype=tf.uint8)
 
 
 def build_model(input_shape):
@@ -33,33 +49,95 @@ def build_model(input_shape):
     return model
 
 
-def train_model():
+def _shard_chunks(path, chunk_size, shuffle):
+    """
+    Czyta shard przez mmap kawałkami po `chunk_size` rekordów (w losowej kolejności kawałków).
+    Do pamięci trafia tylko bieżący kawałek, a nie cały plik.
+    """
+    records = np.load(path.decode() if isinstance(path, bytes) else path, mmap_mode='r')
+    starts = np.arange(0, len(records), chunk_size)
+    if shuffle:
+        np.random.default_rng().shuffle(starts)
+    for start in starts:
+        chunk = records[start:start + chunk_size]
+        yield (np.ascontiguousarray(chunk['planes']), np.ascontiguousarray(chunk['turn']),
+               np.ascontiguousarray(chunk['y']))
+
+
+def _expand_batch(planes, turn, y):
+    """Rozwija spakowane bitboardy batcha do wejścia float32 (N, 832) - dopiero tutaj, per batch."""
+    bits = tf.bitwise.bitwise_and(tf.bitwise.right_shift(tf.expand_dims(planes, -1), _BIT_SHIFTS), 1)
+    pieces = tf.reshape(tf.cast(bits, tf.float32), (-1, PIECE_PLANES * 64))
+    turn_plane = tf.tile(tf.expand_dims(tf.cast(turn, tf.float32), -1), (1, 64))
+    return tf.concat([pieces, turn_plane], axis=1), y
+
+
+def make_dataset(shard_paths, batch_size=BATCH_SIZE, shuffle=True, shuffle_buffer=SHUFFLE_BUFFER, cycle_length=4):
+    """
+    Strumieniowy potok tf.data nad shardami z chess_dataset_generator:
+    przeplatanie shardów (interleave) -> bufor mieszania -> batch -> rozwinięcie bitów -> prefetch.
+    Zbiór może być większy niż pamięć RAM.
+    """
+    output_signature = (
+        tf.TensorSpec(shape=(None, PACKED_SIZE), dtype=tf.uint8),
+        tf.TensorSpec(shape=(None,), dtype=tf.uint8),
+        tf.TensorSpec(shape=(None,), dtype=tf.float32),
+    )
+
+    def read_shard(path):
+        return tf.data.Dataset.from_generator(_shard_chunks, args=(path, READ_CHUNK, shuffle),
+                                              output_signature=output_signature)
+
+    paths = tf.data.Dataset.from_tensor_slices(shard_paths)
+    if shuffle:
+        paths = paths.shuffle(len(shard_paths), reshuffle_each_iteration=True)
+    dataset = paths.interleave(read_shard, cycle_length=max(1, min(cycle_length, len(shard_paths))),
+                               num_parallel_calls=tf.data.AUTOTUNE, deterministic=not shuffle)
+    dataset = dataset.unbatch()
+    if shuffle:
+        dataset = dataset.shuffle(shuffle_buffer, reshuffle_each_iteration=True)
+    dataset = dataset.batch(batch_size)
+    dataset = dataset.map(_expand_batch, num_parallel_calls=tf.data.AUTOTUNE)
+    return dataset.prefetch(tf.data.AUTOTUNE)
+
+
+def train_model(data_path=DATA_PATH, epochs=EPOCHS, batch_size=BATCH_SIZE):
     """
     Trenuje model TensorFlow na wygenerowanych danych.
+    `data_path` to plik pickle, plik .chessds albo katalog z shardami (wtedy dane są czytane strumieniowo).
     """
-    if not os.path.exists(DATA_PATH):
-        print(f"Błąd: Plik danych '{DATA_PATH}' nie znaleziony.")
+    if not os.path.exists(data_path):
+        print(f"Błąd: Plik danych '{data_path}' nie znaleziony.")
         print("Uruchom najpierw 'chess_dataset_generator.py' aby wygenerować dane.")
         return
 
-    # Wczytaj dane
-    with open(DATA_PATH, 'rb') as f:
-        data = pickle.load(f)
+    if os.path.isdir(data_path) or data_path.endswith(DATASET_EXTENSION):
+        if os.path.isdir(data_path):
+            model = train_model_streaming(data_path, epochs, batch_size)
+        else:
+            model = train_model_chessds(data_path, epochs, batch_size)
+        if model is None:
+            return
+    else:
+        # Wczytaj dane
+        with open(data_path, 'rb') as f:
+            data = pickle.load(f)
 
-    X = data['X']
-    y = data['y']
+        X = data['X']
+        y = data['y']
 
-    print(f"Wczytano dane. Kształt X: {X.shape}, Kształt y: {y.shape}")
+        print(f"Wczytano dane. Kształt X: {X.shape}, Kształt y: {y.shape}")
 
-    # Zbuduj model
-    model = build_model(X.shape[1])
-    model.summary()
+        # Zbuduj model
+        model = build_model(X.shape[1])
+        model.summary()
 
-    # Trenuj model
-    # epochs: Liczba przejść przez cały zbiór danych.
-    # batch_size: Ile próbek jednocześnie podawać modelowi.
-    # validation_split: Procent danych używanych do walidacji (monitorowania, czy model nie przetrenowuje się).
-    history = model.fit(X, y, epochs=50, batch_size=32, validation_split=0.2, verbose=1)
+        # Trenuj model
+        # epochs: Liczba przejść przez cały zbiór danych.
+        # batch_size: Ile próbek jednocześnie podawać modelowi.
+        # validation_split: Procent danych używanych do walidacji (monitorowania, czy model nie przetrenowuje się).
+        history = model.fit(X, y, epochs=epochs, batch_size=batch_size, validation_split=VALIDATION_FRACTION,
+                            verbose=1)
 
     # Zapisz wytrenowany model
     model.save(MODEL_PATH)
@@ -75,5 +153,168 @@ def train_model():
     # plt.show()
 
 
+def train_model_streaming(data_dir, epochs=EPOCHS, batch_size=BATCH_SIZE):
+    """Trening na shardach czytanych przez mmap; ostatnie shardy (VALIDATION_FRACTION) służą do walidacji."""
+    shard_paths = list_shards(data_dir)
+    if not shard_paths:
+        print(f"Błąd: Brak shardów w katalogu '{data_dir}'.")
+        return None
+
+    num_validation = max(1, int(len(shard_paths) * VALIDATION_FRACTION)) if len(shard_paths) > 1 else 0
+    train_paths = shard_paths[:len(shard_paths) - num_validation]
+    validation_paths = shard_paths[len(shard_paths) - num_validation:]
+    num_samples = sum(len(np.load(path, mmap_mode='r')) for path in shard_paths)
+    print(f"Dane strumieniowe: {num_samples} próbek w {len(shard_paths)} shardach "
+          f"({len(validation_paths)} do walidacji).")
+
+    train_dataset = make_dataset(train_paths, batch_size=batch_size, shuffle=True)
+    validation_dataset = make_dataset(validation_paths, batch_size=batch_size,
+                                      shuffle=False) if validation_paths else None
+
+    model = build_model(INPUT_SIZE)
+    model.summary()
+    model.fit(train_dataset, epochs=epochs, validation_data=validation_dataset, verbose=1)
+    return model
+
+
+def make_chessds_dataset(reader, chunk_ids, batch_size=BATCH_SIZE, shuffle=True):
+    """Potok tf.data nad plikiem .chessds: batche rozwijane w locie przez DatasetReader.batches."""
+    output_signature = (
+        tf.TensorSpec(shape=(None, INPUT_SIZE), dtype=tf.float32),
+        tf.TensorSpec(shape=(None,), dtype=tf.float32),
+    )
+    dataset = tf.data.Dataset.from_generator(lambda: reader.batches(batch_size, shuffle=shuffle, chunk_ids=chunk_ids),
+                                             output_signature=output_signature)
+    return dataset.prefetch(tf.data.AUTOTUNE)
+
+
+def train_model_chessds(dataset_path, epochs=EPOCHS, batch_size=BATCH_SIZE):
+    """Trening na pliku .chessds; ostatnie kawałki (VALIDATION_FRACTION) służą do walidacji."""
+    reader = DatasetReader(dataset_path)
+    chunks = len(reader.index)
+    if not chunks:
+        print(f"Błąd: Zbiór '{dataset_path}' jest pusty.")
+        return None
+
+    num_validation = max(1, int(chunks * VALIDATION_FRACTION)) if chunks > 1 else 0
+    train_chunks = list(range(chunks - num_validation))
+    validation_chunks = list(range(chunks - num_validation, chunks))
+    print(f"Dane {DATASET_EXTENSION}: {len(reader)} próbek w {chunks} kawałkach "
+          f"({len(validation_chunks)} do walidacji).")
+
+    train_dataset = make_chessds_dataset(reader, train_chunks, batch_size, shuffle=True)
+    validation_dataset = make_chessds_dataset(reader, validation_chunks, batch_size,
+                                              shuffle=False) if validation_chunks else None
+
+    model = build_model(INPUT_SIZE)
+    model.summary()
+    model.fit(train_dataset, epochs=epochs, validation_data=validation_dataset, verbose=1)
+    return model
+
+
+def load_sample(data_path, count, seed=0):
+    """Losowa próbka (X (N, 832) float32, y) z pliku pickle, pliku .chessds albo katalogu shardów."""
+    rng = np.random.default_rng(seed)
+    if os.path.isdir(data_path):
+        shards = [np.load(path, mmap_mode='r') for path in list_shards(data_path)]
+        starts = np.cumsum([0] + [len(shard) for shard in shards])
+        indices = np.sort(rng.choice(starts[-1], min(count, starts[-1]), replace=False))
+        shard_ids = np.searchsorted(starts, indices, side='right') - 1
+        records = np.concatenate([shards[i][indices[shard_ids == i] - starts[i]] for i in np.unique(shard_ids)])
+    elif data_path.endswith(DATASET_EXTENSION):
+        with DatasetReader(data_path) as reader:
+            records = reader.take(np.sort(rng.choice(len(reader), min(count, len(reader)), replace=False)))
+    else:
+        with open(data_path, 'rb') as f:
+            data = pickle.load(f)
+        indices = np.sort(rng.choice(len(data['y']), min(count, len(data['y'])), replace=False))
+        return np.asarray(data['X'][indices], dtype=np.float32), np.asarray(data['y'][indices], dtype=np.float32)
+    return expand_packed(records['planes'], records['turn']), records['y'].astype(np.float32)
+
+
+def export_int8(model, calibration_X, output_path=INT8_MODEL_PATH):
+    """
+    Kwantyzacja po treningu do int8 (wagi i aktywacje) przez konwerter TFLite. Zakresy aktywacji
+    kalibrujemy na próbce prawdziwych pozycji; wejście i wyjście modelu zostają float32,
+    więc plik wczytuje zwykły TFLiteEvaluator (ChessAIPlayer(model_path='...tflite')).
+    """
+    def representative_dataset():
+        for row in calibration_X:
+            yield [row[None, :].astype(np.float32)]
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.representative_dataset = representative_dataset
+    converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    model_content = converter.convert()
+    with open(output_path, 'wb') as f:
+        f.write(model_content)
+    return model_content
+
+
+def compare_int8(model, int8_content, X, y):
+    """
+    Porównanie modelu int8 z modelem float: MSE między ich ocenami, MSE względem etykiet
+    i przepustowość oceny liści (pozycje/s) dla typowych rozmiarów batcha.
+    """
+    float_evaluator = TFLiteEvaluator.from_keras(model)
+    int8_evaluator = TFLiteEvaluator(int8_content)
+    float_scores = float_evaluator(X)
+    int8_scores = int8_evaluator(X)
+    report = {
+        'samples': len(X),
+        'mse_int8_vs_float': float(np.mean((int8_scores - float_scores) ** 2)),
+        'max_abs_diff': float(np.max(np.abs(int8_scores - float_scores))),
+        'mse_float_vs_labels': float(np.mean((float_scores - y) ** 2)),
+        'mse_int8_vs_labels': float(np.mean((int8_scores - y) ** 2)),
+        'throughput': {},
+    }
+    for batch_size in THROUGHPUT_BATCH_SIZES:
+        report['throughput'][batch_size] = {
+            name: batch_size / measure_latency(evaluator, batch_size)
+            for name, evaluator in (('float32', float_evaluator), ('int8', int8_evaluator))
+        }
+    return report
+
+
+def export_int8_model(model_path=MODEL_PATH, data_path=DATA_PATH, output_path=INT8_MODEL_PATH,
+                      samples=CALIBRATION_SAMPLES):
+    """Eksport modelu .h5 do int8 TFLite z kalibracją na danych treningowych i raportem dokładności."""
+    model = keras.models.load_model(model_path)
+    # Osobne próbki do kalibracji i do oceny, żeby raport nie mierzył dopasowania do kalibracji
+    calibration_X, _ = load_sample(data_path, samples, seed=0)
+    X, y = load_sample(data_path, samples, seed=1)
+    start_time = time.perf_counter()
+    int8_content = export_int8(model, calibration_X, output_path)
+    print(f"Model int8 zapisany jako '{output_path}' ({len(int8_content) / 1024:.0f} KB, "
+          f"{os.path.getsize(model_path) / 1024:.0f} KB w .h5), kwantyzacja {time.perf_counter() - start_time:.1f} s")
+
+    report = compare_int8(model, int8_content, X, y)
+    print(f"MSE int8 względem float: {report['mse_int8_vs_float']:.2e} "
+          f"(maks. różnica {report['max_abs_diff']:.4f}) na {report['samples']} pozycjach")
+    print(f"MSE względem etykiet: float {report['mse_float_vs_labels']:.4f}, int8 {report['mse_int8_vs_labels']:.4f}")
+    for batch_size, per_model in report['throughput'].items():
+        print(f"Batch {batch_size}: float32 {per_model['float32']:.0f} pozycji/s, int8 {per_model['int8']:.0f} "
+              f"pozycji/s ({per_model['int8'] / per_model['float32']:.2f}x)")
+    return report
+
+
 if __name__ == '__main__':
-    train_model()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Trening sieci oceniającej pozycje.")
+    parser.add_argument('--data', default=None,
+                        help=f"Plik pickle, plik {DATASET_EXTENSION} lub katalog shardów "
+                             f"(domyślnie '{SHARD_DIR}' jeśli istnieje, inaczej '{DATA_PATH}')")
+    parser.add_argument('--epochs', type=int, default=EPOCHS)
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--export-int8', metavar='PLIK', nargs='?', const=INT8_MODEL_PATH, default=None,
+                        help=f"Po treningu wyeksportuj model int8 TFLite (domyślnie '{INT8_MODEL_PATH}')")
+    parser.add_argument('--skip-training', action='store_true',
+                        help="Nie trenuj - tylko eksport int8 istniejącego modelu")
+    parser.add_argument('--calibration-samples', type=int, default=CALIBRATION_SAMPLES)
+    args = parser.parse_args()
+
+    data_path = args.data or (SHARD_DIR if os.path.isdir(SHARD_DIR) else DATA_PATH)
+    if not args.skip_training:
+        train_model(data_path, epochs=args.epochs, batch_size=args.batch_size)
+    if args.export_int8:
+        export_int8_model(MODEL_PATH, data_path, args.export_int8, args.calibration_samples)
\ No newline at end of file
@@ -0,0 +1,273 @@
+"""
+Inkrementalna (w stylu NNUE) ocena pierwszej warstwy sieci.
+
+Pierwsza warstwa to Dense(256) nad 832 rzadkimi wejściami 0/1 (chess_board_encoder). Jej wynik
+przed aktywacją to bias + suma wierszy macierzy wag dla zapalonych wejść, a ruch zmienia
+tylko 2-4 wejścia figur i warstwę tury. Trzymamy więc tę sumę jako akumulator:
+przy ruchu dodajemy/odejmujemy kilka wierszy wag zamiast kodować całą pozycję i mnożyć
+(N, 832) x (832, 256). Pozostałe, małe warstwy liczymy w NumPy jak w NumpyEvaluator.
+
+Warstwa tury (64 jedynki dla białych) wnosi stały wektor, więc nie trzymamy jej w akumulatorze,
+tylko dodajemy przy ocenie.
+
+Sprawdzenie zgodności z pełną siecią i pomiar czasu:
+    python chess_nnue.py --positions 2000
+"""
+
+import argparse
+import os
+import random
+import time
+
+import chess
+import numpy as np
+
+from chess_board_encoder import PIECE_PLANES, encode_boards
+from chess_inference import NumpyEvaluator
+
+PIECE_FEATURES = PIECE_PLANES * 64  # 768 wejść figur (bez warstwy tury)
+_NO_FEATURE = PIECE_FEATURES  # Indeks zerowego wiersza - wypełnienie, gdy ruch zmienia mniej cech
+
+
+def feature_index(color, piece_type, square):
+    """Indeks wejścia sieci dla figury na polu (ten sam układ co w chess_board_encoder)."""
+    plane = piece_type - 1 if color == chess.WHITE else piece_type + 5
+    return plane * 64 + square
+
+
+def board_features(board):
+    """Indeksy wszystkich zapalonych wejść figur."""
+    return [feature_index(piece.color, piece.piece_type, square) for square, piece in board.piece_map().items()]
+
+
+def move_features(board, move):
+    """
+    Zmiana wejść przy ruchu `move` z pozycji `board` (przed wykonaniem ruchu):
+    (dodane, usunięte) - po najwyżej dwa indeksy każdego rodzaju.
+    """
+    color = board.turn
+    piece_type = board.piece_type_at(move.from_square)
+    removed = [feature_index(color, piece_type, move.from_square)]
+    if board.is_castling(move):
+        rank = chess.square_rank(move.from_square)
+        kingside = board.is_kingside_castling(move)
+        # W Chess960 roszada to "król bije własną wieżę", w zwykłych szachach król idzie na g/c
+        if board.piece_type_at(move.to_square) == chess.ROOK and board.color_at(move.to_square) == color:
+            rook_from = move.to_square
+        else:
+            rook_from = chess.square(7 if kingside else 0, rank)
+        removed.append(feature_index(color, chess.ROOK, rook_from))
+        added = [feature_index(color, chess.KING, chess.square(6 if kingside else 2, rank)),
+                 feature_index(color, chess.ROOK, chess.square(5 if kingside else 3, rank))]
+        return added, removed
+
+    if board.is_en_passant(move):
+        captured_square = move.to_square - 8 if color == chess.WHITE else move.to_square + 8
+        removed.append(feature_index(not color, chess.PAWN, captured_square))
+    else:
+        victim = board.piece_type_at(move.to_square)
+        if victim:
+            removed.append(feature_index(not color, victim, move.to_square))
+    return [feature_index(color, move.promotion or piece_type, move.to_square)], removed
+
+
+def moves_features(board, moves):
+    """
+    move_features dla wielu ruchów naraz: tablice (N, 2) dodanych i usuniętych wejść
+    (brakujące uzupełnione _NO_FEATURE). Jedna pętla bez tworzenia list na ruch - to ona,
+    a nie mnożenie macierzy, dominuje koszt evaluate_moves. Roszady idą przez move_features.
+    """
+    turn = board.turn
+    own = 0 if turn == chess.WHITE else 6  # Pierwsza płaszczyzna figur strony na ruchu
+    theirs = board.occupied_co[not turn]
+    piece_type_at = board.piece_type_at
+    ep_square = board.ep_square
+    ep_feature = None
+    if ep_square is not None:
+        captured_square = ep_square - 8 if turn == chess.WHITE else ep_square + 8
+        ep_feature = (6 - own + chess.PAWN - 1) * 64 + captured_square
+    added = []
+    removed = []
+    for move in moves:
+        from_square = move.from_square
+        to_square = move.to_square
+        piece_type = piece_type_at(from_square)
+        # Roszada: król o dwa pola albo (Chess960) król "bije" własną wieżę
+        if piece_type == chess.KING and (abs(to_square - from_square) == 2 or (
+                piece_type_at(to_square) == chess.ROOK and not theirs >> to_square & 1)):
+            move_added, move_removed = move_features(board, move)
+            added += move_added
+            removed += move_removed
+            continue
+        removed.append((own + piece_type - 1) * 64 + from_square)
+        added.append((own + (move.promotion or piece_type) - 1) * 64 + to_square)
+        added.append(_NO_FEATURE)
+        if theirs >> to_square & 1:
+            removed.append((5 - own + piece_type_at(to_square)) * 64 + to_square)
+        elif to_square == ep_square and piece_type == chess.PAWN:
+            removed.append(ep_feature)
+        else:
+            removed.append(_NO_FEATURE)
+    return (np.array(added, dtype=np.intp).reshape(-1, 2),
+            np.array(removed, dtype=np.intp).reshape(-1, 2))
+
+
+class NnueEvaluator(NumpyEvaluator):
+    """
+    Te same wagi co NumpyEvaluator (więc nadal można go wywołać na batchu (N, 832)),
+    plus ocena z akumulatorów. Evaluator jest współdzielony (load_evaluator), dlatego stan
+    przeszukiwania trzyma osobny obiekt Accumulator - po jednym na gracza.
+    """
+
+    def __init__(self, layers):
+        super().__init__(layers)
+        kernel, bias, activation = self.layers[0]
+        if activation != 'relu' or kernel.shape[0] != PIECE_FEATURES + 64:
+            raise ValueError("Akumulator wymaga pierwszej warstwy Dense(832 -> N) z aktywacją relu")
+        # Wiersze wag figur + zerowy wiersz wypełnienia
+        self.feature_weights = np.vstack([kernel[:PIECE_FEATURES], np.zeros((1, kernel.shape[1]), np.float32)])
+        self.bias = bias
+        self.turn_weights = kernel[PIECE_FEATURES:].sum(axis=0)
+        self.hidden_layers = self.layers[1:]
+
+    def new_accumulator(self, board=None):
+        return Accumulator(self, board)
+
+    def initial_accumulator(self, board):
+        """Akumulator (bez warstwy tury) policzony od zera dla pozycji."""
+        features = board_features(board)
+        return self.bias + self.feature_weights[features].sum(axis=0)
+
+    def evaluate_accumulators(self, accumulators, white_to_move):
+        """Oceny dla batcha akumulatorów (N, 256); `white_to_move` to tablica (N,) bool albo jedna wartość."""
+        x = accumulators + np.multiply.outer(np.asarray(white_to_move, dtype=np.float32), self.turn_weights)
+        np.maximum(x, 0.0, out=x)
+        for kernel, bias, activation in self.hidden_layers:
+            x = x @ kernel
+            x += bias
+            if activation == 'relu':
+                np.maximum(x, 0.0, out=x)
+        return x[..., 0]
+
+
+class Accumulator:
+    """
+    Stos akumulatorów zsynchronizowany z szachownicą: push(board, move) wywołujemy zamiast
+    board.push(move), pop(board) zamiast board.pop(). refresh(board) liczy wszystko od nowa.
+    """
+
+    def __init__(self, evaluator, board=None):
+        self.evaluator = evaluator
+        self._stack = []
+        if board is not None:
+            self.refresh(board)
+
+    def refresh(self, board):
+        self._stack = [self.evaluator.initial_accumulator(board)]
+
+    def push(self, board, move):
+        added, removed = move_features(board, move)
+        weights = self.evaluator.feature_weights
+        accumulator = self._stack[-1] + weights[added].sum(axis=0)
+        accumulator -= weights[removed].sum(axis=0)
+        self._stack.append(accumulator)
+        board.push(move)
+
+    def pop(self, board):
+        self._stack.pop()
+        return board.pop()
+
+    def evaluate(self, board):
+        """Ocena bieżącej pozycji (tej na szczycie stosu)."""
+        return float(self.evaluator.evaluate_accumulators(self._stack[-1], board.turn == chess.WHITE))
+
+    def evaluate_moves(self, board, moves):
+        """
+        Oceny pozycji po każdym z `moves` jednym batchem - bez wykonywania ruchów
+        i bez kodowania pozycji: każde dziecko to akumulator rodzica plus 2-4 wiersze wag.
+        """
+        added, removed = moves_features(board, moves)
+        weights = self.evaluator.feature_weights
+        children = self._stack[-1] + weights[added[:, 0]]
+        children += weights[added[:, 1]]
+        children -= weights[removed[:, 0]]
+        children -= weights[removed[:, 1]]
+        return self.evaluator.evaluate_accumulators(children, board.turn != chess.WHITE)
+
+
+def _random_positions(count, seed=0):
+    rng = random.Random(seed)
+    boards = []
+    board = chess.Board()
+    while len(boards) < count:
+        moves = list(board.legal_moves)
+        if not moves or board.ply() >= 120:
+            board.reset()
+            continue
+        board.push(rng.choice(moves))
+        boards.append(board.copy())
+    return boards
+
+
+def compare_with_network(evaluator, positions=2000, seed=0):
+    """
+    Porównuje ocenę z akumulatorów (aktualizowanych przez push/pop w losowych partiach
+    i przez evaluate_moves) z pełnym przejściem sieci. Zwraca (maks. błąd bezwzględny, czasy w s).
+
+    Czasy mierzą to, co robi wyszukiwanie w węźle: ocenę wszystkich dzieci pozycji jednym
+    batchem - pełna sieć koduje każde dziecko (push/encode/pop), akumulator liczy je
+    z akumulatora rodzica przez evaluate_moves.
+    """
+    boards = _random_positions(positions, seed)
+    reference = evaluator(encode_boards(boards))
+
+    max_error = 0.0
+    accumulator = evaluator.new_accumulator()
+    replay = chess.Board()
+    accumulator.refresh(replay)
+    for board, expected in zip(boards, reference):
+        if board.ply() == 1:
+            while replay.move_stack:
+                accumulator.pop(replay)
+        last_move = board.peek()
+        scores = accumulator.evaluate_moves(replay, [last_move])
+        accumulator.push(replay, last_move)
+        max_error = max(max_error, abs(float(scores[0]) - float(expected)),
+                        abs(accumulator.evaluate(replay) - float(expected)))
+
+    nodes = [(board, list(board.legal_moves)) for board in boards]
+    nodes = [(board, moves) for board, moves in nodes if moves]
+    network_start = time.perf_counter()
+    for board, moves in nodes:
+        children = []
+        for move in moves:
+            board.push(move)
+            children.append(board.copy(stack=False))
+            board.pop()
+        evaluator(encode_boards(children))
+    network_time = time.perf_counter() - network_start
+
+    accumulators = [evaluator.new_accumulator(board) for board, _ in nodes]
+    accumulator_start = time.perf_counter()
+    for (board, moves), node_accumulator in zip(nodes, accumulators):
+        node_accumulator.evaluate_moves(board, moves)
+    accumulator_time = time.perf_counter() - accumulator_start
+    return max_error, {'network': network_time, 'accumulator': accumulator_time, 'nodes': len(nodes)}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Zgodność i szybkość oceny przez akumulator (NNUE).")
+    parser.add_argument('--model', default='trained_chess_model.h5')
+    parser.add_argument('--positions', type=int, default=2000)
+    parser.add_argument('--tolerance', type=float, default=1e-4)
+    args = parser.parse_args()
+
+    nnue = NnueEvaluator.from_h5(args.model) if os.path.exists(args.model) else NnueEvaluator.random()
+    error, timings = compare_with_network(nnue, args.positions)
+    print(f"Maksymalny błąd względem pełnej sieci: {error:.2e} (tolerancja {args.tolerance:.0e})")
+    print(f"Ocena dzieci {timings['nodes']} węzłów - pełna sieć (push + kodowanie): "
+          f"{timings['network'] * 1000:.1f} ms, akumulator (evaluate_moves): "
+          f"{timings['accumulator'] * 1000:.1f} ms "
+          f"({timings['network'] / timings['accumulator']:.1f}x)")
+    if error > args.tolerance:
+        raise SystemExit("Akumulator NIE zgadza się z siecią.")
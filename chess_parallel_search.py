@@ -0,0 +1,250 @@
+"""
+Równoległe przeszukiwanie korzenia (root splitting) dla ChessAIPlayer(workers=N).
+
+Każdy proces roboczy ma własnego ChessAIPlayer: własny evaluator, tablicę transpozycji i stos
+akumulatorów. W każdej iteracji pogłębiania pierwszy ruch (z wariantu głównego poprzedniej
+iteracji) liczymy pełnym oknem, a pozostałe ruchy korzenia rozdzielamy między procesy z oknem
+"nie gorszy niż pierwszy". Ruch gorszy od pierwszego kończy się szybkim odcięciem, pozostałe
+dostają dokładne oceny. Remis rozstrzygamy kolejnością board.legal_moves, tak jak przeszukiwanie
+sekwencyjne, więc przy tej samej głębokości wybrany ruch jest ten sam - z wyjątkiem remisów
+ocen: procesy oceniają liście w innych batchach, a wynik sieci float32 zależy od batcha
+na poziomie ~1e-7, więc z dwóch równych ruchów może wygrać ten późniejszy.
+"""
+
+import math
+import multiprocessing
+import pickle
+import time
+
+import chess
+
+from chess_logic import ChessAIPlayer, _SearchAborted, search_depth_limit
+
+POLL_INTERVAL = 0.02  # Jak często proces główny sprawdza limit czasu i stop_event (s)
+
+# Stan procesu roboczego
+_worker_player = None
+_worker_abort = None
+_worker_game_id = None
+_worker_search_id = None
+
+
+def _init_worker(player_options, abort_event):
+    global _worker_player, _worker_abort
+    _worker_player = ChessAIPlayer(use_tensorflow=True, **player_options)
+    _worker_abort = abort_event
+
+
+def _search_root_move(task):
+    """
+    Ocena jednego ruchu korzenia w procesie roboczym; ocena None oznacza przerwanie
+    (stop, termin albo wyczerpany przydział węzłów `node_budget` tego zadania).
+    """
+    global _worker_game_id, _worker_search_id
+    game_id, search_id, board, move, depth, alpha, beta, pv, time_left, node_budget = task
+    player = _worker_player
+    if game_id != _worker_game_id:
+        _worker_game_id = game_id
+        player.new_game()
+    if search_id != _worker_search_id:
+        _worker_search_id = search_id
+        if player.transposition_table:
+            player.transposition_table.new_search()
+        player.history_scores = {}
+
+    player._reset_search_counters()
+    player.killer_moves = [[None, None] for _ in range(depth + 1)]
+    player._root_ply = len(board.move_stack)
+    player._pv = [chess.Move.from_uci(uci) for uci in pv]
+    player._deadline = time.perf_counter() + time_left if time_left is not None else None
+    player._node_limit = node_budget
+    player._can_abort = True
+    player._stop_event = _worker_abort
+    if player._accumulator:
+        player._accumulator.refresh(board)
+    player._push(board, move)
+    try:
+        score = player._alphabeta(board, depth - 1, alpha, beta, 1)
+        child_pv = [child.uci() for child in player._extract_pv(board, depth - 1)]
+    except _SearchAborted:
+        score, child_pv = None, []
+    finally:
+        player._stop_event = None
+        player._can_abort = False
+
+    counters = {
+        'nodes_searched': player.nodes_searched,
+        'leaf_evaluations': player.leaf_evaluations,
+        'nn_batches': player.nn_batches,
+        'tt_hits': player.tt_hits,
+        'eval_cache_hits': player.eval_cache_hits,
+        'movegen_time': player.movegen_time,
+        'encode_time': player.encode_time,
+        'inference_time': player.inference_time,
+    }
+    return move.uci(), score, child_pv, counters
+
+
+class RootParallelSearch:
+    """
+    Pula procesów współdzielona przez kolejne ruchy jednego gracza.
+    Liczniki z procesów roboczych są dodawane do liczników gracza, więc czasy faz
+    w SearchStats to suma czasu wszystkich procesów (może przekraczać czas zegarowy).
+    """
+
+    def __init__(self, workers, player_options):
+        self.workers = workers
+        # spawn zamiast fork: proces główny może mieć już wczytany TensorFlow (nie przeżywa fork)
+        # i wątki GUI/UCI trzymające blokady; _init_worker i tak buduje gracza od zera z player_options
+        context = multiprocessing.get_context('spawn')
+        player_options = dict(player_options)
+        if player_options.get('evaluator') is not None:
+            try:
+                pickle.dumps(player_options['evaluator'])
+            except Exception:
+                print("Evaluatora nie da się przekazać do procesów roboczych - wczytają model z "
+                      f"'{player_options['model_path']}'")
+                player_options['evaluator'] = None
+        self._abort = context.Event()
+        self._pool = context.Pool(workers, initializer=_init_worker, initargs=(player_options, self._abort))
+        self._game_id = 0
+        self._search_id = 0
+
+    def new_game(self):
+        """Procesy robocze wyczyszczą swoje tablice transpozycji przy następnym zadaniu."""
+        self._game_id += 1
+
+    def close(self):
+        self._pool.terminate()
+        self._pool.join()
+
+    def iterative_deepening(self, player, board, depth, start_time, time_limit, node_limit, stop_event):
+        """Odpowiednik ChessAIPlayer._iterative_deepening; zwraca (ruch, ocena, głębokość, PV)."""
+        max_depth = search_depth_limit(depth, time_limit, node_limit)
+        # Termin trzymamy w graczu, żeby ChessAIPlayer.set_deadline działało także w trakcie tego przeszukiwania
+        player._begin_deadline(start_time, time_limit)
+        self._search_id += 1
+
+        legal_moves = list(board.legal_moves)
+        if not legal_moves:
+            return None, player._terminal_score(board), 0, []
+
+        best_move, best_score, depth_reached, pv = None, None, 0, []
+        scores = {}
+        for current_depth in range(1, max_depth + 1):
+            if current_depth == 1:
+                # Płytka iteracja jest tania - liczymy ją w procesie głównym jednym batchem
+                if player._accumulator:
+                    player._accumulator.refresh(board)
+                depth_scores = player._evaluate_children(board, legal_moves)
+                scores = dict(zip(legal_moves, depth_scores))
+                move, score = self._pick_best(board, legal_moves, legal_moves, scores)
+                pv = [move]
+            else:
+                result = self._search_iteration(player, board, legal_moves, current_depth, scores, pv,
+                                                node_limit, stop_event)
+                if result is None:
+                    break  # Przerwane - zostaje wynik poprzedniej iteracji
+                move, score, pv, scores = result
+
+            best_move, best_score, depth_reached = move, score, current_depth
+            if player.stats_callback:
+                player.stats_callback(player._snapshot_stats(current_depth, pv, score, final=False))
+            if player._deadline and time.perf_counter() >= player._deadline:
+                break
+        return best_move, best_score, depth_reached, pv
+
+    def _search_iteration(self, player, board, legal_moves, depth, previous_scores, pv, node_limit, stop_event):
+        maximizing_player = board.turn == chess.WHITE
+        pv_move = pv[0] if pv else None
+        # Ruch z PV najpierw, potem według ocen z poprzedniej iteracji (sorted() jest stabilne)
+        ordered = sorted(legal_moves, key=lambda move: (
+            move != pv_move, -previous_scores.get(move, 0.0) if maximizing_player else previous_scores.get(move, 0.0)))
+        pv_uci = [move.uci() for move in pv]
+
+        first = self._run([self._task(board, ordered[0], depth, -math.inf, math.inf, pv_uci, player._deadline,
+                                      self._node_budget(player, node_limit, 1))],
+                          player, node_limit, stop_event)
+        if first is None:
+            return None
+        first_score = first[0][1]
+        if maximizing_player:
+            alpha, beta = math.nextafter(first_score, -math.inf), math.inf
+        else:
+            alpha, beta = -math.inf, math.nextafter(first_score, math.inf)
+        node_budget = self._node_budget(player, node_limit, len(ordered) - 1)
+        rest = self._run([self._task(board, move, depth, alpha, beta, pv_uci, player._deadline, node_budget)
+                          for move in ordered[1:]], player, node_limit, stop_event)
+        if rest is None:
+            return None
+
+        scores = {}
+        child_pvs = {}
+        exact = []
+        for index, (move_uci, score, child_pv, _) in enumerate(first + rest):
+            move = chess.Move.from_uci(move_uci)
+            scores[move] = score
+            child_pvs[move] = child_pv
+            # Wynik poza oknem to tylko ograniczenie (ruch gorszy od pierwszego)
+            if index == 0 or (score > alpha if maximizing_player else score < beta):
+                exact.append(move)
+        best_move, best_score = self._pick_best(board, legal_moves, exact, scores)
+        best_pv = [best_move] + [chess.Move.from_uci(uci) for uci in child_pvs[best_move]]
+        return best_move, best_score, best_pv, scores
+
+    @staticmethod
+    def _pick_best(board, legal_moves, candidates, scores):
+        """Najlepsza ocena; przy remisie ruch wcześniejszy w legal_moves (jak w przeszukiwaniu sekwencyjnym)."""
+        legal_order = {move: index for index, move in enumerate(legal_moves)}
+        sign = 1 if board.turn == chess.WHITE else -1
+        best_move = min(candidates, key=lambda move: (-sign * scores[move], legal_order[move]))
+        return best_move, scores[best_move]
+
+    @staticmethod
+    def _node_budget(player, node_limit, tasks):
+        """
+        Przydział węzłów jednego z `tasks` zadań: równa część limitu, który jeszcze został.
+        Proces główny widzi węzły procesów roboczych dopiero po zakończeniu zadania, więc bez
+        przydziału zadania mogłyby razem wielokrotnie przekroczyć limit.
+        """
+        if not node_limit or not tasks:
+            return None
+        return max(1, (node_limit - player.nodes_searched) // tasks)
+
+    def _task(self, board, move, depth, alpha, beta, pv_uci, deadline, node_budget=None):
+        time_left = max(0.0, deadline - time.perf_counter()) if deadline else None
+        return self._game_id, self._search_id, board, move, depth, alpha, beta, pv_uci, time_left, node_budget
+
+    def _run(self, tasks, player, node_limit, stop_event):
+        """Rozdziela zadania między procesy; zwraca listę wyników albo None, jeśli przeszukiwanie przerwano."""
+        if not tasks:
+            return []
+        results = []
+        aborted = False
+        pending = self._pool.imap_unordered(_search_root_move, tasks)
+        # Po przerwaniu i tak odbieramy wszystkie wyniki (przerwane zadania kończą się szybko),
+        # żeby zadania z tej iteracji nie mieszały się z następnym przeszukiwaniem
+        while len(results) < len(tasks):
+            try:
+                result = pending.next(timeout=POLL_INTERVAL)
+            except multiprocessing.TimeoutError:
+                if not aborted and self._should_stop(player, node_limit, stop_event):
+                    aborted = True
+                    self._abort.set()
+                continue
+            for name, value in result[3].items():
+                setattr(player, name, getattr(player, name) + value)
+            if result[1] is None and not aborted:
+                aborted = True
+                self._abort.set()
+            results.append(result)
+        self._abort.clear()
+        return None if aborted else results
+
+    @staticmethod
+    def _should_stop(player, node_limit, stop_event):
+        if stop_event is not None and stop_event.is_set():
+            return True
+        if node_limit and player.nodes_searched >= node_limit:
+            return True
+        return player._deadline is not None and time.perf_counter() >= player._deadline
@@ -0,0 +1,288 @@
+"""
+Dane treningowe z prawdziwych partii PGN zamiast losowych ocen z generatora.
+
+Plik (także .bz2, .gz i .zst) czytamy strumieniowo: proces główny tylko tnie tekst na paczki
+całych partii, a procesy robocze parsują je i kodują pozycje do formatu SAMPLE_DTYPE.
+W pamięci jest najwyżej kilka paczek na proces i jeden niepełny shard, niezależnie od
+rozmiaru pliku. Shardy mają ten sam format co chess_dataset_generator --shards, więc
+trenuje się na nich przez chess_model_trainer --data KATALOG_SHARDÓW.
+
+Etykieta (z perspektywy białych, w zakresie [-1, 1]):
+- result: wynik partii (1 / 0 / -1) dla każdej jej pozycji,
+- eval:   ocena silnika z komentarzy [%eval 0.35] / [%eval #-3], przeskalowana tanh(cp / EVAL_SCALE);
+          pozycje bez oceny są pomijane,
+- mix:    result_weight * wynik + (1 - result_weight) * ocena (bez oceny - sam wynik).
+
+Przykład:
+    python chess_pgn_ingest.py lichess_2023-01.pgn.zst --output chess_data_shards --label mix
+"""
+
+import argparse
+import bz2
+import gzip
+import io
+import math
+import os
+import re
+import time
+from collections import deque
+from multiprocessing import Pool
+
+import chess
+import chess.pgn
+import numpy as np
+
+from chess_board_encoder import PACKED_SIZE, _bitboard_bytes
+from chess_dataset_generator import DEFAULT_SHARD_SIZE, SAMPLE_DTYPE, SHARD_DIR, write_shard
+
+LABEL_MODES = ('result', 'eval', 'mix')
+DEFAULT_LABEL = 'result'
+DEFAULT_RESULT_WEIGHT = 0.5
+DEFAULT_SKIP_PLIES = 8  # Pozycje z samego otwarcia powtarzają się w tysiącach partii
+EVAL_SCALE = 400.0  # Centypiony, przy których tanh daje ~0.76
+MATE_SCORE = 1.0
+GAMES_PER_TASK = 200
+
+_RESULT_SCORES = {'1-0': 1.0, '0-1': -1.0, '1/2-1/2': 0.0}
+_EVAL_REGEX = re.compile(r'\[%eval\s+(#)?([-+]?\d+(?:\.\d+)?)')
+
+
+def open_pgn(path):
+    """Otwiera plik PGN jako tekst; kompresję rozpoznajemy po rozszerzeniu."""
+    if path.endswith('.bz2'):
+        return bz2.open(path, 'rt', encoding='utf-8', errors='replace')
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8', errors='replace')
+    if path.endswith('.zst'):
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError("Do czytania plików .zst potrzebny jest pakiet zstandard (pip install zstandard)")
+        stream = zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+        return io.TextIOWrapper(stream, encoding='utf-8', errors='replace')
+    return open(path, encoding='utf-8', errors='replace')
+
+
+def iter_game_chunks(lines, games_per_chunk=GAMES_PER_TASK):
+    """
+    Tnie strumień linii PGN na teksty zawierające po `games_per_chunk` całych partii.
+    Nowa partia zaczyna się od linii nagłówka '[' po treści ruchów poprzedniej - do podziału
+    nie trzeba niczego parsować, więc proces główny nie jest wąskim gardłem.
+    """
+    chunk = []
+    games = 0
+    in_movetext = False
+    for line in lines:
+        if line.startswith('['):
+            if in_movetext:
+                in_movetext = False
+                games += 1
+                if games >= games_per_chunk:
+                    yield ''.join(chunk)
+                    chunk = []
+                    games = 0
+        elif line.strip():
+            in_movetext = True
+        chunk.append(line)
+    if chunk:
+        yield ''.join(chunk)
+
+
+def parse_eval(comment):
+    """Ocena z komentarza [%eval ...] w skali [-1, 1] z perspektywy białych albo None."""
+    match = _EVAL_REGEX.search(comment)
+    if match is None:
+        return None
+    if match.group(1):  # Mat w N ruchów
+        return -MATE_SCORE if match.group(2).startswith('-') else MATE_SCORE
+    return math.tanh(float(match.group(2)) * 100.0 / EVAL_SCALE)
+
+
+class _PositionVisitor(chess.pgn.BaseVisitor):
+    """
+    Visitor dla chess.pgn.read_game, który nie buduje drzewa partii: zbiera spakowane pozycje
+    z linii głównej i oceny z komentarzy. Warianty pomija, a partie bez wyniku (albo
+    z niepasującym rankingiem) odrzuca już po nagłówkach, bez parsowania ruchów.
+    """
+
+    def __init__(self, min_elo=0):
+        self.min_elo = min_elo
+
+    def begin_game(self):
+        self.headers = {}
+        self.positions = []
+        self.turns = []
+        self.evals = []
+        self.valid = True
+
+    def visit_header(self, tagname, tagvalue):
+        self.headers[tagname] = tagvalue
+
+    def end_headers(self):
+        if self.headers.get('Result') not in _RESULT_SCORES:
+            self.valid = False
+        elif self.min_elo and min(_elo(self.headers.get('WhiteElo')), _elo(self.headers.get('BlackElo'))) < self.min_elo:
+            self.valid = False
+        return chess.pgn.SKIP if not self.valid else None
+
+    def visit_board(self, board):
+        self.positions.append(_bitboard_bytes(board))
+        self.turns.append(1 if board.turn == chess.WHITE else 0)
+        self.evals.append(None)
+
+    def visit_comment(self, comment):
+        if self.positions:
+            self.evals[-1] = parse_eval(comment)
+
+    def begin_variation(self):
+        return chess.pgn.SKIP
+
+    def handle_error(self, error):
+        self.valid = False
+
+    def result(self):
+        return self.valid
+
+
+def _elo(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _game_labels(visitor, label, result_weight, skip_plies):
+    """Indeksy pozycji do zapisania i ich etykiety."""
+    result = _RESULT_SCORES[visitor.headers['Result']]
+    indices = []
+    labels = []
+    for index in range(skip_plies, len(visitor.positions)):
+        evaluation = visitor.evals[index]
+        if label == 'result':
+            y = result
+        elif evaluation is None:
+            if label == 'eval':
+                continue
+            y = result
+        elif label == 'eval':
+            y = evaluation
+        else:
+            y = result_weight * result + (1.0 - result_weight) * evaluation
+        indices.append(index)
+        labels.append(y)
+    return indices, labels
+
+
+def _parse_chunk(task):
+    """Praca procesu roboczego: paczka tekstu PGN -> (rekordy SAMPLE_DTYPE, partie użyte, partie pominięte)."""
+    text, label, result_weight, skip_plies, min_elo = task
+    stream = io.StringIO(text)
+    visitor = _PositionVisitor(min_elo)
+    planes = []
+    turns = []
+    labels = []
+    games = skipped = 0
+    while chess.pgn.read_game(stream, Visitor=lambda: visitor) is not None:
+        if not visitor.valid:
+            skipped += 1
+            continue
+        games += 1
+        indices, game_labels = _game_labels(visitor, label, result_weight, skip_plies)
+        planes.extend(visitor.positions[index] for index in indices)
+        turns.extend(visitor.turns[index] for index in indices)
+        labels.extend(game_labels)
+
+    records = np.empty(len(labels), dtype=SAMPLE_DTYPE)
+    if labels:
+        records['planes'] = np.frombuffer(b''.join(planes), dtype=np.uint8).reshape(len(labels), PACKED_SIZE)
+        records['turn'] = turns
+        records['y'] = labels
+    return records, games, skipped
+
+
+def ingest_pgn(pgn_paths, output_dir=SHARD_DIR, shard_size=DEFAULT_SHARD_SIZE, workers=None, label=DEFAULT_LABEL,
+               result_weight=DEFAULT_RESULT_WEIGHT, skip_plies=DEFAULT_SKIP_PLIES, min_elo=0, max_positions=None,
+               games_per_task=GAMES_PER_TASK):
+    """
+    Zamienia pliki PGN na shardy .npy. Paczki partii trafiają do procesów z ograniczonym
+    oknem (2 paczki na proces), a wyniki odbieramy w kolejności wejścia, więc ten sam plik
+    daje zawsze te same shardy. Zwraca liczbę zapisanych pozycji.
+    """
+    if label not in LABEL_MODES:
+        raise ValueError(f"Nieznany rodzaj etykiety: {label} (dostępne: {', '.join(LABEL_MODES)})")
+    os.makedirs(output_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+
+    buffered = []
+    buffered_count = 0
+    shard_index = 0
+    written = games = skipped = 0
+    start_time = time.perf_counter()
+
+    def write_buffered(final=False):
+        nonlocal buffered, buffered_count, shard_index, written
+        while buffered_count >= shard_size or (final and buffered_count):
+            records = np.concatenate(buffered)
+            shard = records[:shard_size]
+            buffered, buffered_count = [records[shard_size:]], len(records) - len(shard)
+            write_shard(shard, output_dir, shard_index)
+            shard_index += 1
+            written += len(shard)
+            elapsed = time.perf_counter() - start_time
+            print(f"Shard {shard_index} zapisany ({written} pozycji z {games} partii, "
+                  f"{written / elapsed:.0f} pozycji/s)")
+
+    def collect(result):
+        nonlocal buffered_count, games, skipped
+        records, chunk_games, chunk_skipped = result
+        games += chunk_games
+        skipped += chunk_skipped
+        if max_positions is not None:
+            records = records[:max_positions - written - buffered_count]
+        buffered.append(records)
+        buffered_count += len(records)
+        write_buffered()
+        return max_positions is not None and written + buffered_count >= max_positions
+
+    def tasks():
+        for path in pgn_paths:
+            with open_pgn(path) as f:
+                for chunk in iter_game_chunks(f, games_per_task):
+                    yield chunk, label, result_weight, skip_plies, min_elo
+
+    with Pool(processes=workers) as pool:
+        pending = deque()
+        done = False
+        for task in tasks():
+            pending.append(pool.apply_async(_parse_chunk, (task,)))
+            if len(pending) >= 2 * workers and collect(pending.popleft().get()):
+                done = True
+                break
+        while pending and not done:
+            done = collect(pending.popleft().get())
+    write_buffered(final=True)
+
+    elapsed = time.perf_counter() - start_time
+    print(f"Zapisano {written} pozycji z {games} partii ({skipped} pominiętych) w {shard_index} shardach "
+          f"w '{output_dir}' ({elapsed:.1f} s, {written / elapsed * 3600 / 1e6:.2f} mln pozycji/h).")
+    return written
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Shardy danych treningowych z partii PGN.")
+    parser.add_argument('pgn', nargs='+', help="Pliki PGN (także .bz2, .gz, .zst)")
+    parser.add_argument('--output', default=SHARD_DIR, help="Katalog shardów")
+    parser.add_argument('--shard-size', type=int, default=DEFAULT_SHARD_SIZE, help="Liczba pozycji w shardzie")
+    parser.add_argument('--workers', type=int, default=None, help="Liczba procesów (domyślnie liczba rdzeni)")
+    parser.add_argument('--label', choices=LABEL_MODES, default=DEFAULT_LABEL,
+                        help="Etykieta: wynik partii, ocena [%%eval] albo ich mieszanka")
+    parser.add_argument('--result-weight', type=float, default=DEFAULT_RESULT_WEIGHT,
+                        help="Waga wyniku partii w trybie mix")
+    parser.add_argument('--skip-plies', type=int, default=DEFAULT_SKIP_PLIES,
+                        help="Pomijaj pozycje z pierwszych N półruchów")
+    parser.add_argument('--min-elo', type=int, default=0, help="Tylko partie, w których obaj gracze mają ranking >= N")
+    parser.add_argument('--max-positions', type=int, default=None, help="Zakończ po zapisaniu N pozycji")
+    args = parser.parse_args()
+
+    ingest_pgn(args.pgn, args.output, args.shard_size, args.workers, args.label, args.result_weight,
+               args.skip_plies, args.min_elo, args.max_positions)
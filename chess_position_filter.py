@@ -0,0 +1,96 @@
+"""
+Filtry "czy ta pozycja już była" dla deduplikacji danych treningowych.
+
+Kluczem jest 64-bitowy klucz pozycji (chess_transposition.position_key - te same składniki co klucz
+Zobrista, ale ~10x tańszy; klucze żyją tylko w pamięci jednego przebiegu). Dla małych zbiorów wystarcza dokładny
+zbiór kluczy; dla dużych filtr Blooma trzyma ~10 bitów na pozycję zamiast ~70 bajtów w set(),
+za cenę odrzucenia niewielkiego odsetka (error_rate) nowych pozycji jako rzekomych duplikatów.
+"""
+
+import math
+
+import numpy as np
+
+DEFAULT_EXACT_LIMIT = 5000000  # Do tylu pozycji używamy dokładnego zbioru
+DEFAULT_ERROR_RATE = 0.001
+
+
+class ExactKeySet:
+    """Dokładna deduplikacja (set() kluczy)."""
+
+    def __init__(self):
+        self._keys = set()
+
+    def __len__(self):
+        return len(self._keys)
+
+    def add_many(self, keys):
+        """Dodaje klucze; zwraca maskę bool - True dla kluczy widzianych pierwszy raz."""
+        new = np.zeros(len(keys), dtype=bool)
+        seen = self._keys
+        for index, key in enumerate(np.asarray(keys, dtype=np.uint64).tolist()):
+            if key not in seen:
+                seen.add(key)
+                new[index] = True
+        return new
+
+    def memory_bytes(self):
+        return len(self._keys) * 70  # Przybliżenie: wpis set() + obiekt int
+
+
+class BloomFilter:
+    """
+    Filtr Blooma w tablicy bitów NumPy; k indeksów z dwóch połówek klucza (double hashing).
+    Fałszywie pozytywne odpowiedzi (nowa pozycja uznana za duplikat) zdarzają się z
+    prawdopodobieństwem ~error_rate, fałszywie negatywnych nie ma.
+    """
+
+    def __init__(self, capacity, error_rate=DEFAULT_ERROR_RATE):
+        capacity = max(1, int(capacity))
+        self.bits = max(64, int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)))
+        self.hashes = max(1, int(round(self.bits / capacity * math.log(2))))
+        self._array = np.zeros((self.bits + 7) // 8, dtype=np.uint8)
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def _positions(self, keys):
+        keys = np.asarray(keys, dtype=np.uint64)
+        # Klucze z hash() mają dobre wyższe bity, ale mieszamy je jeszcze (splitmix64), żeby obie połówki były losowe
+        mixed = keys ^ (keys >> np.uint64(30))
+        mixed = mixed * np.uint64(0xBF58476D1CE4E5B9)
+        mixed ^= mixed >> np.uint64(27)
+        mixed = mixed * np.uint64(0x94D049BB133111EB)
+        mixed ^= mixed >> np.uint64(31)
+        h1 = mixed & np.uint64(0xFFFFFFFF)
+        h2 = (mixed >> np.uint64(32)) | np.uint64(1)
+        steps = np.arange(self.hashes, dtype=np.uint64)
+        return (h1[:, None] + steps[None, :] * h2[:, None]) % np.uint64(self.bits)
+
+    def add_many(self, keys):
+        """Dodaje klucze; zwraca maskę bool - True dla kluczy (prawdopodobnie) widzianych pierwszy raz."""
+        keys = np.asarray(keys, dtype=np.uint64)
+        new = np.zeros(len(keys), dtype=bool)
+        if not len(keys):
+            return new
+        # Powtórzenia w obrębie jednej paczki - nowe może być tylko pierwsze wystąpienie
+        _, first = np.unique(keys, return_index=True)
+        positions = self._positions(keys[first])
+        byte_index = (positions >> np.uint64(3)).astype(np.intp)
+        bit_mask = (np.uint8(1) << (positions & np.uint64(7)).astype(np.uint8))
+        present = (self._array[byte_index] & bit_mask).astype(bool).all(axis=1)
+        new[first[~present]] = True
+        np.bitwise_or.at(self._array, byte_index[~present].ravel(), bit_mask[~present].ravel())
+        self.count += int((~present).sum())
+        return new
+
+    def memory_bytes(self):
+        return self._array.nbytes
+
+
+def create_filter(expected_count, exact_limit=DEFAULT_EXACT_LIMIT, error_rate=DEFAULT_ERROR_RATE):
+    """Dokładny zbiór dla małych przebiegów, filtr Blooma dla większych niż `exact_limit`."""
+    if expected_count <= exact_limit:
+        return ExactKeySet()
+    return BloomFilter(expected_count, error_rate)
@@ -0,0 +1,73 @@
+"""
+Statystyki przeszukiwania ChessAIPlayer: liczniki węzłów i ocen sieci, trafienia cache
+oraz podział czasu na generowanie ruchów, kodowanie pozycji i inferencję.
+"""
+
+# Pola sumowalne między ruchami (np. w turnieju: suma po całej partii)
+COUNTER_FIELDS = ('nodes', 'leaf_evals', 'nn_batches', 'tt_hits', 'eval_cache_hits',
+                  'time', 'movegen_time', 'encode_time', 'inference_time')
+
+
+class SearchStats:
+    """
+    Wynik jednego przeszukiwania (albo jednej iteracji pogłębiania, gdy `final` jest False).
+    Czas "pozostały" (other_time) to wszystko poza trzema mierzonymi fazami:
+    push/pop, porządkowanie ruchów, tablica transpozycji i sam narzut Pythona.
+    """
+
+    def __init__(self, algorithm, depth=0, pv=(), score=None, nodes=0, leaf_evals=0, nn_batches=0, tt_hits=0,
+                 eval_cache_hits=0, time=0.0, movegen_time=0.0, encode_time=0.0, inference_time=0.0, final=True):
+        self.algorithm = algorithm
+        self.depth = depth
+        self.pv = list(pv)  # Ruchy w notacji UCI
+        self.score = score
+        self.nodes = nodes
+        self.leaf_evals = leaf_evals
+        self.nn_batches = nn_batches
+        self.tt_hits = tt_hits  # Wszystkie trafienia w tablicy transpozycji
+        self.eval_cache_hits = eval_cache_hits  # Liście, których ocena pochodziła z cache zamiast z sieci
+        self.time = time
+        self.movegen_time = movegen_time
+        self.encode_time = encode_time
+        self.inference_time = inference_time
+        self.final = final
+
+    @property
+    def other_time(self):
+        return max(0.0, self.time - self.movegen_time - self.encode_time - self.inference_time)
+
+    @property
+    def nodes_per_sec(self):
+        return self.nodes / self.time if self.time else 0.0
+
+    def as_dict(self):
+        data = dict(vars(self))
+        data['other_time'] = self.other_time
+        data['nodes_per_sec'] = self.nodes_per_sec
+        return data
+
+    def summary(self):
+        """Jedna linia do konsoli/GUI."""
+        return (f"{self.algorithm}, głębokość {self.depth}, ocena {self._format_score()}: "
+                f"{self.nodes} węzłów ({self.nodes_per_sec:.0f}/s), {self.leaf_evals} ocen sieci "
+                f"w {self.nn_batches} batchach ({self.eval_cache_hits} z cache), TT {self.tt_hits} trafień, "
+                f"{self.time:.2f} s = ruchy {self.movegen_time:.2f} + kodowanie {self.encode_time:.2f} "
+                f"+ sieć {self.inference_time:.2f} + reszta {self.other_time:.2f}"
+                + (f"; PV: {' '.join(self.pv)}" if self.pv else ""))
+
+    def _format_score(self):
+        return '-' if self.score is None else f"{self.score:.3f}"
+
+    def __repr__(self):
+        return f"SearchStats({self.summary()})"
+
+
+def sum_stats(stats_list):
+    """Sumuje liczniki (COUNTER_FIELDS) z wielu przeszukiwań; zwraca słownik z liczbą ruchów w 'moves'."""
+    totals = dict.fromkeys(COUNTER_FIELDS, 0)
+    totals['moves'] = 0
+    for stats in stats_list:
+        totals['moves'] += 1
+        for name in COUNTER_FIELDS:
+            totals[name] += getattr(stats, name)
+    return totals
@@ -0,0 +1,127 @@
+import sys
+
+import chess
+import numpy as np
+
+# Typy ograniczeń zapisanych w tablicy transpozycji
+EXACT = 1  # Dokładna ocena
+LOWER_BOUND = 2  # Ocena >= zapisana wartość (odcięcie beta)
+UPPER_BOUND = 3  # Ocena <= zapisana wartość (żaden ruch nie poprawił alfy)
+
+DEFAULT_TT_SIZE_MB = 32
+
+# Rozmiar jednego wpisu w bajtach: klucz (8) + ocena (4) + ruch (2) + głębokość (1) + typ (1) + wiek (1)
+ENTRY_SIZE = 17
+
+
+KEY_MASK = 0xFFFFFFFFFFFFFFFF
+# Wersja schematu position_key - zmienić przy każdej zmianie sposobu liczenia klucza
+# (klucze zapisane na dysk, np. w cache ocen, są ważne tylko z tą samą wersją)
+KEY_SCHEME = 'tuple-hash-1'
+_LOW = 0xFFFFFFFF
+
+
+def position_key(board):
+    """
+    64-bitowy klucz pozycji: hash krotki bitboardów, tury, praw roszady i pola en passant
+    (te same składniki co klucz Zobrista i powtórzenia pozycji w python-chess; czarne = zajęte pola - białe).
+    To NIE jest klucz Zobrista: chess.polyglot.zobrist_hash kosztuje ~7 us na pozycję, a nawet
+    Zobrist z tablic dla bajtów bitboardów ~4.4 us, ten klucz ~0.6 us - a liczymy go w każdym węźle.
+    Hash krotki liczb całkowitych nie zależy od PYTHONHASHSEED, więc w jednym interpreterze klucz jest
+    ten sam w każdym procesie, ale algorytm hash() jest szczegółem CPythona (i jego wersji) -
+    dlatego klucze zapisane na dysk trzeba opisywać przez key_scheme_tag().
+    Do książek otwarć Polyglot używaj chess.polyglot.zobrist_hash.
+    """
+    ep_square = board.ep_square if board.ep_square is not None and board.has_legal_en_passant() else -1
+    white = board.occupied_co[chess.WHITE]
+    castling = board.clean_castling_rights()
+    # Hash liczby to reszta z dzielenia przez 2^61 - 1, więc pola 61-63 zlewałyby się z polami 0-2;
+    # dlatego każdy bitboard dzielimy na dwie połówki 32-bitowe
+    return hash((board.pawns & _LOW, board.pawns >> 32, board.knights & _LOW, board.knights >> 32,
+                 board.bishops & _LOW, board.bishops >> 32, board.rooks & _LOW, board.rooks >> 32,
+                 board.queens & _LOW, board.queens >> 32, board.kings & _LOW, board.kings >> 32,
+                 white & _LOW, white >> 32, castling & _LOW, castling >> 32, board.turn, ep_square)) & KEY_MASK
+
+
+def key_scheme_tag():
+    """Opis, od czego zależą wartości position_key: schemat klucza, implementacja i wersja Pythona."""
+    return KEY_SCHEME, sys.implementation.name, sys.version_info[:2]
+
+
+def encode_move(move):
+    """Koduje ruch na 16 bitach: pole startowe, pole docelowe i promocja. 0 oznacza brak ruchu."""
+    if move is None:
+        return 0
+    return move.from_square | (move.to_square << 6) | ((move.promotion or 0) << 12)
+
+
+def decode_move(code):
+    if code == 0:
+        return None
+    promotion = (code >> 12) & 7
+    return chess.Move(code & 63, (code >> 6) & 63, promotion if promotion else None)
+
+
+class TranspositionTable:
+    """
+    Tablica transpozycji o stałym rozmiarze, indeksowana 64-bitowym kluczem pozycji (position_key).
+    Każde pole jest osobną tablicą NumPy, więc zajęta pamięć wynika wprost z budżetu w MB.
+
+    Polityka zastępowania (depth-preferred z wiekiem): w obrębie bieżącego przeszukiwania płytszy
+    wpis nie nadpisuje głębszego, a wpisy z poprzednich ruchów zawsze ustępują nowym.
+    Dzięki temu slot nie jest blokowany na stałe przez stare, głębokie wyniki.
+    """
+
+    def __init__(self, size_mb=DEFAULT_TT_SIZE_MB):
+        self.capacity = max(1, int(size_mb * 1024 * 1024) // ENTRY_SIZE)
+        self.keys = np.zeros(self.capacity, dtype=np.uint64)
+        self.scores = np.zeros(self.capacity, dtype=np.float32)
+        self.moves = np.zeros(self.capacity, dtype=np.uint16)
+        self.depths = np.zeros(self.capacity, dtype=np.int8)
+        self.flags = np.zeros(self.capacity, dtype=np.uint8)
+        self.ages = np.zeros(self.capacity, dtype=np.uint8)  # 0 = pusty slot
+        self.generation = 1
+        self.hits = 0
+        self.probes = 0
+        self.stores = 0
+
+    def new_search(self):
+        """Wywoływane przed każdym get_best_move: wpisy z poprzednich ruchów stają się „stare”."""
+        self.generation = self.generation % 255 + 1
+
+    def clear(self):
+        self.ages.fill(0)
+        self.generation = 1
+
+    def probe(self, key):
+        """Zwraca (głębokość, ocena, typ, ruch) dla pozycji albo None."""
+        self.probes += 1
+        index = key % self.capacity
+        if self.ages[index] == 0 or int(self.keys[index]) != key:
+            return None
+        self.hits += 1
+        return (int(self.depths[index]), float(self.scores[index]), int(self.flags[index]),
+                decode_move(int(self.moves[index])))
+
+    def store(self, key, depth, score, flag, move=None):
+        index = key % self.capacity
+        age = self.ages[index]
+        same_position = age != 0 and int(self.keys[index]) == key
+        if age == self.generation and depth < self.depths[index]:
+            return
+
+        if move is None and same_position:
+            move_code = self.moves[index]  # Zachowaj najlepszy ruch z płytszego wpisu
+        else:
+            move_code = encode_move(move)
+        self.keys[index] = key
+        self.scores[index] = score
+        self.moves[index] = move_code
+        self.depths[index] = min(depth, 127)
+        self.flags[index] = flag
+        self.ages[index] = self.generation
+        self.stores += 1
+
+    def usage(self):
+        """Odsetek zajętych slotów (do dobierania budżetu pamięci)."""
+        return float(np.count_nonzero(self.ages)) / self.capacity
@@ -0,0 +1,317 @@
+"""
+Silnik UCI wokół ChessAIPlayer - do uruchamiania w menedżerach turniejów i GUI szachowych.
+
+Obsługiwane polecenia: uci, isready, setoption, ucinewgame, position, go (wtime btime winc binc
+movestogo movetime depth nodes infinite ponder), stop, ponderhit, quit.
+
+Czas na ruch liczymy z zegara (czas / ruchy do kontroli + większość przyrostu). Przy `go ponder`
+szukamy w pozycji po przewidywanym ruchu przeciwnika bez limitu czasu; po `ponderhit` to samo
+przeszukiwanie dostaje termin (ChessAIPlayer.set_deadline), więc praca z czasu przeciwnika nie
+przepada. Tablica transpozycji żyje przez całą partię (czyści ją ucinewgame).
+
+Komunikaty diagnostyczne (ładowanie modelu itp.) idą na stderr - stdout należy do protokołu.
+
+    python chess_uci.py
+"""
+
+import argparse
+import math
+import sys
+import threading
+
+import chess
+
+from chess_inference import BACKENDS
+from chess_logic import (DEFAULT_BATCH_SIZE, DEFAULT_BOOK_MAX_PLY, MATE_SCORE, MAX_SEARCH_DEPTH, MODEL_PATH,
+                         ChessAIPlayer)
+from chess_transposition import DEFAULT_TT_SIZE_MB
+
+ENGINE_NAME = 'chess-tf'
+ENGINE_AUTHOR = 'chess-tf'
+DEFAULT_MOVES_TO_GO = 30  # Zakładana liczba ruchów do końca partii, gdy GUI nie podaje movestogo
+DEFAULT_MOVE_OVERHEAD_MS = 50  # Zapas na opóźnienia GUI i komunikacji
+MIN_MOVE_TIME = 0.01
+DEFAULT_DEPTH = 3  # Głębokość dla samego "go" bez żadnych limitów
+CP_SCALE = 400.0  # Ocena sieci s w [-1, 1] -> centypiony: CP_SCALE * atanh(s) (odwrotność tanh z chess_pgn_ingest)
+
+# Opcje UCI: nazwa -> (typ, domyślna wartość, dodatkowe pola deklaracji)
+OPTIONS = {
+    'Hash': ('spin', DEFAULT_TT_SIZE_MB, 'min 0 max 4096'),
+    'Threads': ('spin', 1, 'min 1 max 64'),
+    'Ponder': ('check', False, ''),
+    'BatchSize': ('spin', DEFAULT_BATCH_SIZE, 'min 1 max 65536'),
+    'Backend': ('combo', 'function', ' '.join(f'var {backend}' for backend in BACKENDS)),
+    'ModelPath': ('string', MODEL_PATH, ''),
+    'BookFile': ('string', '', ''),
+    'BookMaxPly': ('spin', DEFAULT_BOOK_MAX_PLY, 'min 0 max 200'),
+    'MoveOverhead': ('spin', DEFAULT_MOVE_OVERHEAD_MS, 'min 0 max 5000'),
+}
+
+
+def allocate_time(time_left_ms, increment_ms=0, moves_to_go=None, overhead_ms=DEFAULT_MOVE_OVERHEAD_MS):
+    """Czas na ruch w sekundach: równa część pozostałego czasu plus 3/4 przyrostu, najwyżej połowa zegara."""
+    moves = moves_to_go or DEFAULT_MOVES_TO_GO
+    budget = time_left_ms / moves + 0.75 * increment_ms
+    budget = min(budget, time_left_ms * (0.9 if moves == 1 else 0.5)) - overhead_ms
+    return max(MIN_MOVE_TIME, budget / 1000.0)
+
+
+def uci_score(score, board, pv_length):
+    """Ocena z perspektywy białych -> 'cp N' albo 'mate N' z perspektywy strony na ruchu."""
+    sign = 1 if board.turn == chess.WHITE else -1
+    if abs(score) >= MATE_SCORE / 2:
+        moves = max(1, math.ceil(pv_length / 2))
+        return f"mate {moves if score * sign > 0 else -moves}"
+    clipped = max(-0.999, min(0.999, float(score)))
+    return f"cp {round(CP_SCALE * math.atanh(clipped)) * sign}"
+
+
+def parse_go(tokens):
+    """Parametry polecenia go jako słownik (liczby jako int, flagi jako True)."""
+    params = {}
+    flags = ('infinite', 'ponder')
+    index = 0
+    while index < len(tokens):
+        token = tokens[index]
+        if token in flags:
+            params[token] = True
+        elif token == 'searchmoves':
+            break  # Nieobsługiwane - ignorujemy resztę linii
+        elif index + 1 < len(tokens):
+            try:
+                params[token] = int(tokens[index + 1])
+            except ValueError:
+                pass
+            index += 1
+        index += 1
+    return params
+
+
+class UciEngine:
+    """Pętla protokołu: czyta polecenia z `input_stream`, odpowiada na `output_stream`."""
+
+    def __init__(self, input_stream=sys.stdin, output_stream=sys.stdout):
+        self.input = input_stream
+        self.output = output_stream
+        self._output_lock = threading.Lock()
+        self.options = {name: spec[1] for name, spec in OPTIONS.items()}
+        self.player = None
+        self._player_dirty = True
+        self.board = chess.Board()
+        self._search_thread = None
+        self._stop_event = threading.Event()
+        self._ponder_lock = threading.Lock()
+        self._pondering = False  # Przeszukiwanie z go ponder / infinite, bestmove dopiero po stop/ponderhit
+        self._release = threading.Event()
+        self._pending_time_limit = None  # Czas na ruch obliczony przy go ponder, używany po ponderhit
+
+    def send(self, line):
+        with self._output_lock:
+            self.output.write(line + '\n')
+            self.output.flush()
+
+    def run(self):
+        for line in self.input:
+            if not self.handle(line):
+                break
+        self._stop_search()
+        if self.player:
+            self.player.quit_engine()
+
+    def handle(self, line):
+        """Obsługuje jedną linię; zwraca False po quit."""
+        tokens = line.split()
+        if not tokens:
+            return True
+        command, args = tokens[0], tokens[1:]
+        if command == 'uci':
+            self.send(f"id name {ENGINE_NAME}")
+            self.send(f"id author {ENGINE_AUTHOR}")
+            for name, (option_type, default, extra) in OPTIONS.items():
+                default_text = str(default).lower() if option_type == 'check' else (default if default != '' else '<empty>')
+                self.send(f"option name {name} type {option_type} default {default_text} {extra}".rstrip())
+            self.send("uciok")
+        elif command == 'isready':
+            self._ensure_player()
+            self.send("readyok")
+        elif command == 'setoption':
+            self._set_option(args)
+        elif command == 'ucinewgame':
+            self._stop_search()
+            if self.player:
+                self.player.new_game()
+            self.board.reset()
+        elif command == 'position':
+            self._stop_search()
+            self._set_position(args)
+        elif command == 'go':
+            self._stop_search()
+            self._go(parse_go(args))
+        elif command == 'stop':
+            self._stop_search()
+        elif command == 'ponderhit':
+            self._ponderhit()
+        elif command == 'quit':
+            return False
+        return True
+
+    def _set_option(self, args):
+        if 'name' not in args:
+            return
+        value_index = args.index('value') if 'value' in args else len(args)
+        name = ' '.join(args[args.index('name') + 1:value_index])
+        value = ' '.join(args[value_index + 1:])
+        match = next((option for option in OPTIONS if option.lower() == name.lower()), None)
+        if match is None:
+            self.send(f"info string Nieznana opcja {name}")
+            return
+        option_type = OPTIONS[match][0]
+        if option_type == 'spin':
+            try:
+                value = int(value)
+            except ValueError:
+                return
+        elif option_type == 'check':
+            value = value.lower() == 'true'
+        elif value == '<empty>':
+            value = ''
+        self.options[match] = value
+        if match not in ('Ponder', 'MoveOverhead'):
+            self._player_dirty = True
+
+    def _ensure_player(self):
+        """Tworzy gracza od nowa po zmianie opcji; w przeciwnym razie tablica transpozycji zostaje."""
+        if self.player is not None and not self._player_dirty:
+            return
+        if self.player is not None:
+            self.player.quit_engine()
+        options = self.options
+        self.player = ChessAIPlayer(use_tensorflow=True, batch_size=options['BatchSize'],
+                                    tt_size_mb=options['Hash'], model_path=options['ModelPath'],
+                                    inference_backend=options['Backend'], workers=options['Threads'],
+                                    stats_callback=self._send_info, book_path=options['BookFile'] or None,
+                                    book_max_ply=options['BookMaxPly'])
+        self._player_dirty = False
+
+    def _set_position(self, args):
+        if not args:
+            return
+        if args[0] == 'startpos':
+            board = chess.Board()
+            rest = args[1:]
+        elif args[0] == 'fen':
+            fen_end = args.index('moves') if 'moves' in args else len(args)
+            try:
+                board = chess.Board(' '.join(args[1:fen_end]))
+            except ValueError:
+                self.send("info string Niepoprawny FEN")
+                return
+            rest = args[fen_end:]
+        else:
+            return
+        if rest and rest[0] == 'moves':
+            for uci in rest[1:]:
+                try:
+                    board.push_uci(uci)
+                except ValueError:
+                    self.send(f"info string Nielegalny ruch {uci}")
+                    break
+        self.board = board
+
+    def _time_limit(self, params):
+        """Czas na ruch z parametrów go (None = bez limitu czasu)."""
+        overhead = self.options['MoveOverhead']
+        if 'movetime' in params:
+            return max(MIN_MOVE_TIME, (params['movetime'] - overhead) / 1000.0)
+        clock, increment = ('wtime', 'winc') if self.board.turn == chess.WHITE else ('btime', 'binc')
+        if clock in params:
+            return allocate_time(params[clock], params.get(increment, 0), params.get('movestogo'), overhead)
+        return None
+
+    def _go(self, params):
+        self._ensure_player()
+        time_limit = self._time_limit(params)
+        depth = params.get('depth')
+        node_limit = params.get('nodes')
+        waiting = params.get('ponder', False) or params.get('infinite', False)
+        with self._ponder_lock:
+            self._pondering = waiting
+            self._pending_time_limit = time_limit if params.get('ponder') else None
+        # Termin z ponderhit, który przyszedł po zakończeniu poprzedniego przeszukiwania, nie dotyczy tego
+        self.player.clear_pending_deadline()
+        self._release.clear()
+        self._stop_event.clear()
+        search_time = None if waiting else time_limit
+        if depth is None:
+            if waiting:
+                depth = MAX_SEARCH_DEPTH  # Szukamy aż do stop / ponderhit (i terminu po nim)
+            elif search_time is None and node_limit is None:
+                depth = DEFAULT_DEPTH
+        board = self.board.copy()
+        self._search_thread = threading.Thread(target=self._search, args=(board, depth, search_time, node_limit),
+                                               daemon=True)
+        self._search_thread.start()
+
+    def _search(self, board, depth, time_limit, node_limit):
+        move = self.player.get_best_move(board, depth=depth, time_limit=time_limit, node_limit=node_limit,
+                                         stop_event=self._stop_event)
+        # Przy ponder / infinite protokół zabrania wysłania bestmove przed stop albo ponderhit
+        with self._ponder_lock:
+            waiting = self._pondering
+        if waiting:
+            self._release.wait()
+        stats = self.player.last_search_stats
+        if move is None:
+            self.send("bestmove 0000")
+            return
+        ponder_move = None
+        if stats and len(stats.pv) > 1 and stats.pv[0] == move.uci():
+            ponder_move = stats.pv[1]
+        self.send(f"bestmove {move.uci()}" + (f" ponder {ponder_move}" if ponder_move else ''))
+
+    def _ponderhit(self):
+        """Przeciwnik zagrał przewidywany ruch: przeszukiwanie trwa dalej, teraz już z limitem czasu."""
+        with self._ponder_lock:
+            if not self._pondering:
+                return
+            self._pondering = False
+            time_limit = self._pending_time_limit
+        if self._search_thread is not None and self._search_thread.is_alive():
+            # Działa także, gdy wątek jeszcze nie doszedł do przeszukiwania - termin poczeka na jego start
+            self.player.set_deadline(time_limit)
+        self._release.set()
+
+    def _stop_search(self):
+        if self._search_thread is None:
+            return
+        with self._ponder_lock:
+            self._pondering = False
+        self._stop_event.set()
+        self._release.set()
+        self._search_thread.join()
+        self._search_thread = None
+
+    def _send_info(self, stats):
+        if stats.algorithm == 'book':
+            self.send(f"info string ruch z książki {stats.pv[0]}")
+            return
+        if stats.final or stats.score is None:
+            return  # Wynik ostatniej iteracji został już wysłany
+        time_ms = int(stats.time * 1000)
+        self.send(f"info depth {stats.depth} score {uci_score(stats.score, self.board, len(stats.pv))} "
+                  f"nodes {stats.nodes} nps {int(stats.nodes_per_sec)} time {time_ms} pv {' '.join(stats.pv)}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Silnik szachowy w protokole UCI.")
+    parser.add_argument('--model', default=MODEL_PATH)
+    parser.add_argument('--backend', default=OPTIONS['Backend'][1], choices=BACKENDS)
+    args = parser.parse_args()
+
+    # Wszystko poza protokołem (print z ładowania modelu, procesów roboczych itp.) idzie na stderr
+    protocol_output = sys.stdout
+    sys.stdout = sys.stderr
+    engine = UciEngine(sys.stdin, protocol_output)
+    engine.options['ModelPath'] = args.model
+    engine.options['Backend'] = args.backend
+    engine.run()
@@ -0,0 +1,101 @@
+"""Książka otwarć Polyglot z PGN, sprawdzana czytnikiem chess.polyglot."""
+
+import chess
+import chess.polyglot
+import pytest
+
+from chess_book_builder import build_book, polyglot_move
+from chess_logic import ChessAIPlayer
+from chess_nnue import NnueEvaluator
+
+ITALIAN = '1. e4 e5 2. Nf3 Nc6 3. Bc4 Bc5'
+
+# Wygrane białych z roszadą, remis i przegrana po 4. c3, jednorazowe 1. d4 i partia bez wyniku
+GAMES = (
+    ('1-0', f'{ITALIAN} 4. O-O Nf6'),
+    ('1-0', f'{ITALIAN} 4. O-O Nf6'),
+    ('1/2-1/2', f'{ITALIAN} 4. c3 Nf6'),
+    ('0-1', f'{ITALIAN} 4. c3 d6'),
+    ('0-1', '1. d4 d5'),
+    ('*', '1. e4 c5 2. Nf3 d6'),
+)
+
+
+def _write_pgn(path):
+    text = ''
+    for index, (result, moves) in enumerate(GAMES):
+        text += f'[Event "Gra {index}"]\n[Result "{result}"]\n\n{moves} {result}\n\n'
+    path.write_text(text)
+    return str(path)
+
+
+def _board(moves):
+    board = chess.Board()
+    for san in moves.replace('.', ' ').split():
+        if not san.isdigit():
+            board.push_san(san)
+    return board
+
+
+def _book_moves(book_path, board):
+    with chess.polyglot.open_reader(book_path) as reader:
+        return {entry.move.uci(): entry.weight for entry in reader.find_all(board)}
+
+
+@pytest.fixture
+def book(tmp_path):
+    pgn_path = _write_pgn(tmp_path / 'games.pgn')
+    book_path = str(tmp_path / 'book.bin')
+    entries = build_book([pgn_path], book_path, min_games=2)
+    return book_path, entries
+
+
+def test_book_weights_from_results(book):
+    book_path, _ = book
+    # e4: 2 wygrane (2 + 2), remis (1), przegrana (0); d4 zagrane raz (< min_games); partia '*' pominięta
+    assert _book_moves(book_path, chess.Board()) == {'e2e4': 5}
+    # Czarne po 1. e4: przegrane 0 + 0, remis 1, wygrana 2
+    assert _book_moves(book_path, _board('1. e4')) == {'e7e5': 3}
+
+
+def test_book_castling_move(book):
+    book_path, _ = book
+    board = _board(ITALIAN)
+    moves = _book_moves(book_path, board)
+    # Roszada (zapisana jako e1h1) wraca z czytnika jako e1g1; c3: remis 1 + przegrana 0
+    assert moves == {'e1g1': 4, 'c2c3': 1}
+    with chess.polyglot.open_reader(book_path) as reader:
+        best = reader.find(board)  # Wpis o największej wadze
+    assert best.move == chess.Move.from_uci('e1g1')
+    assert best.raw_move == polyglot_move(board, best.move) == chess.H1 | (chess.E1 << 6)
+
+
+def test_book_skips_zero_weight_and_rare_moves(book):
+    book_path, _ = book
+    # Nf6 po roszadzie grały tylko przegrywające czarne (waga 0); po 4. c3 każdy ruch zagrano raz
+    assert _book_moves(book_path, _board(f'{ITALIAN} 4. O-O')) == {}
+    assert _book_moves(book_path, _board(f'{ITALIAN} 4. c3')) == {}
+
+
+def test_book_entries_sorted_by_key(book):
+    _, entries = book
+    assert entries == sorted(entries, key=lambda entry: (entry[0], -entry[2], entry[1]))
+    assert all(0 < weight <= 0xFFFF for _, _, weight in entries)
+
+
+def test_book_max_ply(tmp_path):
+    pgn_path = _write_pgn(tmp_path / 'games.pgn')
+    book_path = str(tmp_path / 'short.bin')
+    build_book([pgn_path], book_path, max_ply=6, min_games=2)
+    assert _book_moves(book_path, chess.Board()) == {'e2e4': 5}
+    assert _book_moves(book_path, _board(ITALIAN)) == {}
+
+
+def test_player_uses_book(book):
+    book_path, _ = book
+    player = ChessAIPlayer(use_tensorflow=True, evaluator=NnueEvaluator.random(seed=0), book_path=book_path)
+    board = _board(ITALIAN)
+    move = player.get_best_move(board, depth=2)
+    assert move in (chess.Move.from_uci('e1g1'), chess.Move.from_uci('c2c3'))
+    assert player.last_search_stats.algorithm == 'book'
+    player.quit_engine()
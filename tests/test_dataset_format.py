@@ -0,0 +1,148 @@
+"""Format .chessds: zapis i odczyt, wykrywanie uszkodzeń (crc32) i cache kawałków czytnika."""
+
+import os
+import pickle
+import random
+
+import chess
+import numpy as np
+import pytest
+
+from chess_board_encoder import encode_boards, pack_boards
+from chess_dataset_format import (CHUNK_CACHE_SIZE, DatasetReader, DatasetWriter, dataset_to_pickle,
+                                  records_from_arrays)
+from chess_dataset_generator import SAMPLE_DTYPE
+
+CHUNK_RECORDS = 16
+
+
+def _boards(count, seed=0):
+    rng = random.Random(seed)
+    boards = []
+    board = chess.Board()
+    while len(boards) < count:
+        moves = list(board.legal_moves)
+        if not moves:
+            board.reset()
+            continue
+        board.push(rng.choice(moves))
+        boards.append(board.copy(stack=False))
+    return boards
+
+
+def _records(count, seed=0):
+    boards = _boards(count, seed)
+    records = np.empty(count, dtype=SAMPLE_DTYPE)
+    records['planes'], records['turn'] = pack_boards(boards)
+    records['y'] = np.random.default_rng(seed).uniform(-1.0, 1.0, count).astype(np.float32)
+    return boards, records
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    """Plik z 100 rekordami w kawałkach po 16 (ostatni niepełny), zapisany w dwóch wywołaniach write."""
+    boards, records = _records(100)
+    path = str(tmp_path / 'data.chessds')
+    with DatasetWriter(path, chunk_records=CHUNK_RECORDS) as writer:
+        writer.write(records[:37])
+        writer.write(records[37:])
+    return path, boards, records
+
+
+def test_round_trip(dataset):
+    path, boards, records = dataset
+    assert not os.path.exists(path + '.tmp')
+    with DatasetReader(path) as reader:
+        assert len(reader) == len(records)
+        assert len(reader.index) == 7
+        assert list(reader.index['records']) == [16] * 6 + [4]
+        np.testing.assert_array_equal(reader.read_all(), records)
+        np.testing.assert_array_equal(reader[5:40], records[5:40])
+        assert reader[-1] == records[-1]
+        indices = [99, 0, 50, 17, 16, 50]
+        np.testing.assert_array_equal(reader.take(indices), records[indices])
+        with pytest.raises(IndexError):
+            reader[100]
+
+
+def test_batches_expand_to_network_input(dataset):
+    path, boards, records = dataset
+    with DatasetReader(path) as reader:
+        batches = list(reader.batches(10))
+        X = np.concatenate([X for X, _ in batches])
+        y = np.concatenate([y for _, y in batches])
+        np.testing.assert_array_equal(X, encode_boards(boards))
+        np.testing.assert_array_equal(y, records['y'])
+
+        shuffled = list(reader.batches(10, shuffle=True, seed=1))
+        y_shuffled = np.concatenate([y for _, y in shuffled])
+        assert sorted(y_shuffled.tolist()) == sorted(records['y'].tolist())
+
+
+def test_uncompressed_and_pickle_round_trip(tmp_path):
+    boards, _ = _records(40, seed=3)
+    X = encode_boards(boards)
+    y = np.linspace(-1.0, 1.0, len(X)).astype(np.float32)
+    path = str(tmp_path / 'raw.chessds')
+    with DatasetWriter(path, chunk_records=CHUNK_RECORDS, compression_level=0) as writer:
+        writer.write(records_from_arrays(X, y))
+
+    pickle_path = str(tmp_path / 'data.pkl')
+    assert dataset_to_pickle(path, pickle_path) == len(X)
+    with open(pickle_path, 'rb') as f:
+        data = pickle.load(f)
+    np.testing.assert_array_equal(data['X'], X)
+    np.testing.assert_allclose(data['y'], y)
+
+
+def test_crc_mismatch_is_detected(dataset):
+    path, _, records = dataset
+    with DatasetReader(path) as reader:
+        entry = reader.index[2]
+    with open(path, 'r+b') as f:
+        f.seek(int(entry['offset']) + int(entry['size']) // 2)
+        byte = f.read(1)
+        f.seek(-1, os.SEEK_CUR)
+        f.write(bytes([byte[0] ^ 0xFF]))
+
+    with DatasetReader(path) as reader:
+        np.testing.assert_array_equal(reader[:32], records[:32])  # Nieuszkodzone kawałki dalej się czytają
+        with pytest.raises(ValueError, match='crc32'):
+            reader.read_chunk(2)
+        with pytest.raises(ValueError, match='crc32'):
+            reader[40]
+
+
+def test_not_a_dataset_file(tmp_path):
+    path = tmp_path / 'bad.chessds'
+    path.write_bytes(b'not a dataset' * 10)
+    with pytest.raises(ValueError):
+        DatasetReader(str(path))
+
+
+def test_failed_write_leaves_no_file(tmp_path):
+    path = str(tmp_path / 'partial.chessds')
+    with pytest.raises(RuntimeError):
+        with DatasetWriter(path, chunk_records=CHUNK_RECORDS) as writer:
+            writer.write(_records(20)[1])
+            raise RuntimeError('przerwany zapis')
+    assert not os.path.exists(path)
+    assert not os.path.exists(path + '.tmp')
+
+
+def test_chunk_cache(dataset):
+    path, _, records = dataset
+    with DatasetReader(path) as reader:
+        first = reader.read_chunk(0)
+        assert reader.read_chunk(0) is first  # Trafienie w cache - bez ponownego rozpakowania
+        for chunk_index in range(1, CHUNK_CACHE_SIZE + 1):
+            reader.read_chunk(chunk_index)
+        assert len(reader._cache) == CHUNK_CACHE_SIZE
+        assert 0 not in reader._cache  # Najdawniej używany kawałek wypadł
+
+        reader.read_chunk(1)
+        reader.read_chunk(CHUNK_CACHE_SIZE + 1)
+        assert 1 in reader._cache and 2 not in reader._cache  # Użycie odświeża kolejność (LRU)
+
+        # Odczyt przez cache daje te same rekordy co odczyt od zera
+        np.testing.assert_array_equal(reader.take(np.arange(len(records))[::-1]), records[::-1])
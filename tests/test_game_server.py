@@ -0,0 +1,116 @@
+"""API serwera partii przez SessionManager.handle (bez HTTP)."""
+
+import asyncio
+
+import chess
+import pytest
+
+from chess_game_server import RequestError, SessionManager
+from chess_inference import NumpyEvaluator
+
+
+@pytest.fixture
+def manager():
+    manager = SessionManager(NumpyEvaluator.random(seed=0), max_sessions=4, search_threads=2, default_depth=1)
+    yield manager
+    manager.shutdown()
+
+
+def _request(manager, method, path, body=None):
+    return asyncio.run(manager.handle(method, path, body or {}))
+
+
+def _error(manager, method, path, body=None):
+    with pytest.raises(RequestError) as excinfo:
+        _request(manager, method, path, body)
+    return excinfo.value.status
+
+
+def test_create_human_vs_ai_session(manager):
+    status, state = _request(manager, 'POST', '/games', {'ai_color': 'black'})
+    assert status == 201
+    assert state['fen'] == chess.STARTING_FEN
+    assert state['turn'] == 'white' and state['moves'] == [] and state['last_ai_move'] is None
+
+    status, state = _request(manager, 'POST', f"/games/{state['id']}/move", {'move': 'e2e4'})
+    assert status == 200
+    # Po ruchu człowieka AI (czarne) od razu odpowiada
+    assert state['moves'][0] == 'e2e4' and len(state['moves']) == 2
+    assert state['last_ai_move'] == state['moves'][1]
+    assert state['turn'] == 'white'
+    assert state['search']['depth'] == 1
+
+    assert _request(manager, 'GET', f"/games/{state['id']}") == (200, state)
+
+
+def test_create_session_with_ai_to_move(manager):
+    status, state = _request(manager, 'POST', '/games', {'ai_color': 'white', 'depth': 1})
+    assert status == 201
+    assert len(state['moves']) == 1 and state['turn'] == 'black'
+    board = chess.Board()
+    assert chess.Move.from_uci(state['last_ai_move']) in board.legal_moves
+
+
+@pytest.mark.parametrize('body', [
+    {'ai_color': 'green'},
+    {'ai_color': 7},
+    {'depth': 0},
+    {'depth': True},
+    {'depth': '2'},
+    {'time_limit': -1},
+    {'time_limit': 'dużo'},
+])
+def test_create_rejects_bad_parameters(manager, body):
+    assert _error(manager, 'POST', '/games', body) == 400
+    assert manager.sessions == {}
+
+
+def test_illegal_and_malformed_moves(manager):
+    _, state = _request(manager, 'POST', '/games', {'ai_color': 'none'})
+    path = f"/games/{state['id']}/move"
+    assert _error(manager, 'POST', path, {'move': 'e2e5'}) == 400  # Nielegalny
+    assert _error(manager, 'POST', path, {'move': 'e7e5'}) == 400  # Nie ta strona
+    assert _error(manager, 'POST', path, {'move': 'zzz'}) == 400  # Niepoprawny UCI
+    assert _error(manager, 'POST', path, {'move': 42}) == 400
+    assert _error(manager, 'POST', path, {}) == 400
+    # Odrzucone ruchy nie zmieniają partii
+    assert _request(manager, 'GET', f"/games/{state['id']}")[1]['moves'] == []
+
+
+def test_ai_move_out_of_turn(manager):
+    _, state = _request(manager, 'POST', '/games', {'ai_color': 'black'})
+    assert _error(manager, 'POST', f"/games/{state['id']}/ai") == 409
+
+
+def test_unknown_game_and_route(manager):
+    assert _error(manager, 'GET', '/games/999') == 404
+    assert _error(manager, 'POST', '/games/999/move', {'move': 'e2e4'}) == 404
+    assert _error(manager, 'DELETE', '/games/999') == 404
+    assert _error(manager, 'GET', '/nothing') == 404
+    assert _error(manager, 'PUT', '/games') == 405
+
+
+def test_delete_session(manager):
+    _, state = _request(manager, 'POST', '/games', {'ai_color': 'black'})
+    assert _request(manager, 'DELETE', f"/games/{state['id']}") == (200, {'id': state['id'], 'closed': True})
+    assert _error(manager, 'GET', f"/games/{state['id']}") == 404
+
+
+def test_session_limit(manager):
+    for _ in range(manager.max_sessions):
+        _request(manager, 'POST', '/games', {'ai_color': 'none'})
+    assert _error(manager, 'POST', '/games', {'ai_color': 'none'}) == 503
+
+
+def test_stats(manager):
+    status, stats = _request(manager, 'GET', '/stats')
+    assert status == 200
+    assert stats['sessions'] == 0 and stats['moves_played'] == 0
+    assert 'inference' in stats
+
+    _, state = _request(manager, 'POST', '/games', {'ai_color': 'black'})
+    _request(manager, 'POST', f"/games/{state['id']}/move", {'move': 'd2d4'})
+    _, stats = _request(manager, 'GET', '/stats?verbose=1')
+    assert stats['sessions'] == 1
+    assert stats['moves_played'] == 1  # Liczone są ruchy AI
+    assert stats['moves_per_sec'] > 0
@@ -0,0 +1,65 @@
+"""Równoległe przeszukiwanie korzenia kontra przeszukiwanie sekwencyjne."""
+
+import chess
+import pytest
+
+from chess_logic import ChessAIPlayer
+from chess_nnue import NnueEvaluator
+
+SCORE_TOLERANCE = 1e-5  # Procesy oceniają liście w innych batchach (różnice float32 ~1e-7)
+
+PARALLEL_FENS = (
+    chess.STARTING_FEN,
+    'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1',
+    'r2q1rk1/pp2bppp/2n1pn2/3p4/3P4/2NBPN2/PP3PPP/R2Q1RK1 w - - 0 10',
+    '8/5pk1/6p1/8/3R4/6P1/5PK1/r7 b - - 0 40',
+)
+
+
+@pytest.fixture(scope='module')
+def evaluator():
+    return NnueEvaluator.random(seed=0)
+
+
+@pytest.fixture(scope='module')
+def parallel_player(evaluator):
+    # Pula procesów (spawn) startuje raz dla całego modułu
+    player = ChessAIPlayer(use_tensorflow=True, evaluator=evaluator, workers=2, eval_cache_size=0)
+    yield player
+    player.quit_engine()
+
+
+def _search(player, fen, **limits):
+    player.new_game()
+    board = chess.Board(fen)
+    move = player.get_best_move(board, **limits)
+    assert board.fen() == fen
+    return move, player.last_search_stats
+
+
+@pytest.mark.parametrize('depth', [2, 3])
+@pytest.mark.parametrize('fen', PARALLEL_FENS)
+def test_parallel_matches_serial(parallel_player, evaluator, fen, depth):
+    serial_player = ChessAIPlayer(use_tensorflow=True, evaluator=evaluator, eval_cache_size=0)
+    serial_move, serial_stats = _search(serial_player, fen, depth=depth)
+    parallel_move, parallel_stats = _search(parallel_player, fen, depth=depth)
+
+    assert parallel_stats.depth == depth
+    assert parallel_stats.score == pytest.approx(serial_stats.score, abs=SCORE_TOLERANCE)
+    if parallel_move != serial_move:
+        # Inny ruch tylko przy remisie ocen - sprawdzamy go sekwencyjnie na głębokości depth - 1
+        board = chess.Board(fen)
+        board.push(parallel_move)
+        serial_player.new_game()
+        serial_player.get_best_move(board, depth=depth - 1)
+        assert serial_player.last_search_stats.score == pytest.approx(serial_stats.score, abs=SCORE_TOLERANCE)
+    assert parallel_stats.pv[0] == parallel_move.uci()
+
+
+def test_parallel_search_respects_node_limit(parallel_player):
+    node_limit = 3000
+    move, stats = _search(parallel_player, PARALLEL_FENS[1], depth=None, node_limit=node_limit)
+    assert move is not None
+    assert stats.depth >= 1
+    # Iteracja 1 zawsze się kończy; dalej każde zadanie ma swój przydział pozostałego limitu
+    assert stats.nodes <= node_limit + len(list(chess.Board(PARALLEL_FENS[1]).legal_moves))
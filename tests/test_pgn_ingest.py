@@ -0,0 +1,114 @@
+"""Import partii PGN do shardów w każdym trybie etykiet."""
+
+import io
+import math
+
+import chess.pgn
+import numpy as np
+import pytest
+
+from chess_board_encoder import pack_boards
+from chess_dataset_generator import list_shards
+from chess_pgn_ingest import EVAL_SCALE, LABEL_MODES, MATE_SCORE, ingest_pgn, iter_game_chunks, parse_eval
+
+RESULT_WEIGHT = 0.25
+SKIP_PLIES = 2
+
+# Dwie partie: pierwsza z ocenami [%eval] (także mat) i wariantem, który trzeba pominąć,
+# druga bez części ocen i z wygraną czarnych
+TWO_GAMES_PGN = """[Event "Test 1"]
+[White "A"]
+[Black "B"]
+[Result "1-0"]
+
+1. e4 { [%eval 0.3] } 1... e5 { [%eval 0.25] } 2. Bc4 { [%eval 0.2] } 2... Nc6 { [%eval 0.3] }
+3. Qh5 { [%eval 0.1] } ( 3. Nf3 { [%eval 0.35] } ) 3... Nf6 { [%eval #1] } 4. Qxf7# 1-0
+
+[Event "Test 2"]
+[White "C"]
+[Black "D"]
+[Result "0-1"]
+
+1. f3 { [%eval -0.5] } 1... e5 2. g4 { [%eval -1.2] } 2... Qh4# { [%eval #-0] } 0-1
+"""
+
+
+def _expected(label):
+    """Pozycje i etykiety policzone niezależnie, przez zwykły parser chess.pgn."""
+    boards, labels = [], []
+    stream = io.StringIO(TWO_GAMES_PGN)
+    while (game := chess.pgn.read_game(stream)) is not None:
+        result = {'1-0': 1.0, '0-1': -1.0, '1/2-1/2': 0.0}[game.headers['Result']]
+        nodes = [game] + list(game.mainline())
+        for node in nodes[SKIP_PLIES:]:
+            evaluation = parse_eval(node.comment)
+            if label == 'result' or (evaluation is None and label == 'mix'):
+                y = result
+            elif evaluation is None:
+                continue
+            elif label == 'eval':
+                y = evaluation
+            else:
+                y = RESULT_WEIGHT * result + (1.0 - RESULT_WEIGHT) * evaluation
+            boards.append(node.board())
+            labels.append(y)
+    return boards, np.array(labels, dtype=np.float32)
+
+
+def _read_shards(directory):
+    return np.concatenate([np.load(path) for path in list_shards(directory)])
+
+
+@pytest.mark.parametrize('label', LABEL_MODES)
+def test_ingest_two_games(tmp_path, label):
+    pgn_path = tmp_path / 'games.pgn'
+    pgn_path.write_text(TWO_GAMES_PGN)
+    output_dir = str(tmp_path / 'shards')
+
+    written = ingest_pgn([str(pgn_path)], output_dir, shard_size=5, workers=1, label=label,
+                         result_weight=RESULT_WEIGHT, skip_plies=SKIP_PLIES, games_per_task=1)
+
+    boards, labels = _expected(label)
+    records = _read_shards(output_dir)
+    assert written == len(records) == len(boards)
+    assert len(list_shards(output_dir)) == math.ceil(len(boards) / 5)
+    planes, turns = pack_boards(boards)
+    np.testing.assert_array_equal(records['planes'], planes)
+    np.testing.assert_array_equal(records['turn'], turns)
+    np.testing.assert_allclose(records['y'], labels, rtol=1e-6)
+
+
+def test_label_modes_differ_on_the_same_games(tmp_path):
+    pgn_path = tmp_path / 'games.pgn'
+    pgn_path.write_text(TWO_GAMES_PGN)
+    counts = {}
+    for label in LABEL_MODES:
+        counts[label] = ingest_pgn([str(pgn_path)], str(tmp_path / label), workers=1, label=label,
+                                   skip_plies=0)
+    # 7 + 4 półruchy plus dwie pozycje startowe; eval bierze tylko 6 + 3 pozycje z komentarzem [%eval]
+    assert counts['result'] == counts['mix'] == 13
+    assert counts['eval'] == 9
+
+
+def test_max_positions_and_unknown_label(tmp_path):
+    pgn_path = tmp_path / 'games.pgn'
+    pgn_path.write_text(TWO_GAMES_PGN)
+    assert ingest_pgn([str(pgn_path)], str(tmp_path / 'out'), workers=1, skip_plies=0, max_positions=3,
+                      games_per_task=1) == 3
+    with pytest.raises(ValueError):
+        ingest_pgn([str(pgn_path)], str(tmp_path / 'bad'), workers=1, label='engine')
+
+
+def test_iter_game_chunks_keeps_games_whole():
+    chunks = list(iter_game_chunks(io.StringIO(TWO_GAMES_PGN), games_per_chunk=1))
+    assert len(chunks) == 2
+    assert chunks[0].startswith('[Event "Test 1"]') and chunks[1].startswith('[Event "Test 2"]')
+    assert ''.join(chunks) == TWO_GAMES_PGN
+
+
+def test_parse_eval():
+    assert parse_eval('[%eval 0.0]') == 0.0
+    assert parse_eval('[%eval -1.5] [%clk 0:01:00]') == pytest.approx(math.tanh(-150.0 / EVAL_SCALE))
+    assert parse_eval('[%eval #3]') == MATE_SCORE
+    assert parse_eval('[%eval #-2]') == -MATE_SCORE
+    assert parse_eval('dobry ruch') is None
@@ -0,0 +1,122 @@
+"""Alpha-beta (TT, killers, historia) kontra minimax i polityka zastępowania tablicy transpozycji."""
+
+import chess
+import pytest
+
+from chess_inference import NumpyEvaluator
+from chess_logic import ChessAIPlayer
+from chess_nnue import NnueEvaluator
+from chess_transposition import EXACT, LOWER_BOUND, TranspositionTable
+
+# Oceny tej samej pozycji z innego batcha / ścieżki akumulatora różnią się o ~1e-7
+SCORE_TOLERANCE = 1e-5
+
+SEARCH_FENS = (
+    chess.STARTING_FEN,
+    'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1',  # kiwipete: roszady, bicia
+    'r1bqkb1r/pppp1ppp/2n2n2/4p2Q/2B1P3/8/PPPP1PPP/RNB1K1NR w KQkq - 4 4',  # mat w 1 (Hxf7#)
+    '6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 1',  # mat na ostatniej linii
+    '8/5pk1/6p1/8/3R4/6P1/5PK1/r7 b - - 0 40',  # końcówka wieżowa, ruch czarnych
+)
+
+
+def _player(evaluator, search_algorithm='alphabeta'):
+    return ChessAIPlayer(use_tensorflow=True, evaluator=evaluator, search_algorithm=search_algorithm,
+                         eval_cache_size=0)
+
+
+def _minimax_value(player, board, move, depth):
+    """Ocena minimax ruchu korzenia (do sprawdzenia remisów ocen)."""
+    board.push(move)
+    try:
+        if depth == 1 or board.is_game_over():
+            return player._terminal_score(board) if board.is_game_over() else float(player._evaluate_batch(
+                player._board_to_input_representation(board)[None])[0])
+        return player._search_minimax(board, depth - 1)[1]
+    finally:
+        board.pop()
+
+
+@pytest.mark.parametrize('evaluator_class', [NumpyEvaluator, NnueEvaluator])
+@pytest.mark.parametrize('depth', [2, 3])
+@pytest.mark.parametrize('fen', SEARCH_FENS)
+def test_alphabeta_matches_minimax(fen, depth, evaluator_class):
+    evaluator = evaluator_class.random(seed=0)
+    alphabeta = _player(evaluator)
+    minimax = _player(evaluator, 'minimax')
+
+    board = chess.Board(fen)
+    alphabeta_move = alphabeta.get_best_move(board, depth=depth)
+    alphabeta_score = alphabeta.last_search_stats.score
+    minimax_move = minimax.get_best_move(board, depth=depth)
+    minimax_score = minimax.last_search_stats.score
+
+    assert board.fen() == fen  # Przeszukiwanie nie zostawia ruchów na planszy
+    assert alphabeta.last_search_stats.depth == depth
+    assert alphabeta_score == pytest.approx(minimax_score, abs=SCORE_TOLERANCE)
+    if alphabeta_move != minimax_move:
+        # Dopuszczalne tylko przy remisie ocen, który rozstrzygnął błąd zaokrągleń
+        assert _minimax_value(minimax, board, alphabeta_move, depth) == pytest.approx(
+            minimax_score, abs=SCORE_TOLERANCE)
+
+
+def test_alphabeta_finds_mate_in_one():
+    player = _player(NnueEvaluator.random(seed=0))
+    board = chess.Board('r1bqkb1r/pppp1ppp/2n2n2/4p2Q/2B1P3/8/PPPP1PPP/RNB1K1NR w KQkq - 4 4')
+    assert player.get_best_move(board, depth=3) == chess.Move.from_uci('h5f7')
+
+
+def test_alphabeta_searches_fewer_nodes_than_minimax():
+    evaluator = NumpyEvaluator.random(seed=0)
+    alphabeta = _player(evaluator)
+    minimax = _player(evaluator, 'minimax')
+    board = chess.Board(SEARCH_FENS[1])
+    alphabeta.get_best_move(board, depth=3)
+    minimax.get_best_move(board, depth=3)
+    assert alphabeta.last_search_stats.nodes < minimax.last_search_stats.nodes
+
+
+def _colliding_keys(table, count=2, base=12345):
+    """Różne klucze trafiające do tego samego slotu."""
+    return [base + index * table.capacity for index in range(count)]
+
+
+def test_tt_keeps_deeper_entry_in_same_search():
+    table = TranspositionTable(size_mb=0.001)
+    deep_key, shallow_key = _colliding_keys(table)
+    table.store(deep_key, 5, 1.5, EXACT, chess.Move.from_uci('e2e4'))
+    table.store(shallow_key, 2, -0.5, LOWER_BOUND, chess.Move.from_uci('d2d4'))
+
+    assert table.probe(shallow_key) is None
+    assert table.probe(deep_key) == (5, 1.5, EXACT, chess.Move.from_uci('e2e4'))
+
+
+def test_tt_replaces_with_equal_or_deeper_entry():
+    table = TranspositionTable(size_mb=0.001)
+    first_key, second_key = _colliding_keys(table)
+    table.store(first_key, 3, 0.25, EXACT)
+    table.store(second_key, 3, 0.75, EXACT)
+    assert table.probe(first_key) is None
+    assert table.probe(second_key)[:2] == (3, 0.75)
+
+    table.store(second_key, 6, -0.25, LOWER_BOUND)
+    assert table.probe(second_key)[:3] == (6, -0.25, LOWER_BOUND)
+
+
+def test_tt_old_entries_give_way_after_new_search():
+    table = TranspositionTable(size_mb=0.001)
+    old_key, new_key = _colliding_keys(table)
+    table.store(old_key, 8, 1.0, EXACT)
+    table.new_search()
+    table.store(new_key, 1, 0.5, EXACT)
+
+    assert table.probe(old_key) is None
+    assert table.probe(new_key)[:2] == (1, 0.5)
+
+
+def test_tt_keeps_best_move_when_storing_without_move():
+    table = TranspositionTable(size_mb=0.001)
+    key = _colliding_keys(table, 1)[0]
+    table.store(key, 1, 0.5, EXACT, chess.Move.from_uci('g1f3'))
+    table.store(key, 2, 0.75, LOWER_BOUND)
+    assert table.probe(key) == (2, 0.75, LOWER_BOUND, chess.Move.from_uci('g1f3'))